@@ -0,0 +1,99 @@
+"""
+Asset manager: loads files on first use or on a background thread.
+
+Assets are registered with a key, a path and a loader such as
+pygame.image.load. start() loads everything still missing on a worker
+thread while the start screen shows progress; get() returns the asset,
+loading it on the spot if the worker has not reached it yet. Load times
+are kept per asset.
+"""
+import threading
+import time
+
+
+class AssetManager:
+    def __init__(self):
+        self._entries = {}
+        self._loaded = {}
+        self.errors = {}
+        self.load_times = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._thread = None
+
+    def add(self, key, path, loader, fallback=None):
+        """
+        Registers an asset. fallback() builds a stand-in when loading fails.
+        """
+        self._entries[key] = (path, loader, fallback)
+        self._key_locks[key] = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries)
+
+    def _load(self, key):
+        with self._key_locks[key]:
+            if key in self._loaded or key in self.errors:
+                return
+            path, loader, _ = self._entries[key]
+            started = time.perf_counter()
+            try:
+                value = loader(path)
+            except Exception as e:
+                with self._lock:
+                    self.errors[key] = e
+            else:
+                with self._lock:
+                    self._loaded[key] = value
+            self.load_times[key] = time.perf_counter() - started
+
+    def get(self, key):
+        """
+        The loaded asset, loading it now if needed. Raises the load error
+        if it failed and no fallback was given.
+        """
+        if key not in self._loaded and key not in self.errors:
+            self._load(key)
+        if key in self._loaded:
+            return self._loaded[key]
+        fallback = self._entries[key][2]
+        if fallback is None:
+            raise self.errors[key]
+        value = fallback()
+        self._loaded[key] = value
+        return value
+
+    def start(self):
+        """
+        Loads every registered asset on a daemon thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="asset-loader", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for key in list(self._entries):
+            self._load(key)
+
+    @property
+    def progress(self):
+        """
+        (finished, total) counting failed loads as finished.
+        """
+        with self._lock:
+            finished = len(set(self._loaded) | set(self.errors))
+        return finished, len(self._entries)
+
+    @property
+    def done(self):
+        finished, total = self.progress
+        return finished >= total
+
+    def report(self):
+        """
+        (key, seconds) pairs, slowest first.
+        """
+        return sorted(self.load_times.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,195 @@
+"""
+Monte Carlo balance runs on NumPy.
+
+Advances many independent one-on-one fights in lock-step, using the same
+rules and numbers as combat.py (compile_actions() columns,
+enemy_spawn_list, Player stats). The player always plays best_attack() and carries no items.
+
+    python batchsim.py -n 1000000 --seed 7
+"""
+import argparse
+import time
+
+import numpy as np
+
+from combat import (compile_actions, CLASS_STATS, Player, BOSS, enemy_spawn_list, MEAT_BONUS,
+                    BURN_DAMAGE, BURN_TURNS, POISON_DAMAGE, POISON_TURNS,
+                    ENEMY_BONUS_MAX, STATUS_CODES)
+
+CLASSES = list(CLASS_STATS)
+
+WON, LOST, STALLED = 0, 1, 2
+
+
+def _class_arrays(char_class):
+    """
+    NumPy columns (one entry per attack) of the class's compiled action
+    table, including the expected-damage values best_attack() compares.
+    """
+    table = compile_actions(char_class)
+    return {
+        "threshold": np.array(table.threshold, dtype=np.int16),
+        "damage": np.array(table.damage, dtype=np.int16),
+        "mp_cost": np.array(table.mp_cost, dtype=np.int16),
+        "hp_cost": np.array(table.hp_cost, dtype=np.int16),
+        "status": np.array(table.status, dtype=np.int8),
+        "value": np.array(table.value),
+        "value_buffed": np.array(table.value_buffed),
+    }
+
+
+def _choose(table, hp, mp, buff):
+    """
+    Vectorised best_attack(): index of the best affordable attack per fight,
+    or -1 where none is affordable.
+    """
+    usable = ((table["mp_cost"] == 0) | (mp[:, None] >= table["mp_cost"])) & \
+             ((table["hp_cost"] == 0) | (hp[:, None] > table["hp_cost"]))
+    value = np.where(buff[:, None] > 0, table["value_buffed"], table["value"])
+    value = np.where(usable, value, -1.0)
+    choice = value.argmax(axis=1)
+    choice[~usable.any(axis=1)] = -1
+    return choice
+
+
+def simulate(char_class, enemy, n, rng=None, max_turns=1000):
+    """
+    Runs n fights of char_class against one enemy given as a dict with
+    "hp" and "attack". Returns per-fight arrays: outcome (WON/LOST/STALLED),
+    turns taken and HP lost.
+    """
+    rng = np.random.default_rng(rng)
+    table = _class_arrays(char_class)
+    template = Player(char_class)
+
+    hp = np.full(n, template.hp, dtype=np.int32)
+    mp = np.full(n, template.mp, dtype=np.int32)
+    buff = np.zeros(n, dtype=np.int8)
+    enemy_hp = np.full(n, enemy["hp"], dtype=np.int32)
+    burn = np.zeros(n, dtype=np.int8)
+    poison = np.zeros(n, dtype=np.int8)
+    idx = np.arange(n)
+
+    outcome = np.full(n, STALLED, dtype=np.int8)
+    turns = np.full(n, max_turns, dtype=np.int32)
+    final_hp = np.full(n, template.hp, dtype=np.int32)
+
+    for turn in range(1, max_turns + 1):
+        if idx.size == 0:
+            break
+        m = idx.size
+        choice = _choose(table, hp, mp, buff)
+        stalled = choice < 0
+        choice[stalled] = 0
+
+        rolls = rng.integers(1, 7, size=(3, m), dtype=np.int8)
+        bonus = rng.integers(0, ENEMY_BONUS_MAX + 1, size=m, dtype=np.int16)
+        acting = ~stalled
+
+        # Player turn
+        mp -= np.where(acting, table["mp_cost"][choice], 0)
+        hp -= np.where(acting, table["hp_cost"][choice], 0)
+        hit = acting & (rolls[0] >= table["threshold"][choice])
+        buffed = hit & (buff > 0)
+        enemy_hp -= np.where(hit, table["damage"][choice] + buffed * MEAT_BONUS, 0)
+        buff -= buffed
+        status = table["status"][choice]
+        burn[hit & (status == STATUS_CODES["burn"])] = BURN_TURNS
+        poison[hit & (status == STATUS_CODES["poison"])] = POISON_TURNS
+
+        # Enemy turn
+        alive = enemy_hp > 0
+        enemy_hits = acting & alive & (rolls[1] > rolls[2])
+        hp -= np.where(enemy_hits, enemy["attack"] + bonus, 0)
+
+        # Status effects and mana regen
+        np.minimum(mp + np.where(acting, template.mana_regen, 0), template.max_mp, out=mp)
+        ticking = acting & alive & (burn > 0)
+        enemy_hp -= ticking * BURN_DAMAGE
+        burn -= ticking
+        ticking = acting & alive & (poison > 0)
+        enemy_hp -= ticking * POISON_DAMAGE
+        poison -= ticking
+
+        won = acting & (enemy_hp <= 0)
+        lost = acting & ~won & (hp <= 0)
+        done = won | lost | stalled
+        if done.any():
+            finished = idx[done]
+            outcome[finished] = np.where(won[done], WON, np.where(lost[done], LOST, STALLED))
+            turns[finished] = np.where(stalled[done], turn - 1, turn)
+            final_hp[finished] = hp[done]
+            keep = ~done
+            idx, hp, mp, buff = idx[keep], hp[keep], mp[keep], buff[keep]
+            enemy_hp, burn, poison = enemy_hp[keep], burn[keep], poison[keep]
+
+    final_hp[idx] = hp
+    hp_lost = template.hp - np.maximum(final_hp, 0)
+    return outcome, turns, hp_lost
+
+
+def summarize(outcome, turns, hp_lost):
+    """
+    Win rate plus turns-to-kill (wins only) and HP-lost histograms, indexed
+    by value.
+    """
+    n = outcome.size
+    won = outcome == WON
+    return {
+        "fights": n,
+        "win_rate": float(won.mean()) if n else 0.0,
+        "loss_rate": float((outcome == LOST).mean()) if n else 0.0,
+        "stall_rate": float((outcome == STALLED).mean()) if n else 0.0,
+        "mean_turns_to_kill": float(turns[won].mean()) if won.any() else None,
+        "mean_hp_lost": float(hp_lost.mean()) if n else 0.0,
+        "turns_to_kill_hist": np.bincount(turns[won]),
+        "hp_lost_hist": np.bincount(hp_lost),
+    }
+
+
+def sweep(n, classes=CLASSES, enemies=None, seed=None, chunk=1_000_000):
+    """
+    Runs n fights for every class/enemy pair, chunk fights at a time so that
+    10^7-fight configurations stay within a few hundred MB.
+    Returns {class: {enemy name: summary}}.
+    """
+    if enemies is None:
+        enemies = enemy_spawn_list + [BOSS]
+    rng = np.random.default_rng(seed)
+    results = {}
+    for char_class in classes:
+        results[char_class] = {}
+        for enemy in enemies:
+            parts = []
+            remaining = n
+            while remaining > 0:
+                size = min(chunk, remaining)
+                parts.append(simulate(char_class, enemy, size, rng))
+                remaining -= size
+            outcome, turns, hp_lost = (np.concatenate(column) for column in zip(*parts))
+            results[char_class][enemy["name"]] = summarize(outcome, turns, hp_lost)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance sweep")
+    parser.add_argument("-n", type=int, default=100_000, help="fights per class/enemy pair")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = sweep(args.n, seed=args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'class':8} {'enemy':11} {'win':>7} {'turns':>6} {'hp lost':>8}")
+    for char_class, by_enemy in results.items():
+        for name, s in by_enemy.items():
+            turns = s["mean_turns_to_kill"]
+            turns = f"{turns:6.2f}" if turns is not None else "     -"
+            print(f"{char_class:8} {name:11} {s['win_rate']:7.2%} {turns} {s['mean_hp_lost']:8.1f}")
+    fights = args.n * sum(len(by_enemy) for by_enemy in results.values())
+    print(f"{fights} fights in {elapsed:.2f}s ({fights / elapsed:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Draws the battle screen.
+
+BattleView.draw() paints one full frame of a battle (enemy, player bars,
+action menu, inventory, buff, win chance, dice and the last message) onto
+the screen it was given; game.battle_screen() calls it every frame and
+bench.py times the same code. Layout follows the screen size.
+"""
+from collections import Counter
+
+import pygame
+
+from profiler import Profiler
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+YELLOW = (255, 255, 0)
+CYAN = (0, 255, 255)
+GREY = (100, 100, 100)
+BLUE = (0, 100, 255)
+SPRITE_SIZE = 64
+ITEM_ICON_SIZE = 32
+
+
+class BattleView:
+    def __init__(self, screen, text_cache, font, sprites, profiler=None,
+                 sprite_size=SPRITE_SIZE, icon_size=ITEM_ICON_SIZE):
+        self.screen = screen
+        self.text_cache = text_cache
+        self.font = font
+        self.sprites = sprites
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.sprite_size = sprite_size
+        self.icon_size = icon_size
+
+    def text(self, text, x, y, color=WHITE):
+        for surface in self.text_cache.render_lines(self.font, text, color):
+            self.screen.blit(surface, (x, y))
+            y += self.font.get_linesize()
+
+    def bar(self, x, y, current, maximum, color, back, width=100, height=15):
+        pygame.draw.rect(self.screen, back, (x, y, width, height))
+        pygame.draw.rect(self.screen, color, (x, y, max(0, int(width * current / maximum)), height))
+
+    def dice(self, x, y, value):
+        if 1 <= value <= 6:
+            self.screen.blit(self.sprites.get("dice", value, self.sprite_size), (x, y))
+
+    def enemy_icon(self, enemy, x, y):
+        with self.profiler.scope("show_enemy_icon"):
+            # วาดภาพศัตรู
+            if self.sprites.has("enemies", enemy.name):
+                self.screen.blit(self.sprites.get("enemies", enemy.name, self.sprite_size), (x + 16, y + 16))
+
+            # แสดงสถานะผิดปกติ
+            if enemy.burn_turns > 0:
+                self.text("🔥", x + 80, y + 20, RED)
+            if enemy.poison_turns > 0:
+                self.text("💀", x + 80, y + 40, GREEN)
+
+    def draw(self, enemy, player, menu, inventory, buff_turns, win_chance,
+             dice=(None, None, None), message=""):
+        """
+        One frame. dice is (player roll, enemy roll, dodge roll), None for
+        a roll not made this turn; inventory is the list of item names.
+        """
+        width, height = self.screen.get_size()
+        enemy_x, enemy_y = 50, 50
+        player_x, player_y = width - 300, 50
+        menu_x, menu_y = 50, height - 330
+        message_x, message_y = 50, height - 150
+        dice_x, dice_y = width - 250, height - 250
+
+        self.screen.fill(BLACK)
+
+        # Enemy Info
+        self.enemy_icon(enemy, enemy_x, enemy_y)
+        self.text(f"Enemy: {enemy.name}", enemy_x, enemy_y + 90, RED)
+        self.text(f"HP: {enemy.hp}", enemy_x, enemy_y + 120, RED)
+
+        # Player Info
+        self.text(f"Player HP: {player.hp}/{player.max_hp}", player_x, player_y, GREEN)
+        self.bar(player_x, player_y + 30, player.hp, player.max_hp, GREEN, RED)
+        self.text(f"Player MP: {player.mp}/{player.max_mp}", player_x, player_y + 60, BLUE)
+        self.bar(player_x, player_y + 90, player.mp, player.max_mp, BLUE, GREY, height=10)
+
+        with self.profiler.scope("battle.menu"):
+            # Action Menu
+            self.text("Actions:", menu_x, menu_y - 30)
+            for i, line in enumerate(menu):
+                self.text(line, menu_x, menu_y + i * 30)
+
+        with self.profiler.scope("battle.inventory"):
+            # --- แสดง Inventory เหมือนในฉากสำรวจ ---
+            self.text("Inventory:", player_x, player_y + 120 + 70, CYAN)
+            item_x = player_x
+            item_y = player_y + 150 + 70
+            for item, count in Counter(inventory).items():
+                if self.sprites.has("items", item):
+                    self.screen.blit(self.sprites.get("items", item, self.icon_size), (item_x, item_y))
+                    self.text(f"x{count}", item_x + 35, item_y + 5)
+                    item_x += 100
+        self.text(f"Damage buff turns left: {buff_turns}", player_x, player_y + 200 + 70, YELLOW)
+        self.text(f"Win chance: {win_chance:.0%}", player_x, player_y + 230 + 70, CYAN)
+
+        # Dice Rolls
+        for (label, value), offset in zip(zip(("Your", "Enemy", "Dodge"), dice), (0, 100, 200)):
+            if value is not None:
+                self.text(f"{label} Roll: {value}", dice_x, dice_y + offset - 30, YELLOW)
+                self.dice(dice_x, dice_y + offset, value)
+
+        if message:
+            self.text(message, message_x, message_y)
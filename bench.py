@@ -0,0 +1,325 @@
+"""
+Benchmarks for dungeon generation, combat, rendering and the agent
+environments (env.py), with baselines.
+
+Each benchmark reports a rate (dungeons, turns or frames per second; the
+best of a few timed rounds). Rendering draws the exploration and battle
+screens the way game.py does, through MapRenderer, TextCache and
+SpriteAtlas, onto an offscreen surface at each resolution; SDL's dummy
+video driver is used when no other is set, so it runs on a headless Linux
+box.
+
+Results are compared against a JSON baseline and any rate that fell by
+more than its threshold counts as a regression (exit status 1):
+
+    python bench.py                      # run all, compare with bench_baseline.json
+    python bench.py --only render        # names starting with "render"
+    python bench.py --save               # store these results as the new baseline
+    python bench.py --json results.json  # also write this run's results
+
+Baselines only mean something on the machine that recorded them.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from combat import Player, Enemy, BattleState, resolve_turn, best_attack, use_item, enemy_spawn_list
+from dungeon import DungeonGrid
+from genbatch import layout_summary
+from session import GameSession
+
+BASELINE_PATH = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+RENDER_THRESHOLD = 0.35  # เวลาวาดแกว่งมากกว่างานที่ใช้แต่ CPU
+RESOLUTIONS = [(800, 600), (1280, 720), (1920, 1080)]
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit, threshold=DEFAULT_THRESHOLD):
+    """
+    Registers fn as benchmark name. fn(rounds) does rounds units of work
+    and returns how many it did.
+    """
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit, threshold)
+        return fn
+    return register
+
+
+def measure(fn, min_time=0.3, repeats=3):
+    """
+    Best rate of fn over repeats rounds, each grown until it takes at
+    least min_time seconds.
+    """
+    best = 0.0
+    rounds = 1
+    for _ in range(repeats):
+        while True:
+            start = time.perf_counter()
+            done = fn(rounds)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            rounds = max(rounds * 2, int(rounds * min_time / max(elapsed, 1e-9)))
+        best = max(best, done / elapsed)
+    return best
+
+
+# --- สร้างดันเจี้ยน ---
+@benchmark("dungeon.new_run", "dungeons/s")
+def bench_new_run(rounds):
+    # สิ่งที่ create_new_dungeon() ทำ ยกเว้นการปรับขนาดแผนที่บนจอ
+    session = GameSession(seed=1)
+    for _ in range(rounds):
+        session.new_run()
+        session.dungeon_map.chunk_at(0, 0)
+    return rounds
+
+
+@benchmark("dungeon.generate_64x64", "dungeons/s")
+def bench_generate_large(rounds):
+    for seed in range(rounds):
+        layout_summary(DungeonGrid(64, 64, seed=seed))
+    return rounds
+
+
+# --- การต่อสู้ ---
+@benchmark("combat.resolve_turn", "turns/s")
+def bench_resolve_turn(rounds):
+    rng = random.Random(1)
+    classes = ["Warrior", "Mage", "Rogue"]
+    turns = 0
+    fight = 0
+    while turns < rounds:
+        spec = enemy_spawn_list[fight % len(enemy_spawn_list)]
+        enemies = [Enemy(spec["name"], spec["hp"], spec["attack"]) for _ in range(3)]
+        state = BattleState(Player(classes[fight % 3]), enemies, ["Potion", "Meat", "Mana Potion"])
+        fight += 1
+        while not state.won and not state.lost and turns < rounds:
+            action = best_attack(state)
+            if action is None:
+                break
+            resolve_turn(state, action, rng)
+            turns += 1
+    return turns
+
+
+@benchmark("combat.use_item", "items/s")
+def bench_use_item(rounds):
+    state = BattleState(Player("Warrior"), [Enemy("Goblin", 40, 10)])
+    player = state.player
+    for _ in range(rounds):
+        player.hp = 1
+        state.inventory.append("Potion")
+        use_item(state, "Potion")
+    return rounds
+
+
+# --- สภาพแวดล้อมสำหรับฝึกเอเจนต์ (ต้องใช้ NumPy จึง import ตอนรัน) ---
+VECTOR_GAMES = 1024
+
+
+@benchmark("env.step", "steps/s")
+def bench_env_step(rounds):
+    from env import DiceDungeonsEnv
+    rng = random.Random(1)
+    env = DiceDungeonsEnv("Warrior")
+    env.reset(seed=1)
+    for _ in range(rounds):
+        actions = [i for i, ok in enumerate(env.action_mask()) if ok]
+        _, _, terminated, truncated, _ = env.step(rng.choice(actions))
+        if terminated or truncated:
+            env.reset()
+    return rounds
+
+
+@benchmark("env.vector_step", "game steps/s")
+def bench_vector_step(rounds):
+    import numpy as np
+    from env import VectorEnv
+    rng = np.random.default_rng(1)
+    env = VectorEnv(VECTOR_GAMES, "Warrior", seed=1)
+    env.reset()
+    steps = -(-rounds // VECTOR_GAMES)
+    for _ in range(steps):
+        mask = env.action_mask()
+        env.step(np.where(mask, rng.random(mask.shape), -1.0).argmax(axis=1))
+    return steps * VECTOR_GAMES
+
+
+# --- การวาดบนพื้นผิวนอกจอ ---
+_render_env = {}
+
+
+def _render_setup():
+    """
+    pygame with a tiny display (needed for convert()), the game's fonts
+    and a sprite atlas with the game's images.
+    """
+    if _render_env:
+        return _render_env
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from sprites import SpriteAtlas
+    from textcache import TextCache
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))
+    sprites = SpriteAtlas()
+    for group, name, path in [
+        ("players", "Warrior", "assets/players/warrior.png"),
+        ("enemies", "Goblin", "assets/enemies/goblin.png"),
+        ("items", "Potion", "assets/items/potion.png"),
+        ("items", "Key", "assets/items/key.png"),
+        *(("dice", i, f"assets/dice_{i}.png") for i in range(1, 7)),
+    ]:
+        sprites.load(group, name, path, fallback=lambda: pygame.Surface((64, 64)))
+    _render_env.update(pygame=pygame, sprites=sprites, text_cache=TextCache(),
+                       font_main=pygame.font.Font(None, 36),
+                       font_ui=pygame.font.SysFont("arial", 24))
+    return _render_env
+
+
+def _exploration_frames(size, full):
+    def run(rounds):
+        env = _render_setup()
+        pygame = env["pygame"]
+        from maprender import MapRenderer
+        screen = pygame.Surface(size).convert()
+        map_view = MapRenderer(screen, env["text_cache"], env["font_ui"])
+        grid = DungeonGrid(seed=1)
+        player_image = env["sprites"].get("players", "Warrior", 64)
+        spots = [[0, 0], [1, 0]]
+        for frame in range(rounds):
+            pos = spots[frame % 2]
+            if full:
+                map_view.invalidate()
+            else:
+                map_view.mark_tile(pos)
+            map_view.draw_map(grid, pos, player_image)
+            map_view.text("mode", "Exploration Mode", 20, 20, (255, 255, 255))
+            map_view.text("hp", f"HP: {100 + frame % 2}/150", 20, 50, (0, 255, 0))
+            map_view.text("mp", "MP: 20/20", 20, 80, (0, 100, 255))
+            map_view.text("keys", "Keys: 0/3", size[0] - 200, 20, (255, 255, 0))
+            map_view.flush()
+        return rounds
+    return run
+
+
+def _battle_frames(size):
+    def run(rounds):
+        env = _render_setup()
+        from battleview import BattleView
+        from combat import Enemy, Player, compile_actions
+        screen = env["pygame"].Surface(size).convert()
+        view = BattleView(screen, env["text_cache"], env["font_ui"], env["sprites"])
+        enemy = Enemy("Goblin", 30, 10)
+        player = Player("Warrior")
+        menu = compile_actions("Warrior").menu
+        message = "Your Normal Attack hits for 10 damage!\nEnemy hits you for 10 damage!"
+        for frame in range(rounds):
+            player.hp = 100 + frame % 2
+            view.draw(enemy, player, menu, ["Potion", "Key", "Key"], 0, 0.5,
+                      (frame % 6 + 1, None, None), message)
+        return rounds
+    return run
+
+
+for _w, _h in RESOLUTIONS:
+    benchmark(f"render.exploration_full.{_w}x{_h}", "frames/s", RENDER_THRESHOLD)(
+        _exploration_frames((_w, _h), full=True))
+    benchmark(f"render.exploration_step.{_w}x{_h}", "frames/s", RENDER_THRESHOLD)(
+        _exploration_frames((_w, _h), full=False))
+    benchmark(f"render.battle.{_w}x{_h}", "frames/s", RENDER_THRESHOLD)(_battle_frames((_w, _h)))
+
+
+# --- เทียบกับ baseline ---
+def run_benchmarks(names, min_time=0.3, repeats=3, log=print):
+    results = {}
+    for name in names:
+        fn, unit, threshold = BENCHMARKS[name]
+        rate = measure(fn, min_time, repeats)
+        results[name] = {"rate": rate, "unit": unit, "threshold": threshold}
+        if log is not None:
+            log(f"{name:36} {rate:14,.1f} {unit}")
+    return results
+
+
+def compare(results, baseline):
+    """
+    Names whose rate fell below the baseline by more than the threshold
+    stored with the baseline entry, as (name, rate, baseline rate).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        if result["rate"] < base["rate"] * (1 - base.get("threshold", DEFAULT_THRESHOLD)):
+            regressions.append((name, result["rate"], base["rate"]))
+    return regressions
+
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Dice Dungeons benchmarks")
+    parser.add_argument("--only", action="append", default=None, metavar="PREFIX",
+                        help="run benchmarks whose name starts with PREFIX (repeatable)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--json", metavar="PATH", default=None, help="also write the results here")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds per timed round")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS
+             if args.only is None or any(name.startswith(prefix) for prefix in args.only)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    results = run_benchmarks(names, args.min_time, args.repeats)
+    report = {"version": 1, "machine": machine(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save:
+        # เก็บผลเดิมของชุดที่ไม่ได้รันรอบนี้ไว้
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                old = json.load(f)
+            report["results"] = {**old.get("results", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save to record one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != report["machine"]:
+        print("note: the baseline was recorded on a different machine or Python")
+    regressions = compare(results, baseline)
+    for name, rate, base in regressions:
+        print(f"REGRESSION {name}: {rate:,.1f} vs baseline {base:,.1f} ({rate / base - 1:+.0%})")
+    if not regressions:
+        print(f"no regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""
+Combat rules for Dice Dungeons, free of pygame.
+
+battle_screen() in game.py feeds key presses into resolve_turn() and draws
+the events it returns; simulations call the same function in a tight loop.
+
+Classes are data: CLASS_STATS holds the starting stats and CLASS_ATTACKS
+the three attacks. compile_actions() turns a class into an ActionTable
+with the dispatch from action number to resolver, the battle menu lines,
+and column tuples of the attack numbers for greedy_action() and the NumPy
+simulation in batchsim.py. A new class needs only rows in both tables.
+"""
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+# --- ค่าคงที่ของการต่อสู้ ---
+MEAT_BONUS = 10
+MEAT_TURNS = 3
+BURN_DAMAGE = 7
+BURN_TURNS = 4
+POISON_DAMAGE = 10
+POISON_TURNS = 3
+ENEMY_BONUS_MAX = 5
+POTION_HEAL = 30
+MANA_POTION_GAIN = 20
+
+# --- Actions (ตรงกับปุ่ม 1-6 ในหน้าต่อสู้) ---
+ATTACK_1 = 1
+ATTACK_2 = 2
+ATTACK_3 = 3
+USE_POTION = 4
+USE_MEAT = 5
+USE_MANA_POTION = 6
+
+ITEM_ACTIONS = {
+    USE_POTION: "Potion",
+    USE_MEAT: "Meat",
+    USE_MANA_POTION: "Mana Potion",
+}
+
+Attack = namedtuple("Attack", "name threshold damage mp_cost hp_cost status hit_text miss_text")
+
+CLASS_ATTACKS = {
+    "Warrior": {
+        ATTACK_1: Attack("Normal Attack", 2, 10, 0, 0, None,
+                         "You hit {enemy} for {damage} damage!", "Your attack missed!"),
+        ATTACK_2: Attack("Heavy Attack", 3, 50, 0, 5, None,
+                         "You perform a Heavy Attack and hit {enemy} for {damage} damage!", "Your Heavy Attack missed!"),
+        ATTACK_3: Attack("Special Attack", 5, 70, 0, 0, None,
+                         "You perform a Special Attack and hit {enemy} for {damage} damage!", "Your Special Attack missed!"),
+    },
+    "Mage": {
+        ATTACK_1: Attack("Magic Attack", 2, 20, 10, 0, None,
+                         "You cast Magic Attack and hit {enemy} for {damage} damage!", "Your Magic Attack missed!"),
+        ATTACK_2: Attack("Special Magic", 4, 60, 35, 0, None,
+                         "You cast Special Magic and hit {enemy} for {damage} damage!", "Your Special Magic missed!"),
+        ATTACK_3: Attack("Fire Magic", 4, 40, 20, 0, "burn",
+                         "You cast Fire Magic! {enemy} is now burning!", "Your Fire Magic missed!"),
+    },
+    "Rogue": {
+        ATTACK_1: Attack("Normal Attack", 2, 35, 0, 0, None,
+                         "You hit {enemy} for {damage} damage!", "Your attack missed!"),
+        ATTACK_2: Attack("Quick Attack", 1, 10, 0, 0, None,
+                         "You perform a Quick Attack and hit {enemy} for {damage} damage!", ""),
+        ATTACK_3: Attack("Poison Attack", 4, 30, 0, 0, "poison",
+                         "You perform a Poison Attack! {enemy} is now poisoned!", "Your Poison Attack missed!"),
+    },
+}
+
+ClassStats = namedtuple("ClassStats", "hp mp attack magic mana_regen")
+
+CLASS_STATS = {
+    "Warrior": ClassStats(150, 20, 15, 5, 5),
+    "Mage": ClassStats(80, 80, 5, 20, 5),
+    "Rogue": ClassStats(90, 40, 12, 8, 5),
+}
+DEFAULT_STATS = ClassStats(100, 30, 10, 10, 5)
+
+STATUS_CODES = {None: 0, "burn": 1, "poison": 2}
+STATUS_DOT = {None: (0, 0), "burn": (BURN_DAMAGE, BURN_TURNS), "poison": (POISON_DAMAGE, POISON_TURNS)}
+
+# --- กำหนดโอกาสเกิดของศัตรู (เป็นเปอร์เซ็นต์) ---
+enemy_spawn_list = [
+    {"name": "Goblin", "hp": 40, "attack": 10, "weight": 40},
+    {"name": "Skeleton", "hp": 30, "attack": 20, "weight": 30},
+    {"name": "Orc", "hp": 50, "attack": 30, "weight": 10},
+    {"name": "Ghost", "hp": 30, "attack": 25, "weight": 15},
+    {"name": "Dragon", "hp": 100, "attack": 40, "weight": 5}
+]
+
+BOSS = {"name": "BOSS DEMON", "hp": 120, "attack": 25}
+
+# --- Player Class ---
+class Player:
+    def __init__(self, char_class):
+        self.char_class = char_class
+        stats = CLASS_STATS.get(char_class, DEFAULT_STATS)
+        self.hp = stats.hp
+        self.mp = stats.mp
+        self.attack = stats.attack
+        self.magic = stats.magic
+        self.mana_regen = stats.mana_regen
+
+        self.max_hp = self.hp
+        self.max_mp = self.mp
+
+    def regen_mana(self):
+        self.mp = min(self.max_mp, self.mp + self.mana_regen)
+
+# --- Enemy Class ---
+class Enemy:
+    __slots__ = ("name", "hp", "attack", "poison_turns", "burn_turns")
+
+    def __init__(self, name, hp, attack):
+        self.name = name
+        self.hp = hp
+        self.attack = attack
+        self.poison_turns = 0
+        self.burn_turns = 0
+
+# --- สถานะการต่อสู้ ---
+class BattleState:
+    """
+    The player, the room's enemies and the buffs in play for one fight.
+    Player.hp/mp are the authoritative values while the fight runs.
+    """
+    def __init__(self, player, enemies, inventory=None, meat_buff_turns=0, enemy_index=0):
+        self.player = player
+        self.enemies = enemies
+        self.inventory = inventory if inventory is not None else []
+        self.meat_buff_turns = meat_buff_turns
+        self.enemy_index = enemy_index
+
+    @property
+    def enemy(self):
+        if self.enemy_index < len(self.enemies):
+            return self.enemies[self.enemy_index]
+        return None
+
+    @property
+    def won(self):
+        return self.enemy_index >= len(self.enemies)
+
+    @property
+    def lost(self):
+        return self.player.hp <= 0
+
+def can_use(player, attack):
+    if attack.mp_cost and player.mp < attack.mp_cost:
+        return False
+    if attack.hp_cost and player.hp <= attack.hp_cost:
+        return False
+    return True
+
+def use_item(state, item_name):
+    """
+    Applies an inventory item and returns the message to show.
+    """
+    player = state.player
+    inventory = state.inventory
+    if item_name == "Potion":
+        if "Potion" in inventory:
+            if player.hp < player.max_hp:
+                player.hp = min(player.hp + POTION_HEAL, player.max_hp)
+                inventory.remove("Potion")
+                return f"🧪 Used Potion! +{POTION_HEAL} HP"
+            else:
+                return f"💬 HP already full!"
+        else:
+            return f"❌ No Potion!"
+
+    elif item_name == "Mana Potion":
+        if "Mana Potion" in inventory:
+            if player.mp < player.max_mp:
+                player.mp = min(player.mp + MANA_POTION_GAIN, player.max_mp)
+                inventory.remove("Mana Potion")
+                return f"✨ Used Mana Potion! +{MANA_POTION_GAIN} MP"
+            else:
+                return f"💬 MP already full!"
+        else:
+            return f"❌ No Mana Potion!"
+
+    elif item_name == "Meat":
+        if "Meat" in inventory:
+            state.meat_buff_turns = MEAT_TURNS
+            inventory.remove("Meat")
+            return f"🍖 Used Meat! +{MEAT_BONUS} Damage {MEAT_TURNS} turns"
+        else:
+            return f"❌ No Meat!"
+    return ""
+
+# --- ตารางการกระทำที่คอมไพล์แล้ว ---
+ActionTable = namedtuple("ActionTable", "char_class dispatch menu actions threshold damage mp_cost hp_cost "
+                                        "status value value_buffed")
+
+
+def attack_label(action, attack):
+    """
+    Battle menu line for an attack, e.g. "2) Heavy Attack (DMG 50, roll >= 3, -5 HP)".
+    """
+    parts = [f"DMG {attack.damage}", f"roll >= {attack.threshold}"]
+    if attack.hp_cost:
+        parts.append(f"-{attack.hp_cost} HP")
+    if attack.mp_cost:
+        parts.append(f"-{attack.mp_cost} MP")
+    if attack.status:
+        parts.append(attack.status.capitalize())
+    return f"{action}) {attack.name} ({', '.join(parts)})"
+
+
+@lru_cache(maxsize=None)
+def compile_actions(char_class):
+    """
+    The ActionTable of a class: dispatch maps action 1-6 to (resolver,
+    argument), menu holds the menu line of each action in order, and the
+    remaining fields are per-attack columns (value and value_buffed are the
+    expected damage greedy_action() compares). Call
+    compile_actions.cache_clear() after changing CLASS_ATTACKS at runtime.
+    """
+    attacks = CLASS_ATTACKS.get(char_class, {})
+    dispatch = {action: (_resolve_attack, attack) for action, attack in attacks.items()}
+    dispatch.update({action: (_resolve_item, item) for action, item in ITEM_ACTIONS.items()})
+    menu = [attack_label(action, attack) for action, attack in attacks.items()]
+    menu += [f"{action}) Use {item}" for action, item in ITEM_ACTIONS.items()]
+
+    hit = [(7 - a.threshold) / 6 for a in attacks.values()]
+    dot = [STATUS_DOT[a.status] for a in attacks.values()]
+    return ActionTable(
+        char_class, dispatch, tuple(menu), tuple(attacks),
+        tuple(a.threshold for a in attacks.values()),
+        tuple(a.damage for a in attacks.values()),
+        tuple(a.mp_cost for a in attacks.values()),
+        tuple(a.hp_cost for a in attacks.values()),
+        tuple(STATUS_CODES[a.status] for a in attacks.values()),
+        tuple(p * a.damage + p * d[0] * d[1] for p, a, d in zip(hit, attacks.values(), dot)),
+        tuple(p * (a.damage + MEAT_BONUS) + p * d[0] * d[1] for p, a, d in zip(hit, attacks.values(), dot)),
+    )
+
+def _resolve_item(state, item_name, rng, events):
+    events.append(("item", use_item(state, item_name)))
+    return True
+
+def _resolve_attack(state, attack, rng, events):
+    """
+    The player's half of an attack turn. Returns False when the attack
+    could not be paid for, which skips the enemy's turn.
+    """
+    player = state.player
+    enemy = state.enemy
+    if not can_use(player, attack):
+        events.append(("no_resource", attack))
+        return False
+
+    roll = rng.randint(1, 6)
+    events.append(("player_roll", roll))
+    player.mp -= attack.mp_cost
+    player.hp -= attack.hp_cost
+    if roll >= attack.threshold:
+        damage = attack.damage
+        if state.meat_buff_turns > 0:
+            damage += MEAT_BONUS
+            state.meat_buff_turns -= 1
+        enemy.hp -= damage
+        if attack.status == "burn":
+            enemy.burn_turns = BURN_TURNS
+        elif attack.status == "poison":
+            enemy.poison_turns = POISON_TURNS
+        events.append(("hit", attack, damage, enemy.name))
+    else:
+        events.append(("miss", attack))
+    return True
+
+def _enemy_defeated(state, enemy, events):
+    events.append(("enemy_defeated", enemy.name))
+    state.enemy_index += 1
+    if state.enemy_index < len(state.enemies):
+        events.append(("new_enemy", state.enemies[state.enemy_index].name))
+
+def resolve_turn(state, action, rng=random):
+    """
+    Plays one player action (1-6) plus the enemy's reply and status ticks.
+
+    Mutates and returns state together with a list of event tuples such as
+    ("hit", attack, damage, enemy_name); describe_event() turns them into
+    the messages battle_screen() shows. Actions that cost nothing because
+    they could not be performed leave the enemy's turn unplayed.
+    """
+    events = []
+    enemy = state.enemy
+    if enemy is None or state.player.hp <= 0:
+        return state, events
+    player = state.player
+
+    entry = compile_actions(player.char_class).dispatch.get(action)
+    if entry is None:
+        return state, events
+    resolver, argument = entry
+    if not resolver(state, argument, rng, events):
+        return state, events
+
+    # Enemy turn
+    if enemy.hp <= 0:
+        _enemy_defeated(state, enemy, events)
+    else:
+        enemy_roll = rng.randint(1, 6)
+        dodge_roll = rng.randint(1, 6)
+        events.append(("enemy_roll", enemy_roll))
+        events.append(("dodge_roll", dodge_roll))
+        if enemy_roll > dodge_roll:
+            damage_to_player = enemy.attack + rng.randint(0, ENEMY_BONUS_MAX)
+            player.hp -= damage_to_player
+            events.append(("enemy_hit", damage_to_player))
+        else:
+            events.append(("dodged",))
+
+    # Apply status effects and regen mana
+    player.regen_mana()
+
+    if enemy.hp > 0:
+        if enemy.burn_turns > 0:
+            enemy.hp -= BURN_DAMAGE
+            enemy.burn_turns -= 1
+            events.append(("burn", BURN_DAMAGE, enemy.name))
+
+        if enemy.poison_turns > 0:
+            enemy.hp -= POISON_DAMAGE
+            enemy.poison_turns -= 1
+            events.append(("poison", POISON_DAMAGE, enemy.name))
+
+        if enemy.hp <= 0:
+            _enemy_defeated(state, enemy, events)
+
+    return state, events
+
+def describe_event(event):
+    """
+    Returns the battle log line for an event, or None for dice rolls.
+    """
+    kind = event[0]
+    if kind == "hit":
+        _, attack, damage, enemy_name = event
+        return attack.hit_text.format(enemy=enemy_name, damage=damage)
+    if kind == "miss":
+        return event[1].miss_text
+    if kind == "no_resource":
+        attack = event[1]
+        resource = "MP" if attack.mp_cost else "HP"
+        return f"Not enough {resource} for {attack.name}!"
+    if kind == "item":
+        return event[1]
+    if kind == "enemy_hit":
+        return f"Enemy hits you for {event[1]} damage!"
+    if kind == "dodged":
+        return "You dodged the enemy attack!"
+    if kind == "burn":
+        return f"🔥 Burn deals {event[1]} damage to {event[2]}!"
+    if kind == "poison":
+        return f"💀 Poison deals {event[1]} damage to {event[2]}!"
+    if kind == "enemy_defeated":
+        return f"You defeated {event[1]}!"
+    if kind == "new_enemy":
+        return f"New enemy: {event[1]}"
+    return None
+
+# --- นโยบายสำหรับการจำลอง ---
+def greedy_action(char_class, hp, mp, meat_buff_turns):
+    """
+    The affordable attack with the highest expected damage, or None when
+    the player cannot attack at all (e.g. a Mage out of MP).
+    """
+    table = compile_actions(char_class)
+    values = table.value_buffed if meat_buff_turns > 0 else table.value
+    best, best_value = None, -1.0
+    for action, value, mp_cost, hp_cost in zip(table.actions, values, table.mp_cost, table.hp_cost):
+        if mp_cost and mp < mp_cost:
+            continue
+        if hp_cost and hp <= hp_cost:
+            continue
+        if value > best_value:
+            best, best_value = action, value
+    return best
+
+def best_attack(state):
+    """
+    Battle policy for run_battle(): greedy_action() on the current state.
+    """
+    player = state.player
+    return greedy_action(player.char_class, player.hp, player.mp, state.meat_buff_turns)
+
+def run_battle(state, policy=best_attack, rng=random, max_turns=1000):
+    """
+    Fights until the room is cleared, the player dies or the policy gives up.
+    Returns (outcome, turns) where outcome is "won", "lost" or "stalled".
+    """
+    turns = 0
+    while turns < max_turns:
+        if state.won:
+            return "won", turns
+        if state.lost:
+            return "lost", turns
+        action = policy(state)
+        if action is None:
+            return "stalled", turns
+        resolve_turn(state, action, rng)
+        turns += 1
+    return "stalled", turns
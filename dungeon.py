@@ -0,0 +1,356 @@
+"""
+Dungeon grid stored in fixed-size chunks of bitboards.
+
+The map is split into 8x8 chunks, so every room flag of a chunk fits in
+one 64-bit integer: bit ly * 8 + lx is the room at (lx, ly) inside the
+chunk. Each chunk has a bitboard for visited, trap, enemy and boss rooms
+and one per item type, plus a dict with the enemy handles of each enemy
+room; the enemies themselves live in the grid's EnemyPool.
+The default 8x8 dungeon is a single chunk, so questions like "unvisited
+rooms with items" or "traps left" are one or two integer operations.
+
+Chunks are generated the first time anything looks at them, each from
+its own RNG derived from the dungeon seed, so the layout does not depend
+on the order rooms are visited and memory grows with the area actually
+explored.
+
+grid[(x, y)] returns a Room view that reads and writes like the old
+per-room dicts: room["visited"], room["trap"], room["item"], room["enemy"].
+room["enemy"] reads as a list of EnemyRef views and is set with handles.
+"""
+import random
+from itertools import accumulate
+
+from combat import BOSS, enemy_spawn_list
+from enemypool import EnemyPool
+
+CHUNK = 8
+FULL = (1 << CHUNK * CHUNK) - 1
+# คอลัมน์ซ้ายสุดและขวาสุดของ chunk ใช้กันบิตล้นข้ามแถวตอนเลื่อน
+FILE_LEFT = 0x0101010101010101
+FILE_RIGHT = FILE_LEFT << (CHUNK - 1)
+
+ITEMS = [None, "Key", "Potion", "Meat", "Mana Potion"]
+ITEM_CODES = {name: code for code, name in enumerate(ITEMS)}
+# ชื่อบิตบอร์ดของไอเทมแต่ละชนิด เรียงตาม ITEMS
+ITEM_BOARDS = [None, "key", "potion", "meat", "mana_potion"]
+BOARDS = ["visited", "trap", "enemy", "boss"] + ITEM_BOARDS[1:]
+
+# สัดส่วนห้องในดันเจี้ยน 8x8 เดิม: 25 ห้องมีศัตรู และ 10 ห้องมีกับดัก จาก 63 ห้องที่ไม่ใช่ห้องบอส
+ENEMY_ROOM_FRACTION = 25 / 63
+TRAP_ROOM_FRACTION = 10 / 63
+KEY_COUNT = 3
+
+# โอกาสได้ไอเทมต่อห้อง เท่ากับการสุ่มสามรอบแบบเดิม (Potion 0.4, Meat 0.2, Mana Potion 0.4)
+# ที่รอบหลังเขียนทับรอบก่อน แต่สุ่มเพียงครั้งเดียว
+MANA_POTION_CHANCE = 0.4
+MEAT_CHANCE = (1 - 0.4) * 0.2
+POTION_CHANCE = (1 - 0.4) * (1 - 0.2) * 0.4
+
+ENEMY_NAMES = [e["name"] for e in enemy_spawn_list]
+ENEMY_CUM_WEIGHTS = list(accumulate(e["weight"] for e in enemy_spawn_list))
+ENEMY_STATS = {e["name"]: (e["hp"], e["attack"]) for e in enemy_spawn_list}
+ALL_ROOMS = list(range(CHUNK * CHUNK))
+
+
+def refresh_spawn_tables():
+    """
+    Rebuilds the tables above after combat.enemy_spawn_list was changed in
+    place, e.g. by the balance tuner.
+    """
+    ENEMY_NAMES[:] = [e["name"] for e in enemy_spawn_list]
+    ENEMY_CUM_WEIGHTS[:] = accumulate(e["weight"] for e in enemy_spawn_list)
+    ENEMY_STATS.clear()
+    ENEMY_STATS.update((e["name"], (e["hp"], e["attack"])) for e in enemy_spawn_list)
+
+
+def bit(index):
+    return 1 << index
+
+
+def neighbours(board):
+    """
+    Rooms sharing a side with any room in board, within the same chunk.
+    """
+    return (((board << 1) & ~FILE_LEFT) | ((board >> 1) & ~FILE_RIGHT)
+            | (board << CHUNK) | (board >> CHUNK)) & FULL
+
+
+def indices(board):
+    """
+    Indices of the set bits, lowest first.
+    """
+    while board:
+        low = board & -board
+        yield low.bit_length() - 1
+        board ^= low
+
+
+class Chunk:
+    __slots__ = BOARDS + ["inside", "enemies"]
+
+    def __init__(self, inside=FULL):
+        for name in BOARDS:
+            setattr(self, name, 0)
+        self.inside = inside  # ห้องที่อยู่ในแผนที่จริง (chunk ริมขอบอาจไม่เต็ม)
+        self.enemies = {}
+
+    @property
+    def items(self):
+        """
+        Rooms holding any item.
+        """
+        return self.key | self.potion | self.meat | self.mana_potion
+
+    def item_at(self, index):
+        mask = bit(index)
+        for code in range(1, len(ITEMS)):
+            if getattr(self, ITEM_BOARDS[code]) & mask:
+                return ITEMS[code]
+        return None
+
+    def set_item(self, index, name):
+        mask = bit(index)
+        for board in ITEM_BOARDS[1:]:
+            setattr(self, board, getattr(self, board) & ~mask)
+        if name is not None:
+            board = ITEM_BOARDS[ITEM_CODES[name]]
+            setattr(self, board, getattr(self, board) | mask)
+
+    def set_enemies(self, index, handles):
+        if handles:
+            self.enemies[index] = tuple(handles)
+            self.enemy |= bit(index)
+        else:
+            self.enemies.pop(index, None)
+            self.enemy &= ~bit(index)
+
+    def adjacent(self, index):
+        """
+        Rooms next to room index that lie inside this chunk and the map.
+        """
+        return neighbours(bit(index)) & self.inside
+
+
+class Room:
+    """
+    View of one room inside its chunk.
+    """
+    __slots__ = ("chunk", "index", "pos", "pool")
+
+    def __init__(self, chunk, index, pos, pool):
+        self.chunk = chunk
+        self.index = index
+        self.pos = pos
+        self.pool = pool
+
+    def __getitem__(self, key):
+        if key == "visited" or key == "trap":
+            return bool(getattr(self.chunk, key) >> self.index & 1)
+        if key == "item":
+            return self.chunk.item_at(self.index)
+        if key == "enemy":
+            return [self.pool.view(h) for h in self.chunk.enemies.get(self.index, ())]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "visited" or key == "trap":
+            board = getattr(self.chunk, key)
+            setattr(self.chunk, key, board | bit(self.index) if value else board & ~bit(self.index))
+        elif key == "item":
+            self.chunk.set_item(self.index, value)
+        elif key == "enemy":
+            self.chunk.set_enemies(self.index, value)
+        else:
+            raise KeyError(key)
+
+
+class DungeonGrid:
+    def __init__(self, width=8, height=8, rng=random, seed=None):
+        self.width = width
+        self.height = height
+        self.seed = rng.getrandbits(64) if seed is None else seed
+        self.chunks = {}
+        self.pool = EnemyPool()
+
+        # บอสและกุญแจต้องกำหนดทั้งแผนที่ก่อน ส่วนอื่นสุ่มทีละ chunk
+        layout = random.Random(self.seed)
+        self.boss_room = self._random_pos(layout)
+        self.key_rooms = set()
+        while len(self.key_rooms) < min(KEY_COUNT, width * height - 1):
+            pos = self._random_pos(layout)
+            if pos != self.boss_room:
+                self.key_rooms.add(pos)
+
+    def _random_pos(self, rng):
+        index = rng.randrange(self.width * self.height)
+        return index % self.width, index // self.width
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def __contains__(self, pos):
+        return self.in_bounds(*pos)
+
+    def chunk_at(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = self._generate(cx, cy)
+            self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def restore_chunk(self, cx, cy):
+        """
+        Empty chunk at (cx, cy) for a loader to fill in, skipping generation.
+        """
+        chunk = Chunk(self._inside(cx, cy))
+        self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def place_boss(self, pos):
+        """
+        Moves the boss flag to pos, for loaders restoring a saved map.
+        """
+        self.boss_room = pos
+        for chunk in self.chunks.values():
+            chunk.boss = 0
+        if pos is not None:
+            x, y = pos
+            chunk = self.chunks.get((x // CHUNK, y // CHUNK))
+            if chunk is not None:
+                chunk.boss = bit((y % CHUNK) * CHUNK + x % CHUNK)
+
+    def __getitem__(self, pos):
+        x, y = pos
+        if not self.in_bounds(x, y):
+            raise KeyError(pos)
+        chunk = self.chunk_at(x // CHUNK, y // CHUNK)
+        return Room(chunk, (y % CHUNK) * CHUNK + x % CHUNK, (x, y), self.pool)
+
+    def _inside(self, cx, cy):
+        """
+        Bitboard of the chunk's rooms that lie inside the map.
+        """
+        cols = min(CHUNK, self.width - cx * CHUNK)
+        rows = min(CHUNK, self.height - cy * CHUNK)
+        if cols == CHUNK and rows == CHUNK:
+            return FULL
+        row = (1 << cols) - 1
+        board = 0
+        for ly in range(rows):
+            board |= row << (ly * CHUNK)
+        return board
+
+    def _local(self, pos, cx, cy):
+        """
+        Index of pos inside chunk (cx, cy), or None if it lies elsewhere.
+        """
+        if pos is None or pos[0] // CHUNK != cx or pos[1] // CHUNK != cy:
+            return None
+        return (pos[1] % CHUNK) * CHUNK + pos[0] % CHUNK
+
+    def _generate(self, cx, cy):
+        # seed < 2**64 จึงต่อพิกัด chunk ไว้บิตสูงได้โดยไม่ชนกัน
+        rng = random.Random(self.seed | cx << 64 | cy << 96)
+        roll = rng.random
+        inside = self._inside(cx, cy)
+        chunk = Chunk(inside)
+        rooms = ALL_ROOMS if inside == FULL else list(indices(inside))
+
+        # --- วางบอส ---
+        boss = self._local(self.boss_room, cx, cy)
+        if boss is not None:
+            chunk.set_enemies(boss, [self.pool.spawn(BOSS["name"], BOSS["hp"], BOSS["attack"])])
+            chunk.boss = 1 << boss
+            empty_rooms = [index for index in rooms if index != boss]
+        else:
+            empty_rooms = rooms
+
+        # --- วางศัตรูในห้อง (1-3 ตัว) ---
+        enemy_rooms = rng.sample(empty_rooms, round(len(empty_rooms) * ENEMY_ROOM_FRACTION))
+        counts = [1 + int(roll() * 3) for _ in enemy_rooms]
+        # สุ่มชนิดศัตรูของทั้ง chunk ในครั้งเดียว แล้วแบ่งให้แต่ละห้องตามจำนวน
+        spawned_enemies = rng.choices(ENEMY_NAMES, cum_weights=ENEMY_CUM_WEIGHTS, k=sum(counts))
+        handles = self.pool.spawn_all(spawned_enemies, ENEMY_STATS)
+        start = 0
+        for index, count in zip(enemy_rooms, counts):
+            chunk.enemies[index] = tuple(handles[start:start + count])
+            chunk.enemy |= 1 << index
+            start += count
+
+        # --- วางกับดัก ---
+        trap = 0
+        for index in rng.sample(empty_rooms, round(len(empty_rooms) * TRAP_ROOM_FRACTION)):
+            trap |= 1 << index
+        chunk.trap = trap
+
+        # --- วางกุญแจ ---
+        key = 0
+        for pos in self.key_rooms:
+            index = self._local(pos, cx, cy)
+            if index is not None:
+                key |= 1 << index
+        chunk.key = key
+
+        # --- วาง Potion, Meat และ Mana Potion: สุ่มครั้งเดียวต่อห้อง ---
+        potion = meat = mana_potion = 0
+        for index in empty_rooms:
+            if key >> index & 1:
+                continue
+            r = roll()
+            if r < MANA_POTION_CHANCE:
+                mana_potion |= 1 << index
+            elif r < MANA_POTION_CHANCE + MEAT_CHANCE:
+                meat |= 1 << index
+            elif r < MANA_POTION_CHANCE + MEAT_CHANCE + POTION_CHANCE:
+                potion |= 1 << index
+        chunk.potion, chunk.meat, chunk.mana_potion = potion, meat, mana_potion
+        return chunk
+
+    def select(self, query):
+        """
+        Positions of the rooms picked by query(chunk) -> bitboard, over the
+        chunks generated so far. For example
+        grid.select(lambda c: c.items & ~c.visited) lists unvisited rooms
+        that still hold an item.
+        """
+        for (cx, cy), chunk in self.chunks.items():
+            for index in indices(query(chunk) & chunk.inside):
+                yield cx * CHUNK + index % CHUNK, cy * CHUNK + index // CHUNK
+
+    def count(self, query):
+        """
+        Number of rooms picked by query(chunk), e.g. count(lambda c: c.trap).
+        """
+        return sum((query(chunk) & chunk.inside).bit_count() for chunk in self.chunks.values())
+
+    def adjacent(self, pos):
+        """
+        In-map rooms next to pos. Neighbours inside the same chunk come
+        from one shift of the chunk's bitboard.
+        """
+        x, y = pos
+        cx, cy = x // CHUNK, y // CHUNK
+        chunk = self.chunk_at(cx, cy)
+        rooms = [(cx * CHUNK + index % CHUNK, cy * CHUNK + index // CHUNK)
+                 for index in indices(chunk.adjacent((y % CHUNK) * CHUNK + x % CHUNK))]
+        lx, ly = x % CHUNK, y % CHUNK
+        for nx, ny, edge in ((x - 1, y, lx == 0), (x + 1, y, lx == CHUNK - 1),
+                             (x, y - 1, ly == 0), (x, y + 1, ly == CHUNK - 1)):
+            if edge and self.in_bounds(nx, ny):
+                rooms.append((nx, ny))
+        return rooms
+
+    def generated_rooms(self):
+        """
+        Number of in-map rooms in chunks generated so far (chunks on the
+        right and bottom edge may be cut short by the map size).
+        """
+        return sum(chunk.inside.bit_count() for chunk in self.chunks.values())
+
+    def memory_bytes(self):
+        """
+        Rough size of the generated chunks: one 64-bit board per flag and
+        item type plus the enemy pool's columns.
+        """
+        return len(self.chunks) * len(BOARDS) * 8 + self.pool.nbytes()
@@ -0,0 +1,136 @@
+"""
+Enemies stored as parallel typed arrays indexed by handle.
+
+A dungeon can hold hundreds of thousands of enemies, so instead of one
+Enemy object each the pool keeps enemy type, HP, attack and the burn and
+poison counters in array.array columns: eight bytes per enemy. Rooms hold
+handles (plain ints). view(handle) returns an EnemyRef that reads and
+writes the arrays through the same attributes as combat.Enemy, so
+resolve_turn() and the battle screen work on pool entries directly.
+Handles of defeated enemies go back on a free list for reuse.
+"""
+from array import array
+
+
+class EnemyRef:
+    """
+    Enemy-like view of one pool entry.
+    """
+    __slots__ = ("pool", "handle")
+
+    def __init__(self, pool, handle):
+        self.pool = pool
+        self.handle = handle
+
+    @property
+    def name(self):
+        return self.pool.kinds[self.pool.kind[self.handle]]
+
+    @property
+    def hp(self):
+        return self.pool.hp[self.handle]
+
+    @hp.setter
+    def hp(self, value):
+        self.pool.hp[self.handle] = value
+
+    @property
+    def attack(self):
+        return self.pool.attack[self.handle]
+
+    @attack.setter
+    def attack(self, value):
+        self.pool.attack[self.handle] = value
+
+    @property
+    def burn_turns(self):
+        return self.pool.burn[self.handle]
+
+    @burn_turns.setter
+    def burn_turns(self, value):
+        self.pool.burn[self.handle] = value
+
+    @property
+    def poison_turns(self):
+        return self.pool.poison[self.handle]
+
+    @poison_turns.setter
+    def poison_turns(self, value):
+        self.pool.poison[self.handle] = value
+
+
+class EnemyPool:
+    def __init__(self):
+        self.kinds = []
+        self._kind_codes = {}
+        self.kind = array("H")
+        self.hp = array("h")
+        self.attack = array("h")
+        self.burn = array("B")
+        self.poison = array("B")
+        self._free = []
+
+    def spawn(self, name, hp, attack):
+        """
+        Adds an enemy and returns its handle.
+        """
+        code = self._kind_codes.get(name)
+        if code is None:
+            code = self._kind_codes[name] = len(self.kinds)
+            self.kinds.append(name)
+        if self._free:
+            handle = self._free.pop()
+            self.kind[handle] = code
+            self.hp[handle] = hp
+            self.attack[handle] = attack
+            self.burn[handle] = 0
+            self.poison[handle] = 0
+            return handle
+        self.kind.append(code)
+        self.hp.append(hp)
+        self.attack.append(attack)
+        self.burn.append(0)
+        self.poison.append(0)
+        return len(self.kind) - 1
+
+    def spawn_all(self, names, stats):
+        """
+        Adds one enemy per name, with (hp, attack) from stats[name], in one
+        pass over the columns. Returns the new handles as a range.
+        """
+        codes = []
+        for name in names:
+            code = self._kind_codes.get(name)
+            if code is None:
+                code = self._kind_codes[name] = len(self.kinds)
+                self.kinds.append(name)
+            codes.append(code)
+        start = len(self.kind)
+        self.kind.extend(codes)
+        self.hp.extend([stats[name][0] for name in names])
+        self.attack.extend([stats[name][1] for name in names])
+        self.burn.extend(bytes(len(codes)))
+        self.poison.extend(bytes(len(codes)))
+        return range(start, len(self.kind))
+
+    def free(self, handle):
+        """
+        Returns a handle to the pool. Views of it must no longer be used.
+        """
+        self._free.append(handle)
+
+    def view(self, handle):
+        return EnemyRef(self, handle)
+
+    def __len__(self):
+        """
+        Number of live enemies.
+        """
+        return len(self.kind) - len(self._free)
+
+    def nbytes(self):
+        """
+        Bytes held by the columns, including free slots.
+        """
+        return sum(column.itemsize * len(column)
+                   for column in (self.kind, self.hp, self.attack, self.burn, self.poison))
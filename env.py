@@ -0,0 +1,448 @@
+"""
+Reinforcement-learning environments for Dice Dungeons, free of pygame.
+
+DiceDungeonsEnv plays one run through session.GameSession with the
+reset()/step() signatures of gymnasium (which is not required):
+
+    env = DiceDungeonsEnv("Mage")
+    obs, info = env.reset(seed=7)
+    obs, reward, terminated, truncated, info = env.step(action)
+
+VectorEnv plays n runs in lock-step on NumPy arrays, one row per game,
+with the same actions, observations and rewards; step() takes an array of
+n actions and finished games start over at once (the returned observation
+is then the first one of the new run). Its rules are the ones of
+session.py and combat.py written out over arrays, like batchsim.py, and
+its dice come from a NumPy generator, so the two envs agree in
+distribution, not roll for roll. Dungeons are laid out over the whole
+map with dungeon.py's room fractions; for maps of one chunk (8x8 and
+smaller) that is the same layout rule DungeonGrid uses.
+
+Actions are ACTIONS[i]: the four moves, then battle actions 1-6. An
+action that means nothing in the current state (a move in battle, an
+attack while exploring, a step off the map) does nothing; action_mask()
+marks the ones that do. Observations are int32 vectors laid out as
+OBS_FIELDS.
+
+    python env.py -n 4096 --steps 2000    # random-policy throughput
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from combat import (CLASS_STATS, BOSS, enemy_spawn_list, compile_actions, MEAT_BONUS, MEAT_TURNS,
+                    BURN_DAMAGE, BURN_TURNS, POISON_DAMAGE, POISON_TURNS, ENEMY_BONUS_MAX, STATUS_CODES,
+                    POTION_HEAL, MANA_POTION_GAIN)
+from dungeon import (ITEM_CODES, ENEMY_ROOM_FRACTION, TRAP_ROOM_FRACTION, KEY_COUNT,
+                     MANA_POTION_CHANCE, MEAT_CHANCE, POTION_CHANCE)
+from session import GameSession, KEYS_NEEDED, MOVES
+
+ACTIONS = list(MOVES) + [str(action) for action in range(1, 7)]
+N_MOVES = len(MOVES)
+OBS_FIELDS = ["x", "y", "hp", "mp", "max_hp", "max_mp", "keys", "meat_buff",
+              "potions", "meat", "mana_potions", "in_battle", "enemy_kind", "enemy_hp", "enemies_left"]
+OBS_INDEX = {name: i for i, name in enumerate(OBS_FIELDS)}
+# ชนิดศัตรูในค่าสังเกต: 0 คือไม่มี, 1.. ตาม enemy_spawn_list และตัวสุดท้ายคือบอส
+ENEMY_KINDS = [e["name"] for e in enemy_spawn_list] + [BOSS["name"]]
+ENEMY_CODES = {name: code for code, name in enumerate(ENEMY_KINDS, 1)}
+INVENTORY_ITEMS = ["Potion", "Meat", "Mana Potion"]
+
+REWARDS = {"won": 1.0, "lost": -1.0, "key": 0.1, "new_room": 0.01}
+MAX_STEPS = 5000
+
+
+class DiceDungeonsEnv:
+    def __init__(self, char_class="Warrior", width=8, height=8, max_steps=MAX_STEPS, rewards=REWARDS):
+        self.char_class = char_class
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.rewards = rewards
+        self.session = GameSession(width, height)
+        self.steps = 0
+
+    def reset(self, seed=None, options=None):
+        """
+        Starts a new run with the class already chosen. A seed makes the
+        run (and the runs after it) repeatable.
+        """
+        if seed is not None:
+            self.session = GameSession(self.width, self.height, seed=seed)
+        self.session.new_run()
+        self.session.choose_class(self.char_class)
+        self.session.notices.clear()
+        self.steps = 0
+        return self.observation(), {}
+
+    def step(self, action):
+        session = self.session
+        keys = session.keys_collected
+        visited = session.dungeon_map.count(lambda chunk: chunk.visited)
+        ok = session.handle(ACTIONS[action])
+        session.notices.clear()
+        self.steps += 1
+
+        reward = self.rewards["key"] * (session.keys_collected - keys)
+        reward += self.rewards["new_room"] * (session.dungeon_map.count(lambda chunk: chunk.visited) - visited)
+        terminated = session.outcome is not None
+        if terminated:
+            reward += self.rewards[session.outcome]
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.observation(), reward, terminated, truncated, {"valid": ok, "outcome": session.outcome}
+
+    def observation(self):
+        session = self.session
+        player = session.player
+        obs = np.zeros(len(OBS_FIELDS), dtype=np.int32)
+        obs[:11] = (*session.player_pos, player.hp, player.mp, player.max_hp, player.max_mp,
+                    session.keys_collected, session.meat_buff_turns,
+                    *(session.inventory.count(item) for item in INVENTORY_ITEMS))
+        if session.state == "battle":
+            enemy = session.current_enemies[session.enemy_index]
+            obs[11:] = (1, ENEMY_CODES[enemy.name], enemy.hp,
+                        len(session.current_enemies) - session.enemy_index)
+        return obs
+
+    def action_mask(self):
+        session = self.session
+        mask = np.zeros(len(ACTIONS), dtype=bool)
+        if session.state == "battle":
+            mask[N_MOVES:] = True
+        elif session.state == "exploration":
+            x, y = session.player_pos
+            for i, (dx, dy) in enumerate(MOVES.values()):
+                mask[i] = session.dungeon_map.in_bounds(x + dx, y + dy)
+        return mask
+
+
+def _class_columns(classes):
+    """
+    Per-class stats and attack columns as arrays indexed [class] or
+    [class, attack].
+    """
+    tables = [compile_actions(name) for name in classes]
+    stats = [CLASS_STATS[name] for name in classes]
+    return {
+        "hp": np.array([s.hp for s in stats], dtype=np.int32),
+        "mp": np.array([s.mp for s in stats], dtype=np.int32),
+        "mana_regen": np.array([s.mana_regen for s in stats], dtype=np.int32),
+        "threshold": np.array([t.threshold for t in tables], dtype=np.int32),
+        "damage": np.array([t.damage for t in tables], dtype=np.int32),
+        "mp_cost": np.array([t.mp_cost for t in tables], dtype=np.int32),
+        "hp_cost": np.array([t.hp_cost for t in tables], dtype=np.int32),
+        "status": np.array([t.status for t in tables], dtype=np.int32),
+    }
+
+
+class VectorEnv:
+    """
+    n games of char_classes (one class for all, or one per game) stepped
+    together. Map state is kept as (n, width * height) arrays, room index
+    y * width + x; a room holds up to three enemies as kind codes.
+    """
+    def __init__(self, n, char_classes="Warrior", width=8, height=8, max_steps=MAX_STEPS,
+                 rewards=REWARDS, seed=None):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.rooms = width * height
+        self.max_steps = max_steps
+        self.rewards = rewards
+        self.rng = np.random.default_rng(seed)
+
+        if isinstance(char_classes, str):
+            char_classes = [char_classes] * n
+        names = list(CLASS_STATS)
+        self.class_index = np.array([names.index(name) for name in char_classes], dtype=np.int32)
+        self.table = _class_columns(names)
+        self.kind_hp = np.array([0] + [e["hp"] for e in enemy_spawn_list] + [BOSS["hp"]], dtype=np.int32)
+        self.kind_attack = np.array([0] + [e["attack"] for e in enemy_spawn_list] + [BOSS["attack"]],
+                                    dtype=np.int32)
+        weights = np.array([e["weight"] for e in enemy_spawn_list], dtype=np.float64)
+        self.kind_p = weights / weights.sum()
+
+        rooms = self.rooms
+        self.pos = np.zeros((n, 2), dtype=np.int32)
+        self.hp = np.zeros(n, dtype=np.int32)
+        self.mp = np.zeros(n, dtype=np.int32)
+        self.keys = np.zeros(n, dtype=np.int32)
+        self.buff = np.zeros(n, dtype=np.int32)
+        self.items = np.zeros((n, len(INVENTORY_ITEMS)), dtype=np.int32)
+        self.steps = np.zeros(n, dtype=np.int32)
+        self.boss = np.zeros(n, dtype=np.int32)
+        self.visited = np.zeros((n, rooms), dtype=bool)
+        self.trap = np.zeros((n, rooms), dtype=bool)
+        self.room_item = np.zeros((n, rooms), dtype=np.int8)
+        self.room_enemies = np.zeros((n, rooms, 3), dtype=np.int8)
+        # การต่อสู้ที่กำลังเล่น: ศัตรูของห้อง, ตัวที่กำลังสู้ และสถานะของมัน
+        self.in_battle = np.zeros(n, dtype=bool)
+        self.foes = np.zeros((n, 3), dtype=np.int8)
+        self.foe_count = np.zeros(n, dtype=np.int32)
+        self.foe_index = np.zeros(n, dtype=np.int32)
+        self.foe_hp = np.zeros(n, dtype=np.int32)
+        self.burn = np.zeros(n, dtype=np.int32)
+        self.poison = np.zeros(n, dtype=np.int32)
+
+    # --- เริ่มรอบใหม่ ---
+    def reset(self, seed=None, options=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_games(np.arange(self.n))
+        return self.observation(), {}
+
+    def _pick_rooms(self, m, count, exclude):
+        """
+        count distinct random rooms per game, none of them exclude[game].
+        """
+        priority = self.rng.random((m, self.rooms))
+        priority[np.arange(m), exclude] = np.inf
+        return np.argsort(priority, axis=1)[:, :count]
+
+    def _reset_games(self, games):
+        m = games.size
+        if m == 0:
+            return
+        rng = self.rng
+        rows = np.arange(m)[:, None]
+        cls = self.class_index[games]
+        self.pos[games] = 0
+        self.hp[games] = self.table["hp"][cls]
+        self.mp[games] = self.table["mp"][cls]
+        self.keys[games] = 0
+        self.buff[games] = 0
+        self.items[games] = 0
+        self.steps[games] = 0
+        self.in_battle[games] = False
+
+        # ห้องบอสและกุญแจ แล้วห้องศัตรูและกับดักสุ่มจากห้องที่ไม่ใช่ห้องบอส
+        boss = rng.integers(self.rooms, size=m)
+        empty = self.rooms - 1
+        key_rooms = self._pick_rooms(m, min(KEY_COUNT, empty), boss)
+        enemy_rooms = self._pick_rooms(m, round(empty * ENEMY_ROOM_FRACTION), boss)
+        trap_rooms = self._pick_rooms(m, round(empty * TRAP_ROOM_FRACTION), boss)
+
+        enemies = np.zeros((m, self.rooms, 3), dtype=np.int8)
+        counts = rng.integers(1, 4, size=enemy_rooms.shape)
+        kinds = rng.choice(len(self.kind_p), size=enemy_rooms.shape + (3,), p=self.kind_p) + 1
+        kinds[np.arange(3) >= counts[..., None]] = 0
+        enemies[rows, enemy_rooms] = kinds
+        enemies[np.arange(m), boss] = (ENEMY_CODES[BOSS["name"]], 0, 0)
+
+        roll = rng.random((m, self.rooms))
+        room_item = np.select(
+            [roll < MANA_POTION_CHANCE, roll < MANA_POTION_CHANCE + MEAT_CHANCE,
+             roll < MANA_POTION_CHANCE + MEAT_CHANCE + POTION_CHANCE],
+            [ITEM_CODES["Mana Potion"], ITEM_CODES["Meat"], ITEM_CODES["Potion"]], 0).astype(np.int8)
+        room_item[np.arange(m), boss] = 0
+        room_item[rows, key_rooms] = ITEM_CODES["Key"]
+
+        trap = np.zeros((m, self.rooms), dtype=bool)
+        trap[rows, trap_rooms] = True
+        visited = np.zeros((m, self.rooms), dtype=bool)
+        visited[:, 0] = True  # ห้องเริ่มต้นนับว่าไปมาแล้ว เหมือน choose_class()
+
+        self.boss[games] = boss
+        self.room_enemies[games] = enemies
+        self.room_item[games] = room_item
+        self.trap[games] = trap
+        self.visited[games] = visited
+
+    # --- เดินหนึ่งก้าวของทุกเกม ---
+    def step(self, actions):
+        """
+        Applies actions (one per game). Returns (observations, rewards,
+        terminated, truncated, info); info["outcome"] holds 1 for games won
+        this step, -1 for games lost and 0 otherwise.
+        """
+        actions = np.asarray(actions)
+        reward = np.zeros(self.n, dtype=np.float64)
+        outcome = np.zeros(self.n, dtype=np.int8)
+        self.steps += 1
+        self._explore(actions, reward)
+        self._fight(actions, reward, outcome)
+
+        reward += np.where(outcome == 1, self.rewards["won"], 0.0)
+        reward += np.where(outcome == -1, self.rewards["lost"], 0.0)
+        terminated = outcome != 0
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        self._reset_games(np.flatnonzero(terminated | truncated))
+        return self.observation(), reward, terminated, truncated, {"outcome": outcome}
+
+    def _explore(self, actions, reward):
+        move = ~self.in_battle & (actions < N_MOVES)
+        deltas = np.array(list(MOVES.values()), dtype=np.int32)
+        delta = deltas[np.where(move, actions, 0)]
+        target = self.pos + delta
+        move &= ((target >= 0) & (target < (self.width, self.height))).all(axis=1)
+        games = np.flatnonzero(move)
+        if games.size == 0:
+            return
+        self.pos[games] = target[games]
+        room = self.pos[games, 1] * self.width + self.pos[games, 0]
+
+        # ห้องบอสยังเข้าไม่ได้ถ้ากุญแจไม่ครบ ผู้เล่นยืนอยู่ที่ห้องนั้นโดยไม่มีอะไรเกิดขึ้น
+        enters = (room != self.boss[games]) | (self.keys[games] >= KEYS_NEEDED)
+        games, room = games[enters], room[enters]
+        reward[games] += self.rewards["new_room"] * ~self.visited[games, room]
+        self.visited[games, room] = True
+
+        trapped = self.trap[games, room]
+        self.hp[games] -= np.where(trapped, self.rng.integers(1, 6, size=games.size, endpoint=True), 0)
+        self.trap[games, room] = False
+
+        item = self.room_item[games, room]
+        got_key = item == ITEM_CODES["Key"]
+        self.keys[games] += got_key
+        reward[games] += self.rewards["key"] * got_key
+        for column, name in enumerate(INVENTORY_ITEMS):
+            self.items[games, column] += item == ITEM_CODES[name]
+        self.room_item[games, room] = 0
+
+        foes = self.room_enemies[games, room]
+        fights = foes[:, 0] > 0
+        games, room, foes = games[fights], room[fights], foes[fights]
+        self.in_battle[games] = True
+        self.foes[games] = foes
+        self.foe_count[games] = (foes > 0).sum(axis=1)
+        self.foe_index[games] = 0
+        self.foe_hp[games] = self.kind_hp[foes[:, 0]]
+        self.burn[games] = 0
+        self.poison[games] = 0
+        self.room_enemies[games, room] = 0
+
+    def _fight(self, actions, reward, outcome):
+        games = np.flatnonzero(self.in_battle & (actions >= N_MOVES))
+        if games.size == 0:
+            return
+        action = actions[games] - N_MOVES + 1
+        cls = self.class_index[games]
+        hp, mp, buff = self.hp[games], self.mp[games], self.buff[games]
+        items = self.items[games]
+        foe_hp, burn, poison = self.foe_hp[games], self.burn[games], self.poison[games]
+        max_hp, max_mp = self.table["hp"][cls], self.table["mp"][cls]
+        alive = hp > 0
+
+        # ไอเทม: ใช้ได้แม้ไม่มีของ (เสียตาเปล่า) เหมือน use_item()
+        potion = alive & (action == 4) & (items[:, 0] > 0) & (hp < max_hp)
+        hp = np.where(potion, np.minimum(hp + POTION_HEAL, max_hp), hp)
+        items[:, 0] -= potion
+        meat = alive & (action == 5) & (items[:, 1] > 0)
+        buff = np.where(meat, MEAT_TURNS, buff)
+        items[:, 1] -= meat
+        mana = alive & (action == 6) & (items[:, 2] > 0) & (mp < max_mp)
+        mp = np.where(mana, np.minimum(mp + MANA_POTION_GAIN, max_mp), mp)
+        items[:, 2] -= mana
+
+        # โจมตี: จ่ายไม่ไหวก็ไม่เสียตาและศัตรูไม่ได้เล่น
+        attack = np.clip(action - 1, 0, 2)
+        mp_cost = self.table["mp_cost"][cls, attack]
+        hp_cost = self.table["hp_cost"][cls, attack]
+        attacking = alive & (action <= 3)
+        attacking &= ((mp_cost == 0) | (mp >= mp_cost)) & ((hp_cost == 0) | (hp > hp_cost))
+        acted = alive & ((action >= 4) | attacking)
+
+        m = games.size
+        rolls = self.rng.integers(1, 6, size=(3, m), endpoint=True)
+        bonus = self.rng.integers(0, ENEMY_BONUS_MAX, size=m, endpoint=True)
+        mp -= np.where(attacking, mp_cost, 0)
+        hp -= np.where(attacking, hp_cost, 0)
+        hit = attacking & (rolls[0] >= self.table["threshold"][cls, attack])
+        buffed = hit & (buff > 0)
+        foe_hp -= np.where(hit, self.table["damage"][cls, attack] + buffed * MEAT_BONUS, 0)
+        buff -= buffed
+        status = self.table["status"][cls, attack]
+        burn = np.where(hit & (status == STATUS_CODES["burn"]), BURN_TURNS, burn)
+        poison = np.where(hit & (status == STATUS_CODES["poison"]), POISON_TURNS, poison)
+
+        # ตาของศัตรู
+        defeated = acted & (foe_hp <= 0)
+        foe_attack = self.kind_attack[self.foes[games, self.foe_index[games]]]
+        enemy_hits = acted & ~defeated & (rolls[1] > rolls[2])
+        hp -= np.where(enemy_hits, foe_attack + bonus, 0)
+        mp = np.where(acted, np.minimum(mp + self.table["mana_regen"][cls], max_mp), mp)
+
+        # พิษและไฟเผาทำงานเฉพาะกับศัตรูที่ยังไม่ตายในตานี้
+        ticking = acted & ~defeated & (burn > 0)
+        foe_hp -= ticking * BURN_DAMAGE
+        burn -= ticking
+        ticking = acted & ~defeated & (poison > 0)
+        foe_hp -= ticking * POISON_DAMAGE
+        poison -= ticking
+        defeated |= acted & (foe_hp <= 0)
+
+        foe_index = self.foe_index[games] + defeated
+        next_foe = self.foes[games, np.minimum(foe_index, 2)]
+        foe_hp = np.where(defeated, self.kind_hp[next_foe], foe_hp)
+        burn = np.where(defeated, 0, burn)
+        poison = np.where(defeated, 0, poison)
+        won = foe_index >= self.foe_count[games]
+
+        self.hp[games], self.mp[games], self.buff[games] = hp, mp, buff
+        self.items[games] = items
+        self.foe_hp[games], self.burn[games], self.poison[games] = foe_hp, burn, poison
+        self.foe_index[games] = foe_index
+        self.in_battle[games] = ~won & (hp > 0)
+        at_boss = self.pos[games, 1] * self.width + self.pos[games, 0] == self.boss[games]
+        outcome[games] = np.where(won, np.where(at_boss, 1, 0), np.where(hp <= 0, -1, 0))
+
+    # --- ค่าสังเกต ---
+    def observation(self):
+        obs = np.zeros((self.n, len(OBS_FIELDS)), dtype=np.int32)
+        cls = self.class_index
+        obs[:, 0:2] = self.pos
+        obs[:, 2] = self.hp
+        obs[:, 3] = self.mp
+        obs[:, 4] = self.table["hp"][cls]
+        obs[:, 5] = self.table["mp"][cls]
+        obs[:, 6] = self.keys
+        obs[:, 7] = self.buff
+        obs[:, 8:11] = self.items
+        battle = self.in_battle
+        obs[:, 11] = battle
+        current = self.foes[np.arange(self.n), np.minimum(self.foe_index, 2)]
+        obs[:, 12] = np.where(battle, current, 0)
+        obs[:, 13] = np.where(battle, self.foe_hp, 0)
+        obs[:, 14] = np.where(battle, self.foe_count - self.foe_index, 0)
+        return obs
+
+    def action_mask(self):
+        mask = np.zeros((self.n, len(ACTIONS)), dtype=bool)
+        deltas = np.array(list(MOVES.values()), dtype=np.int32)
+        target = self.pos[:, None, :] + deltas[None]
+        inside = ((target >= 0) & (target < (self.width, self.height))).all(axis=2)
+        mask[:, :N_MOVES] = ~self.in_battle[:, None] & inside
+        mask[:, N_MOVES:] = self.in_battle[:, None]
+        return mask
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Random-policy throughput of the vector env")
+    parser.add_argument("-n", type=int, default=4096, help="games stepped together")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--class", dest="char_class", choices=list(CLASS_STATS), default="Warrior")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    env = VectorEnv(args.n, args.char_class, seed=args.seed)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    wins = losses = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        # สุ่มเฉพาะการกระทำที่มีผลในสถานะปัจจุบัน
+        mask = env.action_mask()
+        scores = np.where(mask, rng.random(mask.shape), -1.0)
+        _, _, _, _, info = env.step(scores.argmax(axis=1))
+        wins += int((info["outcome"] == 1).sum())
+        losses += int((info["outcome"] == -1).sum())
+    elapsed = time.perf_counter() - start
+    steps = args.n * args.steps
+    print(f"{steps} steps in {elapsed:.2f}s ({steps / elapsed:,.0f}/s, {steps / elapsed * 3600:,.0f}/h); "
+          f"{wins} won, {losses} lost")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
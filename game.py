@@ -1,9 +1,42 @@
+import sys
+
+# --- รันแบบไม่มีหน้าจอ: python game.py --headless [ตัวเลือกของ headless.py] ---
+# ตรวจก่อน import pygame และโมดุลที่ใช้ pygame ทั้งหมด จะได้ไม่ต้องมี pygame หรือโหลด SDL
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    import headless
+    sys.argv.remove("--headless")
+    sys.exit(headless.main())
+
 import pygame
 import random
-import sys
+import argparse
+import atexit
 import pickle
 import os
-from collections import Counter
+import time
+from combat import CLASS_STATS, compile_actions, describe_event
+from session import GameSession, CLASS_COMMANDS
+from replay import Recorder, Recording, Replayer
+from solver import solve_battle
+from pacing import FramePacer
+from profiler import Profiler
+from textcache import TextCache
+from sprites import SpriteAtlas
+from maprender import MapRenderer
+from battleview import BattleView
+from notifications import NotificationQueue
+from music import MusicPlayer
+from assets import AssetManager
+import savegame
+
+# --- ตัวเลือกบรรทัดคำสั่ง ---
+cli = argparse.ArgumentParser(description="RPG Dungeon Game")
+cli.add_argument("--replay", metavar="PATH", help="continue from a recorded run (see replay.py)")
+cli.add_argument("--seek", type=int, default=None, help="with --replay: stop after this many commands")
+cli.add_argument("--trace", metavar="PATH", help="profile every frame and write a Chrome trace on exit")
+cli_args, _ = cli.parse_known_args()
+
+startup_started = time.perf_counter()
 
 pygame.init()
 pygame.mixer.init() # Initialize the mixer
@@ -23,30 +56,58 @@ pygame.display.set_caption("RPG Dungeon Game")
 font_main = pygame.font.Font(None, 36)
 font_ui = pygame.font.SysFont("arial", 24)
 
+# --- จังหวะเฟรม (ตั้งค่า FPS ได้ผ่าน DICE_DUNGEONS_FPS) ---
+TARGET_FPS = int(os.environ.get("DICE_DUNGEONS_FPS", 60))
+IDLE_FPS = 5
+# ตัววัดเวลาแต่ละเฟรม (กด F4 เพื่อดู, --trace เพื่อบันทึกเป็นไฟล์)
+profiler = Profiler()
+pacer = FramePacer(TARGET_FPS, IDLE_FPS, font=font_ui, profiler=profiler)
+if cli_args.trace:
+    profiler.start_trace()
+    atexit.register(profiler.export_chrome_trace, cli_args.trace)
+
+# --- แคชข้อความที่เรนเดอร์แล้ว ---
+TEXT_CACHE_BYTES = 8 * 1024 * 1024
+text_cache = TextCache(TEXT_CACHE_BYTES, profiler=profiler)
+
+# --- ขนาดดันเจี้ยน (ตั้งได้ผ่าน DICE_DUNGEONS_MAP เช่น "1024x1024") ---
+MAP_WIDTH, MAP_HEIGHT = (int(n) for n in os.environ.get("DICE_DUNGEONS_MAP", "8x8").lower().split("x"))
+VIEW_TILES = 16
+# ตั้ง DICE_DUNGEONS_SEED เพื่อให้ได้ดันเจี้ยนเดิมทุกครั้ง
+DUNGEON_SEED = os.environ.get("DICE_DUNGEONS_SEED")
+# ระยะมองเห็นเป็นจำนวนห้อง (DICE_DUNGEONS_SIGHT=0 ปิดหมอก)
+SIGHT_RADIUS = int(os.environ.get("DICE_DUNGEONS_SIGHT", 3)) or None
+
+# --- แผนที่แบบวาดใหม่เฉพาะช่องที่เปลี่ยน ---
+map_view = MapRenderer(screen, text_cache, font_ui, MAP_WIDTH, MAP_HEIGHT, VIEW_TILES)
+pacer.redraw_hooks.append(map_view.invalidate)
+
+# --- Sprite atlas: ภาพทุกชุดแปลงเป็นฟอร์แมตของจอและย่อขยายครั้งเดียว ---
+UI_SCALE = 1.0
+SPRITE_SIZE = 64
+ITEM_ICON_SIZE = 32
+# ไฟล์ภาพโหลดเบื้องหลังระหว่างหน้าจอเริ่มเกม หรือโหลดทันทีเมื่อถูกใช้ครั้งแรก
+assets = AssetManager()
+sprites = SpriteAtlas(UI_SCALE, assets, profiler)
+
 # โหลดภาพตัวละครตามคลาส
-player_images = {
-    "Warrior": pygame.image.load("assets/players/warrior.png"),
-    "Mage": pygame.image.load("assets/players/mage.png"),
-    "Rogue": pygame.image.load("assets/players/rogue.png")
-}
+sprites.load("players", "Warrior", "assets/players/warrior.png")
+sprites.load("players", "Mage", "assets/players/mage.png")
+sprites.load("players", "Rogue", "assets/players/rogue.png")
 
 # โหลดภาพศัตรูตามชื่อ
-enemy_images = {
-    "Goblin": pygame.image.load("assets/enemies/goblin.png"),
-    "Skeleton": pygame.image.load("assets/enemies/skeleton.png"),
-    "Orc": pygame.image.load("assets/enemies/orc.png"),
-    "Ghost": pygame.image.load("assets/enemies/ghost.png"),
-    "Dragon": pygame.image.load("assets/enemies/dragon.png"),
-    "BOSS DEMON": pygame.image.load("assets/enemies/boss_demon.png"),
-}
+sprites.load("enemies", "Goblin", "assets/enemies/goblin.png")
+sprites.load("enemies", "Skeleton", "assets/enemies/skeleton.png")
+sprites.load("enemies", "Orc", "assets/enemies/orc.png")
+sprites.load("enemies", "Ghost", "assets/enemies/ghost.png")
+sprites.load("enemies", "Dragon", "assets/enemies/dragon.png")
+sprites.load("enemies", "BOSS DEMON", "assets/enemies/boss_demon.png")
 
 # โหลดภาพไอเทม
-item_images = {
-    "Potion": pygame.image.load("assets/items/potion.png"),
-    "Mana Potion": pygame.image.load("assets/items/manapotion.png"),
-    "Meat": pygame.image.load("assets/items/meat.png"),
-    "Key": pygame.image.load("assets/items/key.png")
-}
+sprites.load("items", "Potion", "assets/items/potion.png")
+sprites.load("items", "Mana Potion", "assets/items/manapotion.png")
+sprites.load("items", "Meat", "assets/items/meat.png")
+sprites.load("items", "Key", "assets/items/key.png")
 
 # --- สี ---
 WHITE = (255, 255, 255)
@@ -58,272 +119,223 @@ CYAN  = (0, 255, 255)
 GREY  = (100, 100, 100)
 BLUE  = (0, 100, 255)
 PURPLE= (128, 0, 128)
+CLASS_COLORS = [GREEN, BLUE, YELLOW]
 
 # --- โหลดภาพเต๋า (ถ้ามีไฟล์จริง) ---
-dice_images = []
+def dice_placeholder(value):
+    img = pygame.Surface((64,64))
+    img.fill(GREY)
+    pygame.draw.rect(img, BLACK, img.get_rect(), 3)
+    text = font_ui.render(str(value), True, BLACK)
+    img.blit(text, (24, 15))
+    return img
+
 for i in range(1,7):
-    try:
-        img = pygame.image.load(f"assets/dice_{i}.png")
-        img = pygame.transform.scale(img, (64,64))
-    except:
-        img = pygame.Surface((64,64))
-        img.fill(GREY)
-        pygame.draw.rect(img, BLACK, img.get_rect(), 3)
-        text = font_ui.render(str(i), True, BLACK)
-        img.blit(text, (24, 15))
-    dice_images.append(img)
-
-# --- โหลดไฟล์เสียง (แก้ไข path ให้ตรงกับไฟล์ของคุณ) ---
-try:
-    bg_music = pygame.mixer.Sound("assets/sounds/dungeon_theme.mp3")
-    battle_music = pygame.mixer.Sound("assets/sounds/battle_theme.mp3")
-except pygame.error as e:
-    print(f"Error loading sound files: {e}")
-    bg_music = None
-    battle_music = None
-
-# --- Player Class ---
-class Player:
-    def __init__(self, char_class):
-        self.char_class = char_class
-
-        if char_class == "Warrior":
-            self.hp = 150
-            self.mp = 20
-            self.attack = 15
-            self.magic = 5
-            self.mana_regen = 5
-        elif char_class == "Mage":
-            self.hp = 80
-            self.mp = 80
-            self.attack = 5
-            self.magic = 20
-            self.mana_regen = 5
-        elif char_class == "Rogue":
-            self.hp = 90
-            self.mp = 40
-            self.attack = 12
-            self.magic = 8
-            self.mana_regen = 5
-        else:
-            self.hp = 100
-            self.mp = 30
-            self.attack = 10
-            self.magic = 10
-            self.mana_regen = 5
-
-        self.max_hp = self.hp
-        self.max_mp = self.mp
-
-    def regen_mana(self):
-        self.mp = min(self.max_mp, self.mp + self.mana_regen)
-
-# --- Enemy Class ---
-class Enemy:
-    def __init__(self, name, hp, attack):
-        self.name = name
-        self.hp = hp
-        self.attack = attack
-        self.poison_turns = 0
-        self.burn_turns = 0
-
-# --- ตัวแปรเกม ---
-player_pos = [0,0]
-player = None
-player_hp = 0
-player_mp = 0
-player_max_hp = 0
-player_max_mp = 0
-keys_collected = 0
-inventory = []
-game_state = "start_screen"
-current_enemies = []
-enemy_index = 0
-meat_buff_turns = 0
+    sprites.load("dice", i, f"assets/dice_{i}.png", fallback=lambda value=i: dice_placeholder(value))
+
+assets.start()
+
+# --- หน้าจอต่อสู้ (battleview.py ใช้ร่วมกับ bench.py) ---
+battle_view = BattleView(screen, text_cache, font_ui, sprites, profiler, SPRITE_SIZE, ITEM_ICON_SIZE)
+
+time_to_first_frame = None
+assets_reported = False
+
+# --- เพลง: สตรีมจากไฟล์ ไม่ถอดรหัสทั้งไฟล์ไว้ในหน่วยความจำ (แก้ไข path ให้ตรงกับไฟล์ของคุณ) ---
+bg_music = "dungeon"
+battle_music = "battle"
+music = MusicPlayer({
+    bg_music: "assets/sounds/dungeon_theme.mp3",
+    battle_music: "assets/sounds/battle_theme.mp3",
+})
+pacer.frame_hooks.append(music.update)
+
+# --- ตัวแปรเกม: สถานะของรอบการเล่นอยู่ใน GameSession (session.py) ---
+session = GameSession(MAP_WIDTH, MAP_HEIGHT, seed=int(DUNGEON_SEED) if DUNGEON_SEED else None,
+                      sight_radius=SIGHT_RADIUS)
+
+# --- บันทึกคำสั่งของรอบปัจจุบันไว้เล่นซ้ำ (ส่งไฟล์นี้มากับรายงานบั๊ก) ---
+RECORDING_PATH = os.path.join("saves", "last_run.ddr")
+recorder = Recorder()
+session.recorder = recorder
+
+def save_recording():
+    if recorder.recording is not None and len(recorder.recording):
+        try:
+            recorder.recording.save(RECORDING_PATH)
+        except OSError as e:
+            print(f"Could not save recording: {e}")
+
+atexit.register(save_recording)
 player_image = None
-player_rect = None
-player_class = None
-player_speed = 5
-current_music = None
-
-def play_music(music_file, loop=True):
-    global current_music
-    if music_file and current_music != music_file:
-        if current_music:
-            pygame.mixer.stop()
-        music_file.play(-1 if loop else 0)
-        current_music = music_file
-    elif not music_file and current_music:
-        pygame.mixer.stop()
-        current_music = None
+
+# เพลงของแต่ละสถานะ
+STATE_MUSIC = {
+    "start_screen": None,
+    "class_select": None,
+    "exploration": bg_music,
+    "battle": battle_music,
+    "game_over": None,
+}
+
+def play_music(track):
+    music.play(track)
 
 def draw_text_center(text, color, surface, y_pos, font=font_main):
     """
-    Draws text centered horizontally on the screen.
+    Draws text centered horizontally on the screen, one line per "\n".
     """
-    textobj = font.render(text, True, color)
-    textrect = textobj.get_rect(center=(WIDTH/2, y_pos))
-    surface.blit(textobj, textrect)
+    for textobj in text_cache.render_lines(font, text, color):
+        textrect = textobj.get_rect(center=(WIDTH/2, y_pos))
+        surface.blit(textobj, textrect)
+        y_pos += font.get_linesize()
 
 def draw_text(text, x, y, color=WHITE, font=font_ui):
-    screen.blit(font.render(text, True, color), (x, y))
+    for textobj in text_cache.render_lines(font, text, color):
+        screen.blit(textobj, (x, y))
+        y += font.get_linesize()
+
+# --- ข้อความแจ้งเตือนแบบไม่หยุดเกม ---
+notices = NotificationQueue()
+
+# สีและเวลาที่แสดงข้อความแต่ละชนิดจาก session.notices
+NOTICE_STYLE = {
+    "blocked": (RED, 1.5),
+    "trap": (RED, 1.2),
+    "item": (YELLOW, 1.0),
+    "enemy_defeated": (CYAN, 1.5),
+    "victory": (YELLOW, 5.0),
+}
 
-# --- สร้างแผนที่ดันเจี้ยน ---
-dungeon_map = {}
-empty_rooms = []
-boss_room = None
+def notify(text, color, duration):
+    """
+    Queues a full-screen message for duration seconds.
+    """
+    notices.push(text, color, duration)
+
+def show_session_notices():
+    """
+    Moves the messages the session raised into the on-screen queue.
+    """
+    for kind, text in session.notices:
+        color, duration = NOTICE_STYLE.get(kind, (WHITE, 1.0))
+        notify(text, color, duration)
+    session.notices.clear()
+
+def draw_notification():
+    """
+    Draws the current notification over the frame. Returns True while one is showing.
+    """
+    notice = notices.current
+    if notice is None:
+        return False
+    screen.fill(BLACK)
+    draw_text_center(notice.text, notice.color, screen, HEIGHT/2 - 20)
+    pacer.wake()
+    return True
 
+def notification_event(event):
+    """
+    Key presses dismiss the notification on screen instead of reaching the
+    game: ESC drops every queued message, any other key skips one.
+    Returns True when the event was used up.
+    """
+    if event.type != pygame.KEYDOWN or notices.current is None:
+        return False
+    if event.key == pygame.K_ESCAPE:
+        notices.clear()
+    else:
+        notices.skip()
+    return True
+
+# --- สร้างแผนที่ดันเจี้ยน ---
+# ห้องแต่ละ chunk ถูกสุ่มตอนถูกมองครั้งแรก ดูรายละเอียดใน dungeon.py
 def create_new_dungeon():
-    global dungeon_map, empty_rooms, boss_room, player_pos
-    dungeon_map = {}
-    empty_rooms = []
-    for x in range(8):
-        for y in range(8):
-            dungeon_map[(x,y)] = {
-                "enemy": [],
-                "trap": False,
-                "item": None,
-                "visited": False
-            }
-            empty_rooms.append((x,y))
-
-    # --- วางบอส ---
-    boss_room = random.choice(empty_rooms)
-    dungeon_map[boss_room]["enemy"].append(Enemy("BOSS DEMON", 120, 25))
-    empty_rooms.remove(boss_room)
-
-    # --- กำหนดโอกาสเกิดของศัตรู (เป็นเปอร์เซ็นต์) ---
-    enemy_spawn_list = [
-        {"name": "Goblin", "hp": 40, "attack": 10, "weight": 40},
-        {"name": "Skeleton", "hp": 30, "attack": 20, "weight": 30},
-        {"name": "Orc", "hp": 50, "attack": 30, "weight": 10},
-        {"name": "Ghost", "hp": 30, "attack": 25, "weight": 15},
-        {"name": "Dragon", "hp": 100, "attack": 40, "weight": 5}
-    ]
-    
-    enemy_names = [e["name"] for e in enemy_spawn_list]
-    enemy_weights = [e["weight"] for e in enemy_spawn_list]
-    enemy_templates = {e["name"]: Enemy(e["name"], e["hp"], e["attack"]) for e in enemy_spawn_list}
-
-    # --- วางศัตรูในห้อง (1-3 ตัว) ---
-    for pos in random.sample(empty_rooms, 25):
-        num_enemies = random.randint(1,3)
-        
-        # สุ่มศัตรูตามน้ำหนักที่กำหนด
-        spawned_enemies = random.choices(enemy_names, weights=enemy_weights, k=num_enemies)
-        
-        dungeon_map[pos]["enemy"] = [Enemy(e, enemy_templates[e].hp, enemy_templates[e].attack) for e in spawned_enemies]
-
-
-    # --- วางกับดัก ---
-    for pos in random.sample(empty_rooms, 10):
-        dungeon_map[pos]["trap"] = True
-
-    # --- วางกุญแจ 3 ดอก ---
-    key_rooms = random.sample(empty_rooms, 3)
-    for pos in key_rooms:
-        dungeon_map[pos]["item"] = "Key"
-        empty_rooms.remove(pos)
-
-    # --- วาง Potion และ Mana Potion ---
-    for pos in empty_rooms:
-        if random.random() < 0.4:
-            dungeon_map[pos]["item"] = "Potion"
-        if random.random() < 0.2:
-            dungeon_map[pos]["item"] = "Meat"
-        if random.random() < 0.4:
-            dungeon_map[pos]["item"] = "Mana Potion"
-    
-    player_pos = [0,0]
-    
-create_new_dungeon()
-
-
-def draw_hp_bar(x, y, current, max_hp, width=100, height=15):
-    pygame.draw.rect(screen, RED, (x, y, width, height))
-    green_width = max(0, int(width * current / max_hp))
-    pygame.draw.rect(screen, GREEN, (x, y, green_width, height))
-
-def draw_mp_bar(x, y, current, max_mp, width=100, height=10):
-    pygame.draw.rect(screen, GREY, (x, y, width, height))
-    blue_width = max(0, int(width * current / max_mp))
-    pygame.draw.rect(screen, BLUE, (x, y, blue_width, height))
-
-def draw_dice(x, y, dice_value):
-    if 1 <= dice_value <= 6:
-        screen.blit(dice_images[dice_value-1], (x,y))
-
-def dice_roll():
-    return random.randint(1, 6)
+    session.new_run()
+    map_view.resize(MAP_WIDTH, MAP_HEIGHT)
+
 
 def draw_player_and_map():
-    global player_image, player_pos
-    
-    # คำนวณขนาดช่องและพิกัดเริ่มต้นเพื่อให้อยู่กึ่งกลาง
-    map_size = min(WIDTH, HEIGHT) - 200 # ลดขนาดแผนที่ลงเพื่อให้มีพื้นที่ UI ด้านข้าง
-    tile_size = map_size // 8
-    map_x_offset = (WIDTH - map_size) // 2
-    map_y_offset = (HEIGHT - map_size) // 2
-
-    for x in range(8):
-        for y in range(8):
-            rect = pygame.Rect(map_x_offset + x*tile_size, map_y_offset + y*tile_size, tile_size, tile_size)
-            color = (50,50,50) if dungeon_map[(x,y)]["visited"] else (20,20,20)
-            pygame.draw.rect(screen, color, rect)
-            pygame.draw.rect(screen, WHITE, rect, 1)
-
-    # วาดตำแหน่งผู้เล่น
-    px = map_x_offset + player_pos[0] * tile_size + (tile_size - player_image.get_width()) // 2
-    py = map_y_offset + player_pos[1] * tile_size + (tile_size - player_image.get_height()) // 2
-    screen.blit(player_image, (px, py))
-
-def show_enemy_icon(enemy, x, y):
-    # วาดภาพศัตรู
-    if enemy.name in enemy_images:
-        img = pygame.transform.scale(enemy_images[enemy.name], (64, 64))
-        screen.blit(img, (x+16, y+16))
-    
-    # แสดงสถานะผิดปกติ
-    if enemy.burn_turns > 0:
-        draw_text(f"🔥", x + 80, y + 20, RED)
-    if enemy.poison_turns > 0:
-        draw_text(f"💀", x + 80, y + 40, GREEN)
+    with profiler.scope("draw_player_and_map"):
+        map_view.draw_map(session.dungeon_map, session.player_pos, player_image, session.visibility)
 
 # --- หน้าจอ Game Over ---
 def game_over_screen():
-    global game_state
     play_music(None)
+    notices.clear()
+    discard_save()
+    save_recording()
     screen.fill(BLACK)
     draw_text_center("💀 You died! Game Over!", RED, screen, HEIGHT/2 - 20)
     draw_text_center("Press 'R' to Restart or 'Q' to Quit", WHITE, screen, HEIGHT/2 + 20)
-    pygame.display.flip()
+    pacer.present()
 
     while True:
-        for event in pygame.event.get():
+        for event in pacer.get_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
-                    game_state = "start_screen"
+                    session.handle("r")
                     return
                 if event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
 
 
+# --- ความคืบหน้าการโหลด ---
+def draw_loading_progress():
+    loaded, total = assets.progress
+    draw_text_center(f"Loading assets... {loaded}/{total}", WHITE, screen, HEIGHT/2 - 20)
+    bar = pygame.Rect(0, 0, 300, 12)
+    bar.center = (WIDTH/2, HEIGHT/2 + 15)
+    pygame.draw.rect(screen, GREY, bar)
+    pygame.draw.rect(screen, CYAN, (bar.x, bar.y, bar.width * loaded // max(total, 1), bar.height))
+
+def record_first_frame():
+    global time_to_first_frame
+    if time_to_first_frame is None:
+        time_to_first_frame = time.perf_counter() - startup_started
+
+def report_asset_loading():
+    """
+    Frame hook: keeps frames coming while assets load, then prints the
+    per-asset load times once.
+    """
+    global assets_reported
+    if not assets.done:
+        return True
+    if not assets_reported:
+        assets_reported = True
+        slowest = ", ".join(f"{key[1]} {seconds * 1000:.1f} ms" for key, seconds in assets.report()[:3])
+        print(f"Loaded {len(assets.load_times)} assets in {sum(assets.load_times.values()) * 1000:.0f} ms "
+              f"(slowest: {slowest}); first frame after {(time_to_first_frame or 0) * 1000:.0f} ms")
+    return False
+
+pacer.frame_hooks.append(report_asset_loading)
+
 # --- หน้าจอเริ่มเกม ---
 def start_game_screen():
-    global game_state, player, player_hp, player_mp, player_max_hp, player_max_mp, keys_collected, inventory, meat_buff_turns, player_image, enemy_index
+    global player_image
     running = True
     play_music(None)
     while running:
         screen.fill(BLACK)
         draw_text_center("RPG Dungeon Game", CYAN, screen, HEIGHT/2 - 80)
-        draw_text_center("Press any key to start", WHITE, screen, HEIGHT/2 - 20)
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+        if assets.done:
+            draw_text_center("Press any key to start", WHITE, screen, HEIGHT/2 - 20)
+            if os.path.exists(SAVE_PATH):
+                draw_text_center("Press C to continue your last run", YELLOW, screen, HEIGHT/2 + 20)
+        else:
+            draw_loading_progress()
+        draw_notification()
+        pacer.present()
+        record_first_frame()
+
+        for event in pacer.get_events():
+            if notification_event(event):
+                continue
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -331,268 +343,128 @@ def start_game_screen():
                 if event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
-                game_state = "class_select"
-                player = None
-                player_hp = 0
-                player_mp = 0
-                player_max_hp = 0
-                player_max_mp = 0
-                keys_collected = 0
-                inventory = []
-                current_enemies = []
-                enemy_index = 0
-                meat_buff_turns = 0
+                if event.key == pygame.K_c and os.path.exists(SAVE_PATH) and load_game():
+                    return
                 player_image = None
                 create_new_dungeon()
                 return
 
+# --- บันทึก/โหลดเกม ---
+SAVE_PATH = os.path.join("saves", "autosave.dat")
+autosaver = savegame.AutoSaver(SAVE_PATH)
+
+def autosave():
+    """
+    Packs the run on this thread (well under a millisecond) and leaves the
+    disk write to the autosave worker.
+    """
+    with profiler.scope("autosave"):
+        autosaver.save(savegame.dumps(session.snapshot()))
+
+def discard_save():
+    autosaver.flush()
+    if os.path.exists(SAVE_PATH):
+        os.remove(SAVE_PATH)
+
+def load_game():
+    """
+    Restores the autosave into the session. Returns False if there is
+    no usable save.
+    """
+    global player_image
+    try:
+        snapshot = savegame.read_file(SAVE_PATH)
+    except (OSError, ValueError) as e:
+        print(f"Could not load save: {e}")
+        return False
+    session.restore(snapshot)
+    player_image = sprites.get("players", session.player.char_class, SPRITE_SIZE)
+    map_view.resize(session.dungeon_map.width, session.dungeon_map.height)
+    return True
+
 # --- ระบบเลือกคลาส ---
 def class_selection_screen():
-    global player, player_hp, player_max_hp, player_mp, player_max_mp, game_state, player_image
+    global player_image
     selecting = True
     play_music(None)
+    class_keys = {pygame.K_0 + int(key): char_class for key, char_class in CLASS_COMMANDS.items()}
     while selecting:
         screen.fill(BLACK)
         draw_text_center("Select Your Class:", WHITE, screen, HEIGHT/2 - 100)
-        draw_text_center("1) Warrior (HP: 150, MP: 20)", GREEN, screen, HEIGHT/2 - 60)
-        draw_text_center("2) Mage   (HP: 80,  MP: 80)", BLUE, screen, HEIGHT/2 - 30)
-        draw_text_center("3) Rogue  (HP: 90,  MP: 40)", YELLOW, screen, HEIGHT/2)
+        for i, (key, char_class) in enumerate(CLASS_COMMANDS.items()):
+            stats = CLASS_STATS[char_class]
+            draw_text_center(f"{key}) {char_class} (HP: {stats.hp}, MP: {stats.mp})",
+                             CLASS_COLORS[i % len(CLASS_COLORS)], screen, HEIGHT/2 - 60 + i * 30)
         draw_text_center("Press Q to Quit", RED, screen, HEIGHT/2 + 50)
-        pygame.display.flip()
+        draw_notification()
+        pacer.present()
 
-        for event in pygame.event.get():
+        for event in pacer.get_events():
+            if notification_event(event):
+                continue
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_1:
-                    player = Player("Warrior")
-                    selecting = False
-                    player_image = pygame.transform.scale(player_images["Warrior"], (64, 64))
-                elif event.key == pygame.K_2:
-                    player = Player("Mage")
-                    selecting = False
-                    player_image = pygame.transform.scale(player_images["Mage"], (64, 64))
-                elif event.key == pygame.K_3:
-                    player = Player("Rogue")
+                if event.key in class_keys:
+                    session.choose_class(class_keys[event.key])
                     selecting = False
-                    player_image = pygame.transform.scale(player_images["Rogue"], (64, 64))
                 elif event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
 
-    player_hp = player.hp
-    player_max_hp = player.max_hp
-    player_mp = player.mp
-    player_max_mp = player.max_mp
-    return "exploration"
+    player_image = sprites.get("players", session.player.char_class, SPRITE_SIZE)
 
 # --- การย้ายผู้เล่น ---
 def move_player(dx, dy):
-    global player_pos
-    nx, ny = player_pos[0]+dx, player_pos[1]+dy
-    if 0 <= nx < 8 and 0 <= ny < 8:
-        player_pos[0], player_pos[1] = nx, ny
-        return True
-    return False
-
-# --- เช็คเหตุการณ์ห้อง ---
-def check_room_event():
-    global keys_collected, player_hp, game_state, current_enemies, enemy_index, inventory, meat_buff_turns
-    
-    play_music(bg_music) # เล่นเพลงพื้นหลังเมื่ออยู่ในโหมดสำรวจ
-
-    room = dungeon_map[tuple(player_pos)]
-    
-    # ตรวจสอบบอสต้องมีกุญแจครบก่อนเข้า
-    if tuple(player_pos) == boss_room and keys_collected < 3:
-        screen.fill(BLACK)
-        draw_text_center("🚫 Need 3 keys to enter the Boss room!", RED, screen, HEIGHT/2 - 20)
-        pygame.display.flip()
-        pygame.time.delay(1500)
-        return False
-
-    room["visited"] = True
-
-    # กับดัก
-    if room["trap"]:
-        damage = random.randint(1,5)
-        player_hp -= damage
-        screen.fill(BLACK)
-        draw_text_center(f"💥 Trap! You take {damage} damage!", RED, screen, HEIGHT/2 - 20)
-        pygame.display.flip()
-        pygame.time.delay(1200)
-        room["trap"] = False
-
-    # เก็บไอเทม
-    if room["item"]:
-        inventory.append(room["item"])
-        if room["item"] == "Key":
-            keys_collected += 1
-        screen.fill(BLACK)
-        draw_text_center(f"🎁 Found {room['item']}!", YELLOW, screen, HEIGHT/2 - 20)
-        pygame.display.flip()
-        pygame.time.delay(1000)
-        room["item"] = None
-
-    # เจอศัตรู
-    if room["enemy"]:
-        current_enemies.clear()
-        for e in room["enemy"]:
-            current_enemies.append(Enemy(e.name, e.hp, e.attack))
-        enemy_index = 0
-        room["enemy"] = []
-        game_state = "battle"
-        play_music(battle_music) # สลับไปเล่นเพลงต่อสู้
-    
-    return True
-
-# --- ใช้ไอเท็ม ---
-def use_item(item_name):
-    global player_hp, player_mp, meat_buff_turns, inventory
-    if item_name == "Potion":
-        if "Potion" in inventory:
-            if player_hp < player_max_hp:
-                player_hp = min(player_hp + 30, player_max_hp)
-                inventory.remove("Potion")
-                return f"🧪 Used Potion! +30 HP"
-            else:
-                return f"💬 HP already full!"
-        else:
-            return f"❌ No Potion!"
-
-    elif item_name == "Mana Potion":
-        if "Mana Potion" in inventory:
-            if player_mp < player_max_mp:
-                player_mp = min(player_mp + 20, player_max_mp)
-                inventory.remove("Mana Potion")
-                return f"✨ Used Mana Potion! +20 MP"
-            else:
-                return f"💬 MP already full!"
-        else:
-            return f"❌ No Mana Potion!"
+    """
+    Moves through the session (room events included) and queues the
+    messages it raised.
+    """
+    with profiler.scope("session.move"):
+        moved = session.move(dx, dy)
+    show_session_notices()
+    return moved
 
-    elif item_name == "Meat":
-        if "Meat" in inventory:
-            meat_buff_turns = 3
-            inventory.remove("Meat")
-            return f"🍖 Used Meat! +10 Damage 3 turns"
-        else:
-            return f"❌ No Meat!"
-    return ""
+def mark_moved_tiles():
+    """
+    Queues the player's room and the rooms whose fog changed for redraw.
+    """
+    map_view.mark_tile(session.player_pos)
+    if session.visibility is not None:
+        for pos in session.visibility.take_changed():
+            map_view.mark_tile(pos)
 
 # --- ระบบต่อสู้ ---
 def battle_screen():
-    global player_hp, player_mp, player_max_hp, player_max_mp
-    global current_enemies, game_state, enemy_index, meat_buff_turns, player_mp
-    
+    player = session.player
     player_dice = None
     enemy_dice = None
     dodge_dice = None
     message = ""
-    
-    # Adjusted UI element positions
-    enemy_info_x, enemy_info_y = 50, 50
-    player_info_x, player_info_y = WIDTH - 300, 50
-    action_menu_x, action_menu_y = 50, HEIGHT - 250
-    message_box_x, message_box_y = 50, HEIGHT - 80
-    dice_box_x, dice_box_y = WIDTH - 250, HEIGHT - 250
-    
-    while True:
-        screen.fill(BLACK)
-        
-        # Check if all enemies in the room are defeated
-        if enemy_index >= len(current_enemies):
-            if tuple(player_pos) == boss_room:
-                draw_text_center("🎉 CONGRATULATIONS! You defeated the boss!", YELLOW, screen, HEIGHT/2 - 20)
-                draw_text_center("🎉 YOU WIN!", YELLOW, screen, HEIGHT/2 + 20)
-                pygame.display.flip()
-                pygame.time.delay(5000)
-                game_state = "start_screen"
-                play_music(None)
-                return
-            else:
-                draw_text_center(f"🏆 You defeated all enemies in this room!", GREEN, screen, HEIGHT/2 - 20)
-                pygame.display.flip()
-                pygame.time.delay(3000)
-                game_state = "exploration"
-                play_music(bg_music)
-                return
-        
-        enemy = current_enemies[enemy_index]
-        
-        # Draw UI
-        # Enemy Info
-        show_enemy_icon(enemy, enemy_info_x, enemy_info_y)
-        draw_text(f"Enemy: {enemy.name}", enemy_info_x, enemy_info_y + 90, RED)
-        draw_text(f"HP: {enemy.hp}", enemy_info_x, enemy_info_y + 120, RED)
-        
-        # Player Info
-        draw_text(f"Player HP: {player_hp}/{player_max_hp}", player_info_x, player_info_y, GREEN)
-        draw_hp_bar(player_info_x, player_info_y + 30, player_hp, player_max_hp)
-        draw_text(f"Player MP: {player_mp}/{player_max_mp}", player_info_x, player_info_y + 60, BLUE)
-        draw_mp_bar(player_info_x, player_info_y + 90, player_mp, player_max_mp)
-        
-        # Action Menu
-        draw_text("Actions:", action_menu_x, action_menu_y - 30)
-        y_offset = 0
-        if player.char_class == "Warrior":
-            draw_text("1) Normal Attack (DMG 10, roll >= 2)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("2) Heavy Attack (DMG 50, roll >= 3, -5 HP)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("3) Special Attack (DMG 70, roll >= 5)", action_menu_x, action_menu_y + y_offset)
-        elif player.char_class == "Mage":
-            draw_text("1) Magic Attack (DMG 20, roll >= 2, -10 MP)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("2) Special Magic (DMG 60, roll >= 4, -35 MP)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("3) Fire Magic (DMG 40, roll >= 4, -20 MP, Burn)", action_menu_x, action_menu_y + y_offset)
-        elif player.char_class == "Rogue":
-            draw_text("1) Normal Attack (DMG 35, roll >= 2)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("2) Quick Attack (DMG 10, roll >= 1)", action_menu_x, action_menu_y + y_offset)
-            y_offset += 30
-            draw_text("3) Poison Attack (DMG 30, roll >= 4, Poison)", action_menu_x, action_menu_y + y_offset)
-        
-        y_offset += 30
-        draw_text("4) Use Potion", action_menu_x, action_menu_y + y_offset)
-        y_offset += 30
-        draw_text("5) Use Meat", action_menu_x, action_menu_y + y_offset)
-        y_offset += 30
-        draw_text("6) Use Mana Potion", action_menu_x, action_menu_y + y_offset)
-        
-        # --- แสดง Inventory เหมือนในฉากสำรวจ ---
-        draw_text("Inventory:", player_info_x, player_info_y + 120 + 70, CYAN)
-        inventory_counts = Counter(inventory)
-        item_x = player_info_x
-        item_y = player_info_y + 150 + 70
-        for item, count in inventory_counts.items():
-            if item in item_images:
-                item_img = pygame.transform.scale(item_images[item], (32, 32))
-                screen.blit(item_img, (item_x, item_y))
-                draw_text(f"x{count}", item_x + 35, item_y + 5, WHITE)
-                item_x += 100
-        # --- สิ้นสุดการแก้ไข ---
-        draw_text(f"Damage buff turns left: {meat_buff_turns}", player_info_x, player_info_y + 200 + 70, YELLOW)
-
-        # Dice Rolls
-        if player_dice is not None:
-            draw_text(f"Your Roll: {player_dice}", dice_box_x, dice_box_y - 30, YELLOW)
-            draw_dice(dice_box_x, dice_box_y, player_dice)
-        if enemy_dice is not None:
-            draw_text(f"Enemy Roll: {enemy_dice}", dice_box_x, dice_box_y + 70, YELLOW)
-            draw_dice(dice_box_x, dice_box_y + 100, enemy_dice)
-        if dodge_dice is not None:
-            draw_text(f"Dodge Roll: {dodge_dice}", dice_box_x, dice_box_y + 170, YELLOW)
-            draw_dice(dice_box_x, dice_box_y + 200, dodge_dice)
-
-        if message:
-            draw_text(message, message_box_x, message_box_y, WHITE)
-            
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+    win_chance = None
+
+    battle_keys = {pygame.K_1: 1, pygame.K_2: 2, pygame.K_3: 3,
+                   pygame.K_4: 4, pygame.K_5: 5, pygame.K_6: 6}
+    # เมนูสร้างจากตารางการกระทำของคลาส
+    action_menu = compile_actions(player.char_class).menu
+
+    while session.state == "battle":
+        enemy = session.current_enemies[session.enemy_index]
+
+        # โอกาสชนะ (คำนวณใหม่หลังจบแต่ละตา)
+        if win_chance is None:
+            with profiler.scope("battle.solver"):
+                win_chance = solve_battle(session.battle_state()).win_prob
+        battle_view.draw(enemy, player, action_menu, session.inventory, session.meat_buff_turns,
+                         win_chance, (player_dice, enemy_dice, dodge_dice), message)
+
+        draw_notification()
+        pacer.present()
+
+        for event in pacer.get_events():
+            if notification_event(event):
+                continue
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -602,256 +474,157 @@ def battle_screen():
                     pygame.quit()
                     sys.exit()
 
-                damage = 0
+                action = battle_keys.get(event.key)
+                if action is None:
+                    continue
+
                 player_dice = None
                 enemy_dice = None
                 dodge_dice = None
-                action_taken = False
                 message = ""
-                
-                # Universal actions
-                if event.key == pygame.K_4:
-                    message = use_item("Potion")
-                    action_taken = True
-                elif event.key == pygame.K_5:
-                    message = use_item("Meat")
-                    action_taken = True
-                elif event.key == pygame.K_6:
-                    message = use_item("Mana Potion")
-                    action_taken = True
-
-                # Warrior attacks
-                elif player.char_class == "Warrior":
-                    if event.key == pygame.K_1:
-                        player_dice = dice_roll()
-                        if player_dice >= 2:
-                            damage = 10
-                            if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                            enemy.hp -= damage
-                            message = f"You hit {enemy.name} for {damage} damage!"
-                        else:
-                            message = "Your attack missed!"
-                        action_taken = True
-                    elif event.key == pygame.K_2:
-                        if player_hp > 5:
-                            player_dice = dice_roll()
-                            player_hp -= 5
-                            if player_dice >= 3:
-                                damage = 50
-                                if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                                enemy.hp -= damage
-                                message = f"You perform a Heavy Attack and hit {enemy.name} for {damage} damage!"
-                            else:
-                                message = "Your Heavy Attack missed!"
-                            action_taken = True
-                        else:
-                            message = "Not enough HP for Heavy Attack!"
-                    elif event.key == pygame.K_3:
-                        player_dice = dice_roll()
-                        if player_dice >= 5:
-                            damage = 70
-                            if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                            enemy.hp -= damage
-                            message = f"You perform a Special Attack and hit {enemy.name} for {damage} damage!"
-                        else:
-                            message = "Your Special Attack missed!"
-                        action_taken = True
-                
-                # Mage attacks
-                elif player.char_class == "Mage":
-                    if event.key == pygame.K_1:
-                        if player_mp >= 10:
-                            player_dice = dice_roll()
-                            player.mp -= 10
-                            player_mp = player.mp
-                            if player_dice >= 2:
-                                damage = 20
-                                if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                                enemy.hp -= damage
-                                message = f"You cast Magic Attack and hit {enemy.name} for {damage} damage!"
-                            else:
-                                message = "Your Magic Attack missed!"
-                            action_taken = True
-                        else:
-                            message = "Not enough MP for Magic Attack!"
-                    elif event.key == pygame.K_2:
-                        if player_mp >= 35:
-                            player_dice = dice_roll()
-                            player.mp -= 35
-                            player_mp = player.mp
-                            if player_dice >= 4:
-                                damage = 60
-                                if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                                enemy.hp -= damage
-                                message = f"You cast Special Magic and hit {enemy.name} for {damage} damage!"
-                            else:
-                                message = "Your Special Magic missed!"
-                            action_taken = True
-                        else:
-                            message = "Not enough MP for Special Magic!"
-                    elif event.key == pygame.K_3:
-                        if player_mp >= 20:
-                            player_dice = dice_roll()
-                            player.mp -= 20
-                            player_mp = player.mp
-                            if player_dice >= 4:
-                                damage = 40
-                                if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                                enemy.hp -= damage
-                                enemy.burn_turns = 4
-                                message = f"You cast Fire Magic! {enemy.name} is now burning!"
-                            else:
-                                message = "Your Fire Magic missed!"
-                            action_taken = True
-                        else:
-                            message = "Not enough MP for Fire Magic!"
-
-                # Rogue attacks
-                elif player.char_class == "Rogue":
-                    if event.key == pygame.K_1:
-                        player_dice = dice_roll()
-                        if player_dice >= 2:
-                            damage = 35
-                            if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                            enemy.hp -= damage
-                            message = f"You hit {enemy.name} for {damage} damage!"
-                        else:
-                            message = "Your attack missed!"
-                        action_taken = True
-                    elif event.key == pygame.K_2:
-                        player_dice = dice_roll()
-                        if player_dice >= 1: # Always hits
-                            damage = 10
-                            if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                            enemy.hp -= damage
-                            message = f"You perform a Quick Attack and hit {enemy.name} for {damage} damage!"
-                        action_taken = True
-                    elif event.key == pygame.K_3:
-                        player_dice = dice_roll()
-                        if player_dice >= 4:
-                            damage = 30
-                            if meat_buff_turns > 0: damage += 10; meat_buff_turns -= 1
-                            enemy.hp -= damage
-                            enemy.poison_turns = 3
-                            message = f"You perform a Poison Attack! {enemy.name} is now poisoned!"
-                        else:
-                            message = "Your Poison Attack missed!"
-                        action_taken = True
-
-                # Enemy turn
-                if action_taken:
-                    # Check if enemy is defeated
-                    if enemy.hp <= 0:
-                        screen.fill(BLACK)
-                        draw_text_center(f"You defeated {enemy.name}!", CYAN, screen, HEIGHT/2 - 20)
-                        pygame.display.flip()
-                        pygame.time.delay(1500)
-                        enemy_index += 1
-                        if enemy_index >= len(current_enemies):
-                            if tuple(player_pos) == boss_room:
-                                pass
-                            else:
-                                game_state = "exploration"
-                                play_music(bg_music)
-                                return
-                        else:
-                            # Display message for next enemy
-                            message = f"New enemy: {current_enemies[enemy_index].name}"
+                win_chance = None
+
+                with profiler.scope("session.act"):
+                    battle_events = session.act(action)
+                for battle_event in battle_events:
+                    kind = battle_event[0]
+                    if kind == "player_roll":
+                        player_dice = battle_event[1]
+                    elif kind == "enemy_roll":
+                        enemy_dice = battle_event[1]
+                    elif kind == "dodge_roll":
+                        dodge_dice = battle_event[1]
+                    elif kind == "enemy_defeated":
+                        pass  # แสดงผ่าน session.notices
+                    elif kind == "new_enemy":
+                        message = describe_event(battle_event)
                     else:
-                        enemy_dice = dice_roll()
-                        dodge_dice = dice_roll()
-                        if enemy_dice > dodge_dice:
-                            damage_to_player = enemy.attack + random.randint(0, 5)
-                            player_hp -= damage_to_player
-                            message += f"\nEnemy hits you for {damage_to_player} damage!"
-                        else:
-                            message += "\nYou dodged the enemy attack!"
-
-                    # Apply status effects and regen mana
-                    player.regen_mana()
-                    player_mp = player.mp
-                    
-                    if enemy.burn_turns > 0:
-                        burn_damage = 7
-                        enemy.hp -= burn_damage
-                        enemy.burn_turns -= 1
-                        message += f"\n🔥 Burn deals {burn_damage} damage to {enemy.name}!"
-                    
-                    if enemy.poison_turns > 0:
-                        poison_damage = 10
-                        enemy.hp -= poison_damage
-                        enemy.poison_turns -= 1
-                        message += f"\n💀 Poison deals {poison_damage} damage to {enemy.name}!"
-
-                    # Check again if enemy is defeated after status effects
-                    if enemy.hp <= 0:
-                        screen.fill(BLACK)
-                        draw_text_center(f"You defeated {enemy.name}!", CYAN, screen, HEIGHT/2 - 20)
-                        pygame.display.flip()
-                        pygame.time.delay(1500)
-                        enemy_index += 1
-                        if enemy_index >= len(current_enemies):
-                            if tuple(player_pos) == boss_room:
-                                pass
-                            else:
-                                game_state = "exploration"
-                                play_music(bg_music)
-                                return
-                        else:
-                            # Display message for next enemy
-                            message = f"New enemy: {current_enemies[enemy_index].name}"
-
-        # Check for game over
-        if player_hp <= 0:
-            game_over_screen()
-            return
+                        text = describe_event(battle_event)
+                        message = f"{message}\n{text}" if message else text
+                show_session_notices()
+                if session.outcome == "won":
+                    discard_save()
+                    save_recording()
+                break
+
+    # Check for game over
+    if session.state == "game_over":
+        game_over_screen()
+
+# --- หน้าจอสำรวจ ---
+def draw_exploration_screen():
+    # Draw game screen (วาดใหม่เฉพาะส่วนที่เปลี่ยน)
+    draw_player_and_map()
+
+    # Draw UI
+    with profiler.scope("exploration.hud"):
+        draw_exploration_hud()
+
+def draw_exploration_hud():
+    player = session.player
+    player_pos = session.player_pos
+    map_view.text("mode", "Exploration Mode", 20, 20, WHITE)
+    map_view.text("hp", f"HP: {player.hp}/{player.max_hp}", 20, 50, GREEN)
+    map_view.text("mp", f"MP: {player.mp}/{player.max_mp}", 20, 80, BLUE)
+    map_view.text("keys", f"Keys: {session.keys_collected}/3", WIDTH - 200, 20, YELLOW)
+
+    # Draw current room info
+    current_room = session.dungeon_map[tuple(player_pos)]
+    map_view.text("room", "Room Info:", WIDTH - 200, 80, WHITE)
+
+    if tuple(player_pos) == session.boss_room:
+        map_view.text("enemies", "Boss Room!", WIDTH - 200, 110, RED)
+    elif current_room["enemy"]:
+        map_view.text("enemies", f"Enemies: {', '.join([e.name for e in current_room['enemy']])}", WIDTH - 200, 110, RED)
+    else:
+        map_view.text("enemies", "", WIDTH - 200, 110, RED)
+    map_view.text("trap", "Trap!" if current_room["trap"] else "", WIDTH - 200, 140, RED)
+    map_view.text("item", f"Item: {current_room['item']}" if current_room["item"] else "", WIDTH - 200, 170, YELLOW)
+
+    # Draw movement instructions
+    map_view.text("help_move", "Use arrow keys to move", 20, HEIGHT - 130, WHITE)
+    map_view.text("help_auto", "E: auto-explore, click: travel", 20, HEIGHT - 100, WHITE)
+    map_view.text("help_quit", "Press Q to quit", 20, HEIGHT - 70, WHITE)
+
+# --- เล่นต่อจากไฟล์บันทึก ---
+if cli_args.replay:
+    replayer = Replayer(Recording.load(cli_args.replay))
+    replayer.seek(len(replayer.recording) if cli_args.seek is None else cli_args.seek)
+    session = replayer.session
+    session.recorder = recorder
+    session.set_sight_radius(SIGHT_RADIUS)
+    recorder.resume(replayer.recording, replayer.turn)
+    if session.player is not None:
+        player_image = sprites.get("players", session.player.char_class, SPRITE_SIZE)
+    map_view.resize(session.dungeon_map.width, session.dungeon_map.height)
+
+# --- เดินอัตโนมัติ: E สำรวจห้องที่ยังไม่ไป, คลิกที่แผนที่เพื่อเดินไปห้องนั้น ---
+AUTO_STEP_SECONDS = 0.08
+auto_travel = None  # None, "explore" หรือตำแหน่งเป้าหมาย
+last_auto_step = 0.0
+
+def auto_travel_step():
+    """
+    One step of auto-explore or travel every AUTO_STEP_SECONDS; stops when
+    there is nowhere left to go or a battle starts.
+    """
+    global auto_travel, last_auto_step
+    now = time.monotonic()
+    if now - last_auto_step < AUTO_STEP_SECONDS:
+        pacer.wake()
+        return False
+    last_auto_step = now
+    with profiler.scope("session.auto_step"):
+        moved = session.auto_step(None if auto_travel == "explore" else auto_travel)
+    show_session_notices()
+    if moved is None or session.state != "exploration":
+        auto_travel = None
+    if moved is None:
+        return False
+    pacer.wake()
+    return True
 
 # --- Main Loop ---
-game_state = "start_screen"
 play_music(None) # หยุดเพลงเมื่อเริ่มเกม
 
 while True:
-    if game_state == "start_screen":
+    if session.state != "exploration":
+        map_view.invalidate()
+    play_music(STATE_MUSIC[session.state])
+
+    if session.state == "start_screen":
         start_game_screen()
-    elif game_state == "class_select":
-        game_state = class_selection_screen()
-    elif game_state == "exploration":
-        # Draw game screen
-        screen.fill(BLACK)
-        draw_player_and_map()
-        
-        # Draw UI
-        draw_text("Exploration Mode", 20, 20)
-        draw_text(f"HP: {player_hp}/{player_max_hp}", 20, 50, GREEN)
-        draw_text(f"MP: {player_mp}/{player_max_mp}", 20, 80, BLUE)
-        draw_text(f"Keys: {keys_collected}/3", WIDTH - 200, 20, YELLOW)
-
-        # Draw current room info
-        current_room = dungeon_map[tuple(player_pos)]
-        draw_text("Room Info:", WIDTH - 200, 80)
-        
-        if tuple(player_pos) == boss_room:
-            draw_text("Boss Room!", WIDTH - 200, 110, RED)
-        elif current_room["enemy"]:
-            draw_text(f"Enemies: {', '.join([e.name for e in current_room['enemy']])}", WIDTH - 200, 110, RED)
-        if current_room["trap"]:
-            draw_text("Trap!", WIDTH - 200, 140, RED)
-        if current_room["item"]:
-            draw_text(f"Item: {current_room['item']}", WIDTH - 200, 170, YELLOW)
-            
-        # Draw movement instructions
-        draw_text("Use arrow keys to move", 20, HEIGHT - 100)
-        draw_text("Press Q to quit", 20, HEIGHT - 70)
-        
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+    elif session.state == "class_select":
+        class_selection_screen()
+    elif session.state == "exploration":
+        if draw_notification():
+            map_view.invalidate()
+            pacer.present()
+        else:
+            draw_exploration_screen()
+            pacer.present(map_view.flush())
+
+        events = pacer.get_events()
+        if auto_travel is not None and not events and notices.current is None:
+            if auto_travel_step():
+                autosave()
+                mark_moved_tiles()
+                continue
+
+        for event in events:
+            if notification_event(event):
+                continue
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                auto_travel = map_view.tile_at(event.pos)
             if event.type == pygame.KEYDOWN:
                 moved = False
-                if event.key == pygame.K_UP:
+                auto_travel = None  # กดปุ่มใดก็ได้เพื่อหยุดเดินอัตโนมัติ
+                if event.key == pygame.K_e:
+                    auto_travel = "explore"
+                elif event.key == pygame.K_UP:
                     moved = move_player(0, -1)
                 elif event.key == pygame.K_DOWN:
                     moved = move_player(0, 1)
@@ -862,9 +635,13 @@ while True:
                 elif event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
-                
-                if moved:
-                    check_room_event()
 
-    elif game_state == "battle":
-        battle_screen()
\ No newline at end of file
+                if moved:
+                    autosave()
+                    mark_moved_tiles()
+                    break
+
+    elif session.state == "battle":
+        battle_screen()
+    elif session.state == "game_over":
+        game_over_screen()
@@ -0,0 +1,93 @@
+"""
+Batch dungeon generation for seed analysis.
+
+Generates DungeonGrid maps for a range of seeds across worker processes
+and reduces each one to a small summary, so millions of layouts can be
+compared without keeping the maps around. The same seed and map size
+always give the same summary.
+
+    python genbatch.py -n 1000000 --workers 8
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from dungeon import CHUNK, DungeonGrid
+
+Layout = namedtuple("Layout", "seed boss_x boss_y enemy_rooms enemies traps keys potions meat mana_potions")
+
+
+def layout_summary(grid):
+    """
+    Layout of a fully generated grid: boss position and how many rooms
+    hold enemies, traps and each item type.
+    """
+    for cy in range((grid.height + CHUNK - 1) // CHUNK):
+        for cx in range((grid.width + CHUNK - 1) // CHUNK):
+            grid.chunk_at(cx, cy)
+    boss_x, boss_y = grid.boss_room
+    return Layout(grid.seed, boss_x, boss_y,
+                  grid.count(lambda c: c.enemy), len(grid.pool),
+                  grid.count(lambda c: c.trap), grid.count(lambda c: c.key),
+                  grid.count(lambda c: c.potion), grid.count(lambda c: c.meat),
+                  grid.count(lambda c: c.mana_potion))
+
+
+def _generate_slice(seeds, width, height, summarize):
+    return [summarize(DungeonGrid(width, height, seed=seed)) for seed in seeds]
+
+
+def generate_batch(seeds, width=8, height=8, summarize=layout_summary, workers=None, chunk=5000):
+    """
+    Yields summarize(grid) for every seed in seeds, in order. Work is split
+    into slices of chunk seeds spread over workers processes (all CPUs by
+    default); summarize must be a module-level function so it can be sent
+    to the workers. workers=1 runs in this process.
+    """
+    slices = (seeds[i:i + chunk] for i in range(0, len(seeds), chunk))
+    if workers == 1:
+        for part in slices:
+            yield from _generate_slice(part, width, height, summarize)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = (pool.submit(_generate_slice, part, width, height, summarize) for part in slices)
+        # ส่งงานล่วงหน้าทีละไม่กี่ชิ้น เพื่อไม่ให้ผลลัพธ์ค้างในหน่วยความจำทั้งหมด
+        pending = []
+        for future in futures:
+            pending.append(future)
+            if len(pending) > 2 * (workers or os.cpu_count() or 1):
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate dungeons for a range of seeds")
+    parser.add_argument("-n", type=int, default=100_000, help="number of dungeons")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--size", default="8x8", help="map size, e.g. 8x8")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.n < 1:
+        parser.error("-n must be at least 1")
+    width, height = (int(n) for n in args.size.lower().split("x"))
+
+    start = time.perf_counter()
+    totals = [0] * (len(Layout._fields) - 3)
+    count = 0
+    for layout in generate_batch(range(args.first_seed, args.first_seed + args.n), width, height,
+                                 workers=args.workers):
+        count += 1
+        for i, value in enumerate(layout[3:]):
+            totals[i] += value
+    elapsed = time.perf_counter() - start
+
+    for name, total in zip(Layout._fields[3:], totals):
+        print(f"{name:13} {total / count:8.2f} per dungeon")
+    print(f"{count} dungeons in {elapsed:.2f}s ({count / max(elapsed, 1e-9) * 60:,.0f}/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Runs Dice Dungeons without a display, for soak tests and bots.
+
+Drives session.GameSession directly: no pygame, no rendering, no frame
+pacing, so runs go as fast as the CPU allows. Input is either a script of
+commands (the names session.handle() takes: start, 1-6, up/down/left/
+right, r) or, once the script runs out or when none is given, a bot: the
+random one presses any command that means something in the current state,
+the greedy one fights with combat.greedy_action() and prefers unvisited
+rooms.
+
+    python headless.py --runs 1000 --seed 7 --class Mage
+    python headless.py --script "start 2 right right down 1 1 1"
+    python game.py --headless --runs 100
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+
+from combat import greedy_action
+from session import GameSession, CLASSES, KEYS_NEEDED, MOVES
+from replay import Recorder
+
+POTION_BELOW = 0.3  # บอทดื่มยาเมื่อ HP ต่ำกว่าสัดส่วนนี้
+
+
+def read_script(text):
+    """
+    Commands from a string, or from a file when text starts with "@".
+    """
+    if text.startswith("@"):
+        with open(text[1:], encoding="utf-8") as f:
+            text = f.read()
+    return [command.lower() for command in text.split()]
+
+
+def random_bot(session, rng):
+    return rng.choice(session.commands())
+
+
+def greedy_bot(session, rng):
+    """
+    Heals below POTION_BELOW of max HP, otherwise plays greedy_action() in
+    battle; explores by stepping into a random unvisited neighbour when
+    there is one (not the boss room before all keys are found).
+    """
+    if session.state == "battle":
+        player = session.player
+        if player.hp < player.max_hp * POTION_BELOW and "Potion" in session.inventory:
+            return "4"
+        action = greedy_action(player.char_class, player.hp, player.mp, session.meat_buff_turns)
+        if action is None:
+            # ไม่มี MP พอจะโจมตี: ใช้ Mana Potion หรือเสียตาเพื่อรอ MP ฟื้น
+            return "6"
+        return str(action)
+    if session.state != "exploration":
+        return rng.choice(session.commands())
+    x, y = session.player_pos
+    grid = session.dungeon_map
+    moves = [name for name, (dx, dy) in MOVES.items() if grid.in_bounds(x + dx, y + dy)]
+    locked = session.boss_room if session.keys_collected < KEYS_NEEDED else None
+    fresh = [name for name in moves
+             if (x + MOVES[name][0], y + MOVES[name][1]) != locked
+             and not grid[(x + MOVES[name][0], y + MOVES[name][1])]["visited"]]
+    return rng.choice(fresh or moves)
+
+
+BOTS = {"random": random_bot, "greedy": greedy_bot}
+
+
+def play(session, script=(), char_class=None, bot_rng=None, max_steps=100_000, bot=random_bot):
+    """
+    Plays one run from the start screen until it is won or lost or
+    max_steps commands were sent. Commands come from script, then from
+    bot(session, bot_rng) if bot_rng is given. char_class overrides the
+    class choice. Returns (outcome, steps) with outcome "won", "lost" or
+    "unfinished".
+    """
+    commands = iter(script)
+    steps = 0
+    while steps < max_steps and session.outcome is None:
+        if session.state == "class_select" and char_class is not None:
+            session.choose_class(char_class)
+            continue
+        command = next(commands, None)
+        if command is None:
+            if bot_rng is None:
+                break
+            command = bot(session, bot_rng)
+        session.handle(command)
+        session.notices.clear()
+        steps += 1
+    return session.outcome or "unfinished", steps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Dice Dungeons headless")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the first run; run i uses seed + i")
+    parser.add_argument("--class", dest="char_class", choices=CLASSES, default=None,
+                        help="class to play (default: scripted or random)")
+    parser.add_argument("--script", default=None, help='commands, e.g. "start 1 right 1", or @file')
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--max-steps", type=int, default=100_000, help="commands per run")
+    parser.add_argument("--size", default="8x8", help="map size, e.g. 8x8")
+    parser.add_argument("--no-bot", action="store_true", help="stop when the script runs out")
+    parser.add_argument("--bot", choices=BOTS, default="random", help="bot to play after the script")
+    parser.add_argument("--record", metavar="PATH", default=None,
+                        help="save the last run as a recording (see replay.py)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print one line per run")
+    args = parser.parse_args(argv)
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    width, height = (int(n) for n in args.size.lower().split("x"))
+    script = read_script(args.script) if args.script else []
+
+    outcomes = Counter()
+    total_steps = 0
+    start = time.perf_counter()
+    for run in range(args.runs):
+        seed = None if args.seed is None else args.seed + run
+        session = GameSession(width, height, seed=seed)
+        if args.record:
+            session.recorder = Recorder()
+        bot_rng = None if args.no_bot else random.Random(seed)
+        outcome, steps = play(session, script, args.char_class, bot_rng, args.max_steps, BOTS[args.bot])
+        outcomes[outcome] += 1
+        total_steps += steps
+        if args.verbose:
+            player = session.player
+            hp = player.hp if player is not None else "-"
+            print(f"run {run}: seed {seed} {outcome} after {steps} steps, state {session.state}, "
+                  f"hp {hp}, keys {session.keys_collected}, pos {tuple(session.player_pos)}")
+    elapsed = time.perf_counter() - start
+    if args.record and session.recorder.recording is not None:
+        session.recorder.recording.save(args.record)
+
+    summary = ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items()))
+    print(f"{args.runs} runs in {elapsed:.2f}s: {summary}; "
+          f"{total_steps} steps ({total_steps / max(elapsed, 1e-9):,.0f}/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Retained-mode renderer for the exploration screen.
+
+The tile grid lives on a pre-rendered map layer. Each frame only tiles
+marked with mark_tile(), the player's old and new spots and HUD lines
+whose text changed are redrawn, and flush() hands back the rectangles for
+pygame.display.update(). After another screen has drawn over the display,
+invalidate() forces one full redraw.
+
+Maps larger than the view (view tiles per side) are drawn through a
+scrolling window: only the visible tiles are ever touched, and the window
+recentres on the player when they come within SCROLL_MARGIN of its edge.
+
+With a visibility.Visibility passed to draw_map(), rooms never seen are
+drawn as fog and rooms out of sight are dimmed; the caller marks the
+rooms from its take_changed() after each move.
+"""
+import pygame
+
+TILE_VISITED = (50, 50, 50)
+TILE_UNVISITED = (20, 20, 20)
+# ห้องที่เคยเห็นแต่ตอนนี้อยู่นอกระยะมองเห็น
+TILE_REMEMBERED_VISITED = (30, 30, 30)
+TILE_REMEMBERED_UNVISITED = (10, 10, 10)
+TILE_FOG = (0, 0, 0)
+GRID_LINE = (255, 255, 255)
+FOG_LINE = (60, 60, 60)
+BACKGROUND = (0, 0, 0)
+SCROLL_MARGIN = 2
+
+
+class MapRenderer:
+    def __init__(self, screen, text_cache, font, cols=8, rows=8, view=None):
+        self.screen = screen
+        self.text_cache = text_cache
+        self.font = font
+        self.view_cols = min(cols, view or cols)
+        self.view_rows = min(rows, view or rows)
+        self.origin = (0, 0)
+        self.resize(cols, rows)
+        self._dirty_tiles = set()
+        self._dirty_rects = []
+        self._player_rect = None
+        self._hud = {}
+        self._visibility = None
+
+    def resize(self, cols, rows):
+        """
+        Sets the size of the map in tiles, e.g. for a new dungeon.
+        """
+        self.cols = cols
+        self.rows = rows
+        self._layout()
+        self.layer = pygame.Surface(self.map_rect.size).convert()
+        self.origin = (0, 0)
+        self._valid = False
+
+    def _layout(self):
+        width, height = self.screen.get_size()
+        # คำนวณขนาดช่องและพิกัดเริ่มต้นเพื่อให้อยู่กึ่งกลาง
+        map_size = min(width, height) - 200  # ลดขนาดแผนที่ลงเพื่อให้มีพื้นที่ UI ด้านข้าง
+        self.tile_size = map_size // max(self.view_cols, self.view_rows)
+        self.map_rect = pygame.Rect((width - map_size) // 2, (height - map_size) // 2,
+                                    self.tile_size * self.view_cols, self.tile_size * self.view_rows)
+
+    def invalidate(self):
+        self._valid = False
+
+    def in_view(self, pos):
+        return (0 <= pos[0] - self.origin[0] < self.view_cols
+                and 0 <= pos[1] - self.origin[1] < self.view_rows)
+
+    def mark_tile(self, pos):
+        """
+        Schedules one tile for redraw, e.g. after its room was visited.
+        Tiles outside the view are ignored.
+        """
+        if self.in_view(pos):
+            self._dirty_tiles.add(tuple(pos))
+
+    def tile_rect(self, pos):
+        """
+        Tile rectangle in map layer coordinates.
+        """
+        return pygame.Rect((pos[0] - self.origin[0]) * self.tile_size,
+                           (pos[1] - self.origin[1]) * self.tile_size,
+                           self.tile_size, self.tile_size)
+
+    def tile_at(self, screen_pos):
+        """
+        Map position of the visible tile under a screen point, or None.
+        """
+        if not self.map_rect.collidepoint(screen_pos):
+            return None
+        x = (screen_pos[0] - self.map_rect.x) // self.tile_size + self.origin[0]
+        y = (screen_pos[1] - self.map_rect.y) // self.tile_size + self.origin[1]
+        if x >= self.cols or y >= self.rows:
+            return None
+        return x, y
+
+    def _scroll_to(self, player_pos):
+        """
+        Moves the view so the player stays away from its edges.
+        Invalidates the map when the view moved.
+        """
+        origin = list(self.origin)
+        for axis, view, size in ((0, self.view_cols, self.cols), (1, self.view_rows, self.rows)):
+            local = player_pos[axis] - origin[axis]
+            margin = min(SCROLL_MARGIN, (view - 1) // 2)
+            if local < margin or local >= view - margin:
+                origin[axis] = max(0, min(size - view, player_pos[axis] - view // 2))
+        origin = tuple(origin)
+        if origin != self.origin:
+            self.origin = origin
+            self._valid = False
+
+    def _draw_tile(self, dungeon_map, pos):
+        rect = self.tile_rect(pos)
+        visibility = self._visibility
+        if visibility is not None and not visibility.is_seen(pos):
+            # ห้องที่ยังไม่เคยเห็นไม่ต้องอ่าน (และไม่ต้องสุ่ม) chunk ของมัน
+            pygame.draw.rect(self.layer, TILE_FOG, rect)
+            pygame.draw.rect(self.layer, FOG_LINE, rect, 1)
+            return rect.move(self.map_rect.topleft)
+        room = dungeon_map[pos]
+        visited = room.chunk.visited >> room.index & 1
+        if visibility is None or visibility.is_visible(pos):
+            color = TILE_VISITED if visited else TILE_UNVISITED
+        else:
+            color = TILE_REMEMBERED_VISITED if visited else TILE_REMEMBERED_UNVISITED
+        pygame.draw.rect(self.layer, color, rect)
+        pygame.draw.rect(self.layer, GRID_LINE, rect, 1)
+        return rect.move(self.map_rect.topleft)
+
+    def _restore(self, rect):
+        """
+        Copies the map layer back over a screen rectangle (clipped to the map).
+        """
+        clipped = rect.clip(self.map_rect)
+        if clipped.width and clipped.height:
+            self.screen.blit(self.layer, clipped, clipped.move(-self.map_rect.x, -self.map_rect.y))
+        for outside in _subtract(rect, clipped):
+            self.screen.fill(BACKGROUND, outside)
+
+    def draw_map(self, dungeon_map, player_pos, player_image, visibility=None):
+        if visibility is not self._visibility:
+            self._visibility = visibility
+            self._valid = False
+        self._scroll_to(player_pos)
+        if not self._valid:
+            self.screen.fill(BACKGROUND)
+            ox, oy = self.origin
+            for x in range(ox, ox + self.view_cols):
+                for y in range(oy, oy + self.view_rows):
+                    self._draw_tile(dungeon_map, (x, y))
+            self.screen.blit(self.layer, self.map_rect)
+            self._dirty_tiles.clear()
+            self._hud.clear()
+            self._player_rect = None
+            self._dirty_rects = [self.screen.get_rect()]
+            self._valid = True
+        else:
+            for pos in self._dirty_tiles:
+                rect = self._draw_tile(dungeon_map, pos)
+                self.screen.blit(self.layer, rect, self.tile_rect(pos))
+                self._dirty_rects.append(rect)
+            self._dirty_tiles.clear()
+
+        # วาดตำแหน่งผู้เล่น
+        rect = player_image.get_rect()
+        rect.center = self.tile_rect(player_pos).move(self.map_rect.topleft).center
+        if rect != self._player_rect:
+            if self._player_rect is not None:
+                self._restore(self._player_rect)
+                self._dirty_rects.append(self._player_rect)
+            self.screen.blit(player_image, rect)
+            self._dirty_rects.append(rect)
+            self._player_rect = rect
+        elif rect.collidelist(self._dirty_rects) != -1:
+            self.screen.blit(player_image, rect)
+            self._dirty_rects.append(rect)
+
+    def text(self, key, text, x, y, color):
+        """
+        HUD line identified by key; redrawn only when its text or colour
+        changes. An empty text clears the line.
+        """
+        if self._hud.get(key, (None, None, None))[:2] == (text, color):
+            return
+        old = self._hud.get(key, (None, None, None))[2]
+        if old is not None:
+            self.screen.fill(BACKGROUND, old)
+            self._dirty_rects.append(old)
+        rect = None
+        if text:
+            line_y = y
+            for surface in self.text_cache.render_lines(self.font, text, color):
+                line_rect = self.screen.blit(surface, (x, line_y))
+                rect = line_rect if rect is None else rect.union(line_rect)
+                line_y += self.font.get_linesize()
+            self._dirty_rects.append(rect)
+        self._hud[key] = (text, color, rect)
+
+    def flush(self):
+        """
+        Rectangles changed since the last flush, for pygame.display.update().
+        """
+        rects, self._dirty_rects = self._dirty_rects, []
+        return rects
+
+
+def _subtract(rect, inner):
+    """
+    Up to four rectangles covering rect minus inner (inner lies inside rect).
+    """
+    if not inner.width or not inner.height:
+        return [rect]
+    parts = [
+        pygame.Rect(rect.left, rect.top, rect.width, inner.top - rect.top),
+        pygame.Rect(rect.left, inner.bottom, rect.width, rect.bottom - inner.bottom),
+        pygame.Rect(rect.left, inner.top, inner.left - rect.left, inner.height),
+        pygame.Rect(inner.right, inner.top, rect.right - inner.right, inner.height),
+    ]
+    return [p for p in parts if p.width > 0 and p.height > 0]
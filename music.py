@@ -0,0 +1,94 @@
+"""
+Background music streamed from disk with pygame.mixer.music.
+
+Tracks are decoded in small chunks while they play instead of being
+unpacked into PCM up front. Switching tracks fades the current one out
+over fade seconds and fades the next one in; pygame has a single music
+stream, so the two fades run back to back rather than overlapping.
+update() drives the fades and must be called once per frame.
+"""
+import os
+import time
+
+import pygame
+
+
+class MusicPlayer:
+    def __init__(self, tracks, fade=0.8, volume=1.0, clock=time.monotonic):
+        self.tracks = {}
+        self.fade = fade
+        self.volume = volume
+        self.clock = clock
+        self.current = None
+        self._pending = None
+        self._fade_started = None
+        self.enabled = pygame.mixer.get_init() is not None
+        for name, path in tracks.items():
+            if os.path.exists(path):
+                self.tracks[name] = path
+            else:
+                print(f"Error loading sound files: {path} not found")
+
+    def play(self, name):
+        """
+        Switches to track name (None for silence) with a fade.
+        Asking for the track already playing does nothing.
+        """
+        if not self.enabled or name == self._target:
+            return
+        if name is not None and name not in self.tracks:
+            name = None
+        if self._fade_started is not None and name == self.current:
+            # ยกเลิกการเฟดแล้วเล่นเพลงเดิมต่อ
+            self._pending, self._fade_started = None, None
+            pygame.mixer.music.set_volume(self.volume)
+            return
+        self._pending = name
+        if self.current is None:
+            self._start_pending()
+        else:
+            self._fade_started = self.clock()
+
+    @property
+    def _target(self):
+        return self._pending if self._fade_started is not None else self.current
+
+    def _start_pending(self):
+        name, self._pending, self._fade_started = self._pending, None, None
+        self.current = name
+        if name is None:
+            pygame.mixer.music.stop()
+            return
+        try:
+            pygame.mixer.music.load(self.tracks[name])
+            pygame.mixer.music.set_volume(self.volume)
+            pygame.mixer.music.play(-1, fade_ms=int(self.fade * 1000))
+        except pygame.error as e:
+            print(f"Error playing {name}: {e}")
+            self.current = None
+
+    def update(self):
+        """
+        Advances a fade in progress. Returns True while fading so the
+        caller can keep the frame rate up.
+        """
+        if self._fade_started is None:
+            return False
+        progress = (self.clock() - self._fade_started) / self.fade if self.fade else 1.0
+        if progress >= 1.0:
+            self._start_pending()
+            return False
+        pygame.mixer.music.set_volume(self.volume * (1.0 - progress))
+        return True
+
+    def footprint(self):
+        """
+        Memory held for music: nothing is decoded ahead of playback, only
+        the mixer's stream buffer, so this reports file sizes on disk.
+        """
+        return {
+            "streaming": True,
+            "decoded_bytes": 0,
+            "track_file_bytes": {name: os.path.getsize(path) for name, path in self.tracks.items()},
+            "current": self.current,
+        }
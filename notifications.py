@@ -0,0 +1,58 @@
+"""
+Timed on-screen notifications ("Trap!", "You defeated Orc!", ...).
+
+Messages are queued and shown one at a time by whichever screen loop is
+running; each one expires after its duration, counted from when it
+reaches the front. Nothing here blocks, so the game keeps handling
+events while a message is up.
+"""
+import time
+from collections import deque
+
+
+class Notification:
+    def __init__(self, text, color, duration):
+        self.text = text
+        self.color = color
+        self.duration = duration
+        self.expires = None
+
+
+class NotificationQueue:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._queue = deque()
+
+    def push(self, text, color, duration):
+        """
+        Queues a message shown for duration seconds.
+        """
+        self._queue.append(Notification(text, color, duration))
+
+    @property
+    def current(self):
+        """
+        The message to show now, or None. Expired messages are dropped.
+        """
+        now = self.clock()
+        while self._queue:
+            notice = self._queue[0]
+            if notice.expires is None:
+                notice.expires = now + notice.duration
+            if now < notice.expires:
+                return notice
+            self._queue.popleft()
+        return None
+
+    def skip(self):
+        """
+        Dismisses the message on screen; the next one starts right away.
+        """
+        if self._queue:
+            self._queue.popleft()
+
+    def clear(self):
+        self._queue.clear()
+
+    def __len__(self):
+        return len(self._queue)
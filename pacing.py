@@ -0,0 +1,194 @@
+"""
+Frame pacing shared by every screen loop in game.py.
+
+Loops call pacer.get_events() where they used pygame.event.get() and
+pacer.present() where they used pygame.display.flip(). While the player
+is active frames are capped at the target FPS; once nothing has happened
+for a while the pacer blocks in pygame.event.wait() at a low tick rate,
+which returns the moment a key is pressed. Callables in frame_hooks run
+once per frame; one that returns True keeps the loop at full rate.
+Callables in redraw_hooks run when an overlay is hidden and the screen
+under it has to be drawn again.
+
+With a profiler.Profiler attached, the wait, the frame hooks and the
+flip are timed as scopes and every get_events() call closes a frame; F4
+shows the profiler overlay (frame time percentiles, a histogram of the
+recent frames and the slowest scopes).
+"""
+import time
+from collections import deque
+
+import pygame
+
+from profiler import Profiler
+
+PROFILE_BG = (0, 0, 0)
+PROFILE_FG = (0, 255, 0)
+PROFILE_BAR = (0, 160, 255)
+HISTOGRAM_BINS = 32
+HISTOGRAM_HEIGHT = 40
+
+
+class FramePacer:
+    def __init__(self, fps=60, idle_fps=5, idle_after=2.0, font=None, history=240, profiler=None):
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.font = font
+        self.show_stats = False
+        self.clock = pygame.time.Clock()
+        self.frame_times = deque(maxlen=history)
+        self._last_frame = time.perf_counter()
+        self._last_activity = self._last_frame
+        self._stats_rect = None
+        self.frame_hooks = []
+        self.redraw_hooks = []
+        self.profiler = profiler if profiler is not None else Profiler(history)
+        self.show_profile = False
+        self._profile_rect = None
+
+    def wake(self):
+        """
+        Keeps the loop at full rate for another idle_after seconds; call it
+        when something on screen changes without player input.
+        """
+        self._last_activity = time.perf_counter()
+
+    @property
+    def idle(self):
+        return time.perf_counter() - self._last_activity > self.idle_after
+
+    def get_events(self):
+        """
+        Waits out the rest of the frame, then returns pending events.
+        F3 toggles the frame time readout and F4 the profiler overlay;
+        neither is passed on.
+        """
+        profiler = self.profiler
+        with profiler.scope("pacer.wait"):
+            if self.idle:
+                first = pygame.event.wait(int(1000 / self.idle_fps))
+                events = [] if first.type == pygame.NOEVENT else [first]
+                events.extend(pygame.event.get())
+                self.clock.tick()
+            else:
+                self.clock.tick(self.fps)
+                events = pygame.event.get()
+        profiler.end_frame()
+
+        with profiler.scope("frame_hooks"):
+            for hook in self.frame_hooks:
+                if hook():
+                    self.wake()
+
+        now = time.perf_counter()
+        self.frame_times.append(now - self._last_frame)
+        self._last_frame = now
+
+        passed = []
+        for event in events:
+            if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.ACTIVEEVENT,
+                              pygame.WINDOWEXPOSED, pygame.VIDEORESIZE):
+                self._last_activity = now
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_stats = not self.show_stats
+                self._overlay_toggled(self.show_stats)
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.show_profile = not self.show_profile
+                # ตอนบันทึก trace อยู่ให้ profiler ทำงานต่อแม้ปิด overlay
+                profiler.enabled = self.show_profile or profiler.tracing
+                self._overlay_toggled(self.show_profile)
+                continue
+            passed.append(event)
+        return passed
+
+    def _overlay_toggled(self, shown):
+        if not shown:
+            for hook in self.redraw_hooks:
+                hook()
+
+    def stats(self):
+        """
+        Measured frame times over the recent history, in milliseconds.
+        """
+        if not self.frame_times:
+            return {"fps": 0.0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "idle": self.idle}
+        times = sorted(self.frame_times)
+        avg = sum(times) / len(times)
+        return {
+            "fps": 1 / avg if avg else 0.0,
+            "avg_ms": avg * 1000,
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+            "max_ms": times[-1] * 1000,
+            "idle": self.idle,
+        }
+
+    def report(self):
+        s = self.stats()
+        mode = "idle" if s["idle"] else "active"
+        return f"{s['fps']:.0f} FPS  avg {s['avg_ms']:.1f} ms  p95 {s['p95_ms']:.1f} ms ({mode})"
+
+    def _draw_profile(self, surface):
+        """
+        Profiler report lines over a histogram of recent frame times, in
+        the top right corner. Returns the rect drawn.
+        """
+        lines = [self.font.render(line, True, PROFILE_FG, PROFILE_BG)
+                 for line in self.profiler.report_lines()]
+        # แกนของฮิสโตแกรมคือสองเท่าของเวลาต่อเฟรมที่ตั้งไว้ เฟรมที่ช้ากว่านั้นรวมอยู่ช่องสุดท้าย
+        budget_ms = 1000 / self.fps
+        counts, max_ms = self.profiler.histogram(HISTOGRAM_BINS, 2 * budget_ms)
+        label = self.font.render(f"0 - {max_ms:.1f} ms (budget {budget_ms:.1f})", True,
+                                 PROFILE_FG, PROFILE_BG)
+        width = max([label.get_width()] + [line.get_width() for line in lines]) + 10
+        height = sum(line.get_height() for line in lines) + HISTOGRAM_HEIGHT + label.get_height() + 15
+        rect = pygame.Rect(surface.get_width() - width - 10, 10, width, height)
+        surface.fill(PROFILE_BG, rect)
+
+        y = rect.y + 5
+        for line in lines:
+            surface.blit(line, (rect.x + 5, y))
+            y += line.get_height()
+        y += 5
+        bar_width = max(1, (width - 10) // HISTOGRAM_BINS)
+        tallest = max(counts) or 1
+        for i, n in enumerate(counts):
+            bar = n * HISTOGRAM_HEIGHT // tallest
+            if bar:
+                surface.fill(PROFILE_BAR, (rect.x + 5 + i * bar_width, y + HISTOGRAM_HEIGHT - bar,
+                                           bar_width - 1, bar))
+        surface.fill(PROFILE_FG, (rect.x + 5 + HISTOGRAM_BINS // 2 * bar_width, y, 1, HISTOGRAM_HEIGHT))
+        surface.blit(label, (rect.x + 5, y + HISTOGRAM_HEIGHT + 5))
+        return rect
+
+    def present(self, dirty_rects=None):
+        """
+        Draws the frame time readout and profiler overlay when enabled,
+        then pushes the frame: the whole display, or only dirty_rects when
+        given.
+        """
+        surface = pygame.display.get_surface()
+        changed = []
+        for attr in ("_stats_rect", "_profile_rect"):
+            rect = getattr(self, attr)
+            if rect is not None:
+                surface.fill((0, 0, 0), rect)
+                changed.append(rect)
+                setattr(self, attr, None)
+        if self.show_stats and self.font is not None:
+            text = self.font.render(self.report(), True, (255, 255, 0), (0, 0, 0))
+            rect = text.get_rect(bottomright=(surface.get_width() - 10, surface.get_height() - 10))
+            surface.blit(text, rect)
+            changed.append(rect)
+            self._stats_rect = rect
+        if self.show_profile and self.font is not None:
+            rect = self._draw_profile(surface)
+            changed.append(rect)
+            self._profile_rect = rect
+        if dirty_rects is None:
+            with self.profiler.scope("display.flip"):
+                pygame.display.flip()
+        elif dirty_rects or changed:
+            with self.profiler.scope("display.update"):
+                pygame.display.update(dirty_rects + changed)
@@ -0,0 +1,319 @@
+"""
+Route planning over a DungeonGrid with cached distance fields.
+
+A DistanceField holds, for every room of a rectangular window of the map,
+the cheapest cost of walking from that room to any of its goal rooms,
+where stepping into a room costs CostModel.cost() of that room. Once a
+field is built, a route is found by walking downhill from the player,
+which takes time proportional to the route length, not the map size.
+
+When a room changes (visited, trap sprung, enemies beaten, the boss
+unlocked) update() repairs only the rooms whose distance went through it
+and lets improvements spread outward, instead of rebuilding the field.
+
+Navigator keeps one field for auto-explore (goal: the nearest unvisited
+room) and a few for travel targets. The explore field covers a window
+around the player that is grown when no unvisited room is reachable
+inside it; a travel field covers the player and the target plus a fixed
+margin. Planning never generates chunks: rooms of chunks not generated
+yet count as unvisited and cost one plain step (apart from the locked
+boss room, whose position is known), and their real costs are read in
+once the chunk exists. So routes on a 1024x1024 map stay local and
+memory keeps following the area actually explored.
+"""
+import heapq
+
+from dungeon import CHUNK
+
+INF = float("inf")
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+EXPLORE_RADIUS = 16
+TARGET_MARGIN = 8
+MAX_TARGET_FIELDS = 8
+
+
+class CostModel:
+    """
+    Cost of stepping into a room: step, plus trap for a room with a trap
+    and enemy for a room with enemies (negative weights make the route
+    prefer them; a room never costs less than 1). The boss room cannot be
+    entered until keys_needed keys are held.
+    """
+    def __init__(self, step=5, trap=20, enemy=40, keys_needed=3):
+        self.step = step
+        self.trap = trap
+        self.enemy = enemy
+        self.keys_needed = keys_needed
+
+    def cost(self, grid, pos, keys):
+        """
+        Cost of entering pos, or None if it cannot be entered.
+        """
+        x, y = pos
+        chunk = grid.chunks.get((x // CHUNK, y // CHUNK))
+        if chunk is None:
+            # chunk ที่ยังไม่ถูกสุ่ม: ไม่รู้ว่ามีกับดักหรือศัตรูไหม จึงคิดเป็นก้าวธรรมดา
+            if pos == grid.boss_room and keys < self.keys_needed:
+                return None
+            return max(1, self.step)
+        mask = 1 << (y % CHUNK) * CHUNK + x % CHUNK
+        if chunk.boss & mask and keys < self.keys_needed:
+            return None
+        cost = self.step
+        if chunk.trap & mask:
+            cost += self.trap
+        if chunk.enemy & mask:
+            cost += self.enemy
+        return max(1, cost)
+
+
+AVOID = CostModel()
+DIRECT = CostModel(trap=0, enemy=0)
+SEEK_FIGHTS = CostModel(trap=20, enemy=-4)
+
+
+class DistanceField:
+    """
+    Distances to the rooms picked by is_goal(pos) over the window
+    (x0, y0, x1, y1), end exclusive. cost(pos) gives the cost of entering
+    a room or None for rooms that cannot be entered.
+    """
+    def __init__(self, window, cost, is_goal):
+        self.window = window
+        self._cost_of = cost
+        self._is_goal = is_goal
+        x0, y0, x1, y1 = window
+        self.width = x1 - x0
+        self.height = y1 - y0
+        self.cost = [cost(pos) for pos in self._cells()]
+        self.goal = [cost_ is not None and is_goal(pos)
+                     for pos, cost_ in zip(self._cells(), self.cost)]
+        self.dist = [INF] * (self.width * self.height)
+        self._relax([(0, i) for i, goal in enumerate(self.goal) if goal])
+
+    def _cells(self):
+        x0, y0, x1, y1 = self.window
+        return ((x, y) for y in range(y0, y1) for x in range(x0, x1))
+
+    def __contains__(self, pos):
+        x0, y0, x1, y1 = self.window
+        return x0 <= pos[0] < x1 and y0 <= pos[1] < y1
+
+    def _index(self, pos):
+        return (pos[1] - self.window[1]) * self.width + pos[0] - self.window[0]
+
+    def _pos(self, i):
+        return self.window[0] + i % self.width, self.window[1] + i // self.width
+
+    def _neighbours(self, i):
+        x, y = i % self.width, i // self.width
+        if x > 0:
+            yield i - 1
+        if x < self.width - 1:
+            yield i + 1
+        if y > 0:
+            yield i - self.width
+        if y < self.height - 1:
+            yield i + self.width
+
+    def _relax(self, heap):
+        """
+        Dijkstra from the (distance, index) entries in heap, lowering
+        distances only.
+        """
+        dist, cost = self.dist, self.cost
+        for d, i in heap:
+            if d < dist[i]:
+                dist[i] = d
+        heapq.heapify(heap)
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            # เดินเข้าห้อง i จากห้องข้างเคียงเสียค่าเท่ากับ cost ของห้อง i
+            through = d + cost[i]
+            for n in self._neighbours(i):
+                if through < dist[n] and cost[n] is not None:
+                    dist[n] = through
+                    heapq.heappush(heap, (through, n))
+
+    def distance(self, pos):
+        return self.dist[self._index(pos)] if pos in self else INF
+
+    def update(self, pos):
+        """
+        Re-reads the cost and goal state of pos and repairs the distances
+        that depend on it.
+        """
+        if pos not in self:
+            return
+        i = self._index(pos)
+        dist, cost, goal = self.dist, self.cost, self.goal
+        old_cost = cost[i]
+        new_cost = self._cost_of(pos)
+        new_goal = new_cost is not None and self._is_goal(pos)
+        if new_cost == old_cost and new_goal == goal[i]:
+            return
+
+        # ห้องที่ระยะทางเดิมผ่านห้อง i ต้องคำนวณใหม่ทั้งหมด
+        affected = {i}
+        stack = [i]
+        while stack:
+            u = stack.pop()
+            through = dist[u] + (old_cost if u == i else cost[u]) if dist[u] != INF else INF
+            for n in self._neighbours(u):
+                if n not in affected and dist[n] != INF and dist[n] == through and not goal[n]:
+                    affected.add(n)
+                    stack.append(n)
+
+        cost[i] = new_cost
+        goal[i] = new_goal
+        heap = []
+        for u in affected:
+            dist[u] = INF
+        for u in affected:
+            if cost[u] is None:
+                continue
+            if goal[u]:
+                heap.append((0, u))
+                continue
+            best = min((dist[n] + cost[n] for n in self._neighbours(u)
+                        if n not in affected and cost[n] is not None), default=INF)
+            if best != INF:
+                heap.append((best, u))
+        # ห้อง i อยู่ใน heap ด้วย ถ้าถูกลงหรือกลายเป็นเป้าหมาย ค่าที่ลดลงจะกระจายออกไปเองใน _relax
+        self._relax(heap)
+
+    def route(self, start, limit=None):
+        """
+        Rooms to step through from start to the nearest goal (start not
+        included), or None when no goal is reachable in the window. start
+        may be a room that cannot be entered (the player turned away at
+        the locked boss room stands in it); the route then leaves it
+        through its best neighbour.
+        """
+        if start not in self:
+            return None
+        i = self._index(start)
+        if self.dist[i] == INF and self.cost[i] is not None:
+            return None
+        path = []
+        dist, cost = self.dist, self.cost
+        while dist[i] > 0 and (limit is None or len(path) < limit):
+            best, best_value = None, INF
+            for n in self._neighbours(i):
+                if cost[n] is not None and cost[n] + dist[n] < best_value:
+                    best, best_value = n, cost[n] + dist[n]
+            if best is None:
+                return None
+            i = best
+            path.append(self._pos(i))
+        return path
+
+
+class Navigator:
+    """
+    Distance fields for one dungeon, kept up to date through
+    room_changed(). keys() returns the keys the player holds, which decide
+    whether the boss room can be entered.
+    """
+    def __init__(self, grid, keys=lambda: 0, cost_model=AVOID):
+        self.grid = grid
+        self.keys = keys
+        self.cost_model = cost_model
+        self.explore_field = None
+        self.target_fields = {}
+        self._known_chunks = set(grid.chunks)
+
+    def set_cost_model(self, cost_model):
+        self.cost_model = cost_model
+        self.explore_field = None
+        self.target_fields.clear()
+
+    def _cost(self, pos):
+        return self.cost_model.cost(self.grid, pos, self.keys())
+
+    def _window(self, points, margin):
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return (max(0, min(xs) - margin), max(0, min(ys) - margin),
+                min(self.grid.width, max(xs) + margin + 1), min(self.grid.height, max(ys) + margin + 1))
+
+    def _covers_map(self, window):
+        return window == (0, 0, self.grid.width, self.grid.height)
+
+    def room_changed(self, pos):
+        """
+        Call after anything about the room at pos changed.
+        """
+        self._sync_chunks()
+        self._update(pos)
+
+    def _update(self, pos):
+        if self.explore_field is not None:
+            self.explore_field.update(pos)
+        for field in self.target_fields.values():
+            field.update(pos)
+
+    def _sync_chunks(self):
+        """
+        Reads in the real costs of chunks generated since the fields were
+        built in place of the plain-step estimate.
+        """
+        chunks = self.grid.chunks
+        if len(chunks) == len(self._known_chunks):
+            return
+        for cx, cy in set(chunks) - self._known_chunks:
+            for y in range(cy * CHUNK, min((cy + 1) * CHUNK, self.grid.height)):
+                for x in range(cx * CHUNK, min((cx + 1) * CHUNK, self.grid.width)):
+                    self._update((x, y))
+        self._known_chunks = set(chunks)
+
+    def explore_route(self, start):
+        """
+        Route to the nearest unvisited room that can be entered, or None
+        when every reachable room has been visited.
+        """
+        grid = self.grid
+        self._sync_chunks()
+
+        def unvisited(pos):
+            x, y = pos
+            chunk = grid.chunks.get((x // CHUNK, y // CHUNK))
+            return chunk is None or not chunk.visited >> (y % CHUNK) * CHUNK + x % CHUNK & 1
+
+        field = self.explore_field
+        margin = EXPLORE_RADIUS
+        if field is not None and start in field:
+            x0, y0, x1, y1 = field.window
+            # ใกล้ขอบหน้าต่างเกินไปแล้ว (และยังไม่ใช่ขอบแผนที่) ก็สร้างหน้าต่างใหม่รอบผู้เล่น
+            near_edge = ((start[0] - x0 < 2 and x0 > 0) or (x1 - start[0] <= 2 and x1 < grid.width)
+                         or (start[1] - y0 < 2 and y0 > 0) or (y1 - start[1] <= 2 and y1 < grid.height))
+            if not near_edge:
+                route = field.route(start)
+                if route is not None or self._covers_map(field.window):
+                    return route
+                margin = max(field.width, field.height)
+        while True:
+            window = self._window([start], margin)
+            field = DistanceField(window, self._cost, unvisited)
+            self.explore_field = field
+            route = field.route(start)
+            if route is not None or self._covers_map(window):
+                return route
+            margin *= 2
+
+    def travel_route(self, start, target):
+        """
+        Route to target, or None when it cannot be reached.
+        """
+        target = tuple(target)
+        self._sync_chunks()
+        field = self.target_fields.pop(target, None)
+        if field is None or start not in field:
+            field = DistanceField(self._window([start, target], TARGET_MARGIN), self._cost,
+                                  lambda pos: pos == target)
+        self.target_fields[target] = field
+        while len(self.target_fields) > MAX_TARGET_FIELDS:
+            del self.target_fields[next(iter(self.target_fields))]
+        return field.route(start)
@@ -0,0 +1,193 @@
+"""
+Frame profiler: named timing scopes, per-frame counters and trace export.
+
+Code marks the phases it wants measured with
+
+    with profiler.scope("battle.inventory"):
+        ...
+
+and bumps counters such as profiler.count("surfaces") where it allocates.
+The frame pacer calls end_frame() once per frame, which files the scope
+totals and counters of the frame into a rolling history for the overlay
+(see pacing.py, F4) and, while tracing, into a Chrome trace that
+export_chrome_trace() writes for chrome://tracing or Perfetto.
+
+While disabled, scope() hands back one shared no-op context and count()
+returns at once, so the instrumentation can stay in the hot paths.
+"""
+import json
+import time
+from collections import deque
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        end = profiler.clock()
+        totals = profiler._scopes
+        totals[self.name] = totals.get(self.name, 0.0) + end - self.start
+        if profiler.tracing:
+            profiler._trace_span(self.name, "scope", self.start, end)
+        return False
+
+
+class Profiler:
+    def __init__(self, history=240, max_trace_events=500_000, clock=time.perf_counter):
+        self.clock = clock
+        self.enabled = False
+        self.tracing = False
+        # หนึ่งรายการต่อเฟรม: (เวลาเฟรมเป็นวินาที, เวลารวมของแต่ละ scope, ตัวนับ)
+        self.frames = deque(maxlen=history)
+        self.trace_events = deque(maxlen=max_trace_events)
+        self._scopes = {}
+        self._counts = {}
+        self._origin = clock()
+        self._frame_start = None
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def start_trace(self):
+        """
+        Enables the profiler and starts collecting trace events; the oldest
+        are dropped once max_trace_events is reached.
+        """
+        self.enabled = True
+        self.tracing = True
+
+    def _trace_span(self, name, category, start, end):
+        self.trace_events.append({
+            "name": name, "cat": category, "ph": "X", "pid": 0, "tid": 0,
+            "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6,
+        })
+
+    def end_frame(self):
+        """
+        Closes the current frame. Scope time outside an enabled stretch is
+        not counted, so the first frame after enabling only starts the clock.
+        """
+        now = self.clock()
+        if not self.enabled:
+            self._frame_start = None
+            return
+        if self._frame_start is not None:
+            self.frames.append((now - self._frame_start, self._scopes, self._counts))
+            if self.tracing:
+                self._trace_span("frame", "frame", self._frame_start, now)
+                ts = (now - self._origin) * 1e6
+                for name, value in self._counts.items():
+                    self.trace_events.append({"name": name, "ph": "C", "pid": 0, "tid": 0,
+                                              "ts": ts, "args": {name: value}})
+        self._scopes = {}
+        self._counts = {}
+        self._frame_start = now
+
+    def reset(self):
+        self.frames.clear()
+        self.trace_events.clear()
+        self._scopes = {}
+        self._counts = {}
+        self._frame_start = None
+
+    # --- สถิติสำหรับ overlay ---
+    def frame_percentiles(self, percents=(50, 90, 99)):
+        """
+        Frame times at the given percentiles of the history, in milliseconds.
+        """
+        times = sorted(frame[0] for frame in self.frames)
+        if not times:
+            return {p: 0.0 for p in percents}
+        last = len(times) - 1
+        return {p: times[min(last, int(len(times) * p / 100))] * 1000 for p in percents}
+
+    def histogram(self, bins=24, max_ms=None):
+        """
+        Frame counts in bins equal-width bins from 0 to max_ms (the slowest
+        frame by default); slower frames land in the last bin. Returns
+        (counts, max_ms).
+        """
+        times = [frame[0] * 1000 for frame in self.frames]
+        if max_ms is None:
+            max_ms = max(times, default=0.0) or 1.0
+        counts = [0] * bins
+        for ms in times:
+            counts[min(bins - 1, int(ms / max_ms * bins))] += 1
+        return counts, max_ms
+
+    def scope_stats(self):
+        """
+        Per scope: (average ms per frame, worst frame ms), slowest first.
+        """
+        totals, worst = {}, {}
+        for _, scopes, _ in self.frames:
+            for name, seconds in scopes.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+                worst[name] = max(worst.get(name, 0.0), seconds)
+        n = len(self.frames) or 1
+        stats = {name: (total / n * 1000, worst[name] * 1000) for name, total in totals.items()}
+        return dict(sorted(stats.items(), key=lambda item: item[1][0], reverse=True))
+
+    def counter_stats(self):
+        """
+        Per counter: (average per frame, most in one frame).
+        """
+        totals, most = {}, {}
+        for _, _, counts in self.frames:
+            for name, value in counts.items():
+                totals[name] = totals.get(name, 0) + value
+                most[name] = max(most.get(name, 0), value)
+        n = len(self.frames) or 1
+        return {name: (total / n, most[name]) for name, total in totals.items()}
+
+    def report_lines(self, top=8):
+        p = self.frame_percentiles((50, 90, 99, 100))
+        lines = [f"frame p50 {p[50]:.1f}  p90 {p[90]:.1f}  p99 {p[99]:.1f}  max {p[100]:.1f} ms"]
+        for name, (avg, most) in self.counter_stats().items():
+            lines.append(f"{name}/frame avg {avg:.1f}  max {most}")
+        for name, (avg, worst) in list(self.scope_stats().items())[:top]:
+            lines.append(f"{name:20} {avg:6.2f} ms  max {worst:6.2f}")
+        return lines
+
+    # --- ส่งออก ---
+    def export_chrome_trace(self, path):
+        """
+        Writes the collected trace events as Chrome trace JSON.
+        """
+        data = {
+            "traceEvents": [
+                {"name": "process_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "Dice Dungeons"}},
+                *self.trace_events,
+            ],
+            "displayTimeUnit": "ms",
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
@@ -0,0 +1,246 @@
+"""
+Input recordings and replays of single runs.
+
+A run is fully determined by its run seed and the commands the player
+sent (see session.py), so a recording is just those plus timestamps:
+
+    magic "DDRP", version u8, map width/height u16, run seed u64,
+    command count u32, then per command: milliseconds since the previous
+    command as a LEB128 varint and one command code byte
+
+which comes to two or three bytes per key press. Replayer plays one back
+into a fresh GameSession, fast-forwarded or in real time, and keeps a
+checkpoint every checkpoint_every commands so seek() to any turn only
+replays the commands since the nearest checkpoint.
+
+    python replay.py saves/last_run.ddr              # fast-forward, summary
+    python replay.py saves/last_run.ddr --realtime   # original timing
+    python replay.py saves/last_run.ddr --seek 120   # state at turn 120
+    python game.py --replay saves/last_run.ddr --seek 120   # play on from there
+"""
+import argparse
+import struct
+import sys
+import time
+
+import savegame
+from session import GameSession
+
+MAGIC = b"DDRP"
+VERSION = 1
+
+COMMANDS = ["start", "1", "2", "3", "4", "5", "6", "up", "down", "left", "right", "r"]
+COMMAND_CODES = {command: code for code, command in enumerate(COMMANDS)}
+
+_HEADER = struct.Struct("<4sBHHQI")
+
+
+class Recording:
+    def __init__(self, seed, width=8, height=8, commands=None, times=None):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.commands = commands if commands is not None else []
+        self.times = times if times is not None else []  # วินาทีนับจากเริ่มบันทึก
+
+    def __len__(self):
+        return len(self.commands)
+
+    def dumps(self):
+        parts = [_HEADER.pack(MAGIC, VERSION, self.width, self.height, self.seed, len(self.commands))]
+        previous = 0
+        for command, seconds in zip(self.commands, self.times):
+            ms = int(seconds * 1000)
+            delta = max(ms - previous, 0)
+            previous += delta
+            while delta >= 0x80:
+                parts.append(bytes((delta & 0x7F | 0x80,)))
+                delta >>= 7
+            parts.append(bytes((delta, COMMAND_CODES[command])))
+        return b"".join(parts)
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Raises ValueError for foreign, truncated or newer data.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("recording is truncated")
+        magic, version, width, height, seed, count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a Dice Dungeons recording")
+        if version > VERSION:
+            raise ValueError(f"recording version {version} is newer than supported ({VERSION})")
+        commands, times = [], []
+        offset, ms = _HEADER.size, 0
+        try:
+            for _ in range(count):
+                delta, shift = 0, 0
+                while data[offset] & 0x80:
+                    delta |= (data[offset] & 0x7F) << shift
+                    shift += 7
+                    offset += 1
+                delta |= data[offset] << shift
+                ms += delta
+                commands.append(COMMANDS[data[offset + 1]])
+                times.append(ms / 1000)
+                offset += 2
+        except IndexError:
+            raise ValueError("recording is truncated") from None
+        return cls(seed, width, height, commands, times)
+
+    def save(self, path):
+        savegame.write_file(path, self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.loads(f.read())
+
+
+class Recorder:
+    """
+    Attach as session.recorder: new_run() starts a recording and every
+    command the session plays is appended with its time.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.recording = None
+        self._started = None
+
+    def start(self, seed, width, height):
+        self.recording = Recording(seed, width, height)
+        self._started = self.clock()
+
+    def stop(self):
+        self.recording = None
+
+    def resume(self, recording, turn):
+        """
+        Continues recording after turn commands of an earlier recording,
+        e.g. when play goes on from a replayed state.
+        """
+        self.recording = Recording(recording.seed, recording.width, recording.height,
+                                   recording.commands[:turn], recording.times[:turn])
+        self._started = self.clock() - (self.recording.times[-1] if turn else 0)
+
+    def record(self, command):
+        if self.recording is not None:
+            self.recording.commands.append(command)
+            self.recording.times.append(self.clock() - self._started)
+
+
+class Replayer:
+    def __init__(self, recording, checkpoint_every=50):
+        self.recording = recording
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = {}
+        self._restart()
+
+    def _restart(self):
+        self.session = GameSession(self.recording.width, self.recording.height)
+        self.session.new_run(self.recording.seed)
+        self.turn = 0
+
+    def _checkpoint(self):
+        session = self.session
+        if session.player is None or session.outcome is not None:
+            return
+        self.checkpoints[self.turn] = (savegame.dumps(session.snapshot()), session.rng.getstate())
+
+    def _restore(self, turn):
+        data, rng_state = self.checkpoints[turn]
+        self.session.restore(savegame.loads(data))
+        self.session.rng.setstate(rng_state)
+        self.turn = turn
+
+    @property
+    def done(self):
+        return self.turn >= len(self.recording)
+
+    def step(self):
+        """
+        Plays the next recorded command. Returns it, or None at the end.
+        """
+        if self.done:
+            return None
+        command = self.recording.commands[self.turn]
+        self.session.handle(command)
+        self.session.notices.clear()
+        self.turn += 1
+        if self.turn % self.checkpoint_every == 0 and self.turn not in self.checkpoints:
+            self._checkpoint()
+        return command
+
+    def seek(self, turn):
+        """
+        Brings the session to the state after turn commands, starting from
+        the nearest earlier checkpoint when that is closer than going on
+        from here.
+        """
+        turn = max(0, min(turn, len(self.recording)))
+        start = max((t for t in self.checkpoints if t <= turn), default=None)
+        if turn < self.turn or (start is not None and start > self.turn):
+            if start is None:
+                self._restart()
+            else:
+                self._restore(start)
+        while self.turn < turn:
+            self.step()
+
+    def fast_forward(self):
+        self.seek(len(self.recording))
+
+    def play_realtime(self, speed=1.0, on_step=None, until=None, sleep=time.sleep):
+        """
+        Plays the remaining commands (up to turn until) with their recorded
+        spacing divided by speed, calling on_step(replayer, command) after
+        each one.
+        """
+        until = len(self.recording) if until is None else min(until, len(self.recording))
+        started = time.monotonic()
+        offset = self.recording.times[self.turn] if not self.done else 0
+        while self.turn < until:
+            due = (self.recording.times[self.turn] - offset) / speed
+            wait = due - (time.monotonic() - started)
+            if wait > 0:
+                sleep(wait)
+            command = self.step()
+            if on_step is not None:
+                on_step(self, command)
+
+
+def describe(replayer, command=None):
+    session = replayer.session
+    player = session.player
+    hp = f"{player.hp}/{player.max_hp}" if player is not None else "-"
+    prefix = f"{replayer.turn:5} {command or '':6}" if command is not None else f"turn {replayer.turn}:"
+    return (f"{prefix} state {session.state}, hp {hp}, keys {session.keys_collected}, "
+            f"pos {tuple(session.player_pos)}, outcome {session.outcome or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a Dice Dungeons recording")
+    parser.add_argument("path")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale for --realtime")
+    parser.add_argument("--seek", type=int, default=None, help="stop after this many commands")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.path)
+    print(f"seed {recording.seed}, {recording.width}x{recording.height}, {len(recording)} commands, "
+          f"{recording.times[-1] if recording.times else 0:.1f}s")
+    replayer = Replayer(recording)
+    if args.realtime:
+        replayer.play_realtime(args.speed, lambda r, command: print(describe(r, command)), args.seek)
+    else:
+        started = time.perf_counter()
+        replayer.seek(len(recording) if args.seek is None else args.seek)
+        elapsed = time.perf_counter() - started
+        print(f"replayed {replayer.turn} commands in {elapsed * 1000:.1f} ms")
+    print(describe(replayer))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
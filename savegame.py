@@ -0,0 +1,290 @@
+"""
+Versioned binary save files and a background autosaver.
+
+A snapshot is a plain dict of the run (see session.GameSession.snapshot()).
+The file layout is
+
+    magic "DDSV", version u16, crc32 u32 of the body, then the body:
+    header        class, state, position, HP/MP, keys, buff, map size, boss
+                  (position, map size and boss as u16; no boss is 0xFFFF)
+    seed          u64 dungeon seed
+    names         enemy names used below, u8 length + UTF-8 each
+    inventory     u16 count + one item code per entry
+    chunks        u32 count, then per generated chunk: chunk x/y, u16
+                  count of rooms with enemies, the visited, trap and four
+                  item bitboards as u64, then per enemy room: index in
+                  chunk, count, and (name index, hp, attack, burn, poison)
+                  each
+    battle        enemy index + the current_enemies list in the same form
+
+Only chunks that have been generated are written; the rest come back
+from the seed, so files grow with the explored area rather than the map.
+Older files are still read: version 3 kept position and boss as int16,
+version 2 also a flags byte and an item code per room of each chunk,
+version 1 the same for every room of the map.
+"""
+import os
+import queue
+import struct
+import threading
+import zlib
+
+from combat import CLASS_STATS
+from dungeon import CHUNK, ITEMS, ITEM_CODES, DungeonGrid
+
+MAGIC = b"DDSV"
+VERSION = 4
+
+# เก็บเป็นลำดับในไฟล์ คลาสใหม่ต้องต่อท้าย CLASS_STATS เท่านั้น
+CLASSES = list(CLASS_STATS)
+STATES = ["start_screen", "class_select", "exploration", "battle", "game_over"]
+
+# ธงของห้องแบบหนึ่งไบต์ต่อห้อง ใช้อ่านไฟล์เวอร์ชัน 1 และ 2
+FLAG_VISITED = 1
+FLAG_TRAP = 2
+_PREFIX = struct.Struct("<4sHI")
+_HEADER = struct.Struct("<BBHHhhhhBBHHHH")
+_HEADER_V3 = struct.Struct("<BBhhhhhhBBHHhh")
+NO_BOSS = 0xFFFF
+_ENEMY = struct.Struct("<HhhBB")
+_ROOM = struct.Struct("<IB")
+_CHUNK = struct.Struct("<HHH")
+_CHUNK_ROOM = struct.Struct("<BB")
+_BOARDS = struct.Struct("<6Q")
+_BOARD_NAMES = ("visited", "trap", "key", "potion", "meat", "mana_potion")
+_CHUNK_CELLS = CHUNK * CHUNK
+
+
+def _name_table(enemy_lists):
+    names = {}
+    for enemies in enemy_lists:
+        for e in enemies:
+            names.setdefault(e.name, len(names))
+    return names
+
+
+def _pack_enemies(names, enemies):
+    return b"".join(_ENEMY.pack(names[e.name], e.hp, e.attack, e.burn_turns, e.poison_turns) for e in enemies)
+
+
+def dumps(snapshot):
+    """
+    Packs a snapshot dict into bytes.
+    """
+    width, height = snapshot["size"]
+    grid = snapshot["dungeon_map"]
+    current = snapshot["current_enemies"]
+    enemy_rooms = {key: {index: [grid.pool.view(h) for h in handles] for index, handles in chunk.enemies.items()}
+                   for key, chunk in grid.chunks.items()}
+    names = _name_table([enemies for rooms in enemy_rooms.values() for enemies in rooms.values()] + [current])
+    boss = snapshot["boss_room"] or (NO_BOSS, NO_BOSS)
+
+    parts = [_HEADER.pack(
+        CLASSES.index(snapshot["char_class"]), STATES.index(snapshot["game_state"]),
+        snapshot["player_pos"][0], snapshot["player_pos"][1],
+        snapshot["hp"], snapshot["mp"], snapshot["max_hp"], snapshot["max_mp"],
+        snapshot["keys_collected"], snapshot["meat_buff_turns"],
+        width, height, boss[0], boss[1])]
+    parts.append(struct.pack("<Q", grid.seed))
+
+    parts.append(struct.pack("<H", len(names)))
+    for name in names:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack("<B", len(encoded)) + encoded)
+
+    inventory = snapshot["inventory"]
+    parts.append(struct.pack("<H", len(inventory)) + bytes(ITEM_CODES[item] for item in inventory))
+
+    parts.append(struct.pack("<I", len(grid.chunks)))
+    for (cx, cy), chunk in grid.chunks.items():
+        parts.append(_CHUNK.pack(cx, cy, len(chunk.enemies)))
+        parts.append(_BOARDS.pack(*(getattr(chunk, name) for name in _BOARD_NAMES)))
+        for index, enemies in enemy_rooms[(cx, cy)].items():
+            parts.append(_CHUNK_ROOM.pack(index, len(enemies)))
+            parts.append(_pack_enemies(names, enemies))
+
+    parts.append(struct.pack("<HB", snapshot["enemy_index"], len(current)))
+    parts.append(_pack_enemies(names, current))
+
+    body = b"".join(parts)
+    return _PREFIX.pack(MAGIC, VERSION, zlib.crc32(body)) + body
+
+
+def loads(data):
+    """
+    Unpacks bytes from dumps(). Enemies are spawned into the restored
+    grid's pool; current_enemies comes back as views of it.
+    Raises ValueError for foreign, corrupt or newer files.
+    """
+    if len(data) < _PREFIX.size:
+        raise ValueError("save file is truncated")
+    magic, version, crc = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a Dice Dungeons save file")
+    if version > VERSION:
+        raise ValueError(f"save file version {version} is newer than supported ({VERSION})")
+    body = memoryview(data)[_PREFIX.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("save file is corrupt")
+
+    header = _HEADER if version >= 4 else _HEADER_V3
+    (char_class, state, px, py, hp, mp, max_hp, max_mp, keys, buff,
+     width, height, bx, by) = header.unpack_from(body)
+    offset = header.size
+    boss_room = (bx, by) if bx != (NO_BOSS if version >= 4 else -1) else None
+
+    seed = 0
+    if version >= 2:
+        (seed,) = struct.unpack_from("<Q", body, offset)
+        offset += 8
+
+    (name_count,) = struct.unpack_from("<H", body, offset)
+    offset += 2
+    names = []
+    for _ in range(name_count):
+        length = body[offset]
+        names.append(bytes(body[offset + 1:offset + 1 + length]).decode("utf-8"))
+        offset += 1 + length
+
+    (inventory_count,) = struct.unpack_from("<H", body, offset)
+    offset += 2
+    inventory = [ITEMS[code] for code in body[offset:offset + inventory_count]]
+    offset += inventory_count
+
+    def read_enemies(count):
+        nonlocal offset
+        handles = []
+        for _ in range(count):
+            name, e_hp, attack, burn, poison = _ENEMY.unpack_from(body, offset)
+            offset += _ENEMY.size
+            handle = grid.pool.spawn(names[name], e_hp, attack)
+            grid.pool.burn[handle], grid.pool.poison[handle] = burn, poison
+            handles.append(handle)
+        return handles
+
+    grid = DungeonGrid(width, height, seed=seed)
+    if version >= 2:
+        (chunk_count,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        for _ in range(chunk_count):
+            cx, cy, enemy_room_count = _CHUNK.unpack_from(body, offset)
+            offset += _CHUNK.size
+            chunk = grid.restore_chunk(cx, cy)
+            if version >= 3:
+                for name, board in zip(_BOARD_NAMES, _BOARDS.unpack_from(body, offset)):
+                    setattr(chunk, name, board)
+                offset += _BOARDS.size
+            else:
+                flags = body[offset:offset + _CHUNK_CELLS]
+                offset += _CHUNK_CELLS
+                items = body[offset:offset + _CHUNK_CELLS]
+                offset += _CHUNK_CELLS
+                for index in range(_CHUNK_CELLS):
+                    if flags[index] & FLAG_VISITED:
+                        chunk.visited |= 1 << index
+                    if flags[index] & FLAG_TRAP:
+                        chunk.trap |= 1 << index
+                    chunk.set_item(index, ITEMS[items[index]])
+            for _ in range(enemy_room_count):
+                index, count = _CHUNK_ROOM.unpack_from(body, offset)
+                offset += _CHUNK_ROOM.size
+                chunk.set_enemies(index, read_enemies(count))
+        grid.place_boss(boss_room)
+    else:
+        # เวอร์ชัน 1 เก็บทุกห้องของแผนที่ จึงสร้าง chunk ว่างทั้งหมดโดยไม่สุ่ม (ไม่มีศัตรูค้างใน pool)
+        for cy in range((height + CHUNK - 1) // CHUNK):
+            for cx in range((width + CHUNK - 1) // CHUNK):
+                grid.restore_chunk(cx, cy)
+        room_count = width * height
+        flags = body[offset:offset + room_count]
+        offset += room_count
+        items = body[offset:offset + room_count]
+        offset += room_count
+        for i in range(room_count):
+            room = grid[(i % width, i // width)]
+            room["visited"] = flags[i] & FLAG_VISITED
+            room["trap"] = flags[i] & FLAG_TRAP
+            room["item"] = ITEMS[items[i]]
+        (enemy_room_count,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        for _ in range(enemy_room_count):
+            index, count = _ROOM.unpack_from(body, offset)
+            offset += _ROOM.size
+            grid[(index % width, index // width)]["enemy"] = read_enemies(count)
+        grid.place_boss(boss_room)
+
+    enemy_index, current_count = struct.unpack_from("<HB", body, offset)
+    offset += 3
+    current_enemies = [grid.pool.view(h) for h in read_enemies(current_count)]
+
+    return {
+        "char_class": CLASSES[char_class],
+        "game_state": STATES[state],
+        "player_pos": [px, py],
+        "hp": hp, "mp": mp, "max_hp": max_hp, "max_mp": max_mp,
+        "keys_collected": keys,
+        "meat_buff_turns": buff,
+        "size": (width, height),
+        "boss_room": boss_room,
+        "inventory": inventory,
+        "dungeon_map": grid,
+        "current_enemies": current_enemies,
+        "enemy_index": enemy_index,
+    }
+
+
+def write_file(path, data):
+    """
+    Writes data next to path and renames it into place, so a crash mid-write
+    never leaves a half-written save.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+class AutoSaver:
+    """
+    Writes saves on a worker thread. Only the newest pending save is kept,
+    so a slow disk never backs up the game loop.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.last_error = None
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def save(self, data):
+        try:
+            self._pending.get_nowait()
+            self._pending.task_done()
+        except queue.Empty:
+            pass
+        self._pending.put_nowait(data)
+
+    def _run(self):
+        while True:
+            data = self._pending.get()
+            try:
+                write_file(self.path, data)
+                self.last_error = None
+            except OSError as e:
+                self.last_error = e
+            finally:
+                self._pending.task_done()
+
+    def flush(self):
+        """
+        Blocks until every queued save is on disk.
+        """
+        self._pending.join()
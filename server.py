@@ -0,0 +1,320 @@
+"""
+Game server: many headless GameSessions in one process over asyncio.
+
+Clients talk newline-delimited JSON over TCP or a Unix socket. One
+connection may open any number of sessions; every request may carry an
+"id" that is echoed in its reply.
+
+    {"op": "new", "seed": 7, "size": "8x8", "sight": 3}  -> {"type": "state", "session": 1, ...}
+    {"op": "act", "session": 1, "command": "right"}       -> {"type": "state", "session": 1, "ok": true, ...}
+    {"op": "close", "session": 1}                         -> {"type": "closed", "session": 1}
+    {"op": "stats"}                                       -> {"type": "stats", ...}
+
+Commands are the ones session.handle() takes (start, 1-6, up/down/left/
+right, explore, r). Every session has its own command queue and task, so
+one session's commands run in order while sessions interleave; "close"
+drops the commands still queued. Replies go through one outbox per
+connection. When a client stops reading, its
+outbox fills, then its session queues, and then the server stops reading
+from it, so a slow client holds back only itself.
+
+Latency per session is measured from the moment a request was read to
+the moment its reply was handed to the socket.
+
+    python server.py --port 8765
+    python server.py --unix /tmp/dice_dungeons.sock
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from collections import deque
+
+from session import GameSession
+
+QUEUE_SIZE = 32        # คำสั่งที่รอได้ต่อเซสชันก่อนหยุดอ่านจาก client
+OUTBOX_SIZE = 256      # ข้อความตอบกลับที่รอส่งได้ต่อการเชื่อมต่อ
+MAX_SESSIONS = 10_000
+MAX_MAP_SIDE = 1024
+LATENCY_SAMPLES = 1024
+
+
+class LatencyStats:
+    """
+    Request count and latency of one session; percentiles come from the
+    last LATENCY_SAMPLES requests.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.recent = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, seconds):
+        self.requests += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        last = len(recent) - 1
+
+        def percentile(p):
+            return recent[min(last, int(len(recent) * p / 100))] * 1000 if recent else 0.0
+
+        return {
+            "requests": self.requests,
+            "mean_ms": self.total / self.requests * 1000 if self.requests else 0.0,
+            "p50_ms": percentile(50),
+            "p99_ms": percentile(99),
+            "max_ms": self.worst * 1000,
+        }
+
+
+def state_update(session):
+    """
+    What a client sees of a session, as a JSON-ready dict. Takes the
+    session's pending notices.
+    """
+    update = {
+        "state": session.state,
+        "outcome": session.outcome,
+        "pos": list(session.player_pos),
+        "keys": session.keys_collected,
+        "inventory": list(session.inventory),
+        "commands": session.commands(),
+        "notices": [[kind, text] for kind, text in session.notices],
+    }
+    session.notices.clear()
+    player = session.player
+    if player is not None:
+        update.update(char_class=player.char_class, hp=player.hp, mp=player.mp,
+                      max_hp=player.max_hp, max_mp=player.max_mp)
+    if session.state == "battle":
+        enemy = session.current_enemies[session.enemy_index]
+        update["enemy"] = {"name": enemy.name, "hp": enemy.hp}
+    return update
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class HostedSession:
+    """
+    A GameSession with its command queue, worker task and latency stats.
+    """
+    def __init__(self, session_id, session, connection, queue_size):
+        self.id = session_id
+        self.session = session
+        self.connection = connection
+        self.queue = asyncio.Queue(queue_size)
+        self.stats = LatencyStats()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            request, received = await self.queue.get()
+            try:
+                reply = self._apply(request["command"])
+            except Exception as e:
+                # คำสั่งที่พังต้องไม่ทำให้ worker หยุด มิฉะนั้นคิวนี้จะค้างตลอดไป
+                reply = {"type": "error", "session": self.id, "error": f"{type(e).__name__}: {e}"}
+            try:
+                await self.connection.send(reply, request, received, self.stats)
+            finally:
+                self.queue.task_done()
+
+    def _apply(self, command):
+        session = self.session
+        session.last_events = []
+        ok = session.handle(command)
+        reply = {"type": "state", "session": self.id, "ok": ok, **state_update(session)}
+        if session.last_events:
+            reply["events"] = [list(event) for event in session.last_events]
+        return reply
+
+
+class Connection:
+    """
+    One client: its sessions and the outbox its replies are written from.
+    """
+    def __init__(self, writer, outbox_size):
+        self.writer = writer
+        self.sessions = {}
+        self.outbox = asyncio.Queue(outbox_size)
+        self.task = asyncio.create_task(self._write())
+
+    async def send(self, message, request=None, received=None, stats=None):
+        if request is not None and "id" in request:
+            message["id"] = request["id"]
+        await self.outbox.put((message, received, stats))
+
+    async def _write(self):
+        writer = self.writer
+        while True:
+            message, received, stats = await self.outbox.get()
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            # drain() รอเฉพาะเมื่อบัฟเฟอร์ของ socket เต็ม ซึ่งคือ client อ่านไม่ทัน
+            await writer.drain()
+            if stats is not None:
+                stats.record(time.perf_counter() - received)
+            self.outbox.task_done()
+
+    async def flush(self):
+        """
+        Waits until every queued command has run and its reply was sent.
+        """
+        for hosted in list(self.sessions.values()):
+            await hosted.queue.join()
+        await self.outbox.join()
+
+
+class GameServer:
+    def __init__(self, max_sessions=MAX_SESSIONS, queue_size=QUEUE_SIZE, outbox_size=OUTBOX_SIZE):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.outbox_size = outbox_size
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.started = time.perf_counter()
+
+    async def handle_client(self, reader, writer):
+        connection = Connection(writer, self.outbox_size)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    # client ปิดฝั่งส่งแล้ว ตอบคำสั่งที่ค้างอยู่ให้ครบก่อนปิด
+                    await connection.flush()
+                    break
+                received = time.perf_counter()
+                request = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ProtocolError("request must be a JSON object")
+                    await self.dispatch(connection, request, received)
+                except (ValueError, ProtocolError) as e:
+                    await connection.send({"type": "error", "error": str(e)},
+                                          request if isinstance(request, dict) else None)
+        except (ConnectionError, ValueError):
+            # ขาดการเชื่อมต่อ หรือบรรทัดยาวเกินขีดจำกัดของ reader
+            pass
+        finally:
+            for hosted in list(connection.sessions.values()):
+                self._close(connection, hosted)
+            connection.task.cancel()
+            writer.close()
+
+    async def dispatch(self, connection, request, received):
+        op = request.get("op")
+        if op == "new":
+            hosted = self._open(connection, request)
+            await connection.send({"type": "state", "session": hosted.id, "ok": True,
+                                   **state_update(hosted.session)}, request, received, hosted.stats)
+        elif op == "act":
+            hosted = self._owned(connection, request)
+            if not isinstance(request.get("command"), str):
+                raise ProtocolError('"act" needs a "command" string')
+            # คิวเต็มก็รอ ระหว่างนั้นไม่อ่านคำขอถัดไปจาก client นี้
+            await hosted.queue.put((request, received))
+        elif op == "close":
+            hosted = self._owned(connection, request)
+            self._close(connection, hosted)
+            await connection.send({"type": "closed", "session": hosted.id,
+                                   "stats": hosted.stats.summary()}, request)
+        elif op == "stats":
+            await connection.send({"type": "stats", **self.stats(connection, request.get("session"))},
+                                  request)
+        else:
+            raise ProtocolError(f"unknown op {op!r}")
+
+    def _open(self, connection, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise ProtocolError(f"server is full ({self.max_sessions} sessions)")
+        try:
+            width, height = (int(n) for n in str(request.get("size", "8x8")).lower().split("x"))
+            seed = request.get("seed")
+            seed = None if seed is None else int(seed)
+            sight = request.get("sight")
+            sight = None if sight is None else int(sight)
+        except (TypeError, ValueError):
+            raise ProtocolError('bad "size", "seed" or "sight"')
+        if not (1 <= width <= MAX_MAP_SIDE and 1 <= height <= MAX_MAP_SIDE):
+            raise ProtocolError(f"map sides must be 1-{MAX_MAP_SIDE}")
+        session = GameSession(width, height, seed=seed, sight_radius=sight)
+        hosted = HostedSession(next(self._ids), session, connection, self.queue_size)
+        self.sessions[hosted.id] = hosted
+        connection.sessions[hosted.id] = hosted
+        return hosted
+
+    def _owned(self, connection, request):
+        session_id = request.get("session")
+        # bool เป็นชนิดย่อยของ int แต่ไม่ใช่หมายเลขเซสชัน
+        if not isinstance(session_id, int) or isinstance(session_id, bool):
+            raise ProtocolError('"session" must be a session number')
+        hosted = connection.sessions.get(session_id)
+        if hosted is None:
+            raise ProtocolError(f"no session {request.get('session')!r} on this connection")
+        return hosted
+
+    def _close(self, connection, hosted):
+        hosted.task.cancel()
+        del self.sessions[hosted.id]
+        del connection.sessions[hosted.id]
+
+    def stats(self, connection, session_id=None):
+        """
+        Server totals plus latency per session of connection (or of the
+        one session asked for).
+        """
+        sessions = connection.sessions
+        if session_id is not None:
+            sessions = {session_id: self._owned(connection, {"session": session_id})}
+        return {
+            "sessions": len(self.sessions),
+            "uptime": time.perf_counter() - self.started,
+            "per_session": {str(sid): {**hosted.stats.summary(), "queued": hosted.queue.qsize()}
+                            for sid, hosted in sessions.items()},
+        }
+
+
+async def serve(server, host="127.0.0.1", port=8765, unix=None, ready=None):
+    """
+    Runs server until cancelled; ready(address) is called once listening.
+    """
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle_client, unix)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+    async with listener:
+        address = unix or listener.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(address)
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve headless Dice Dungeons sessions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", default=None, help="listen on a Unix socket instead")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="pending commands per session")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.max_sessions, args.queue)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix,
+                          ready=lambda address: print(f"Listening on {address}")))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
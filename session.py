@@ -0,0 +1,336 @@
+"""
+One run of Dice Dungeons as a state machine, free of pygame.
+
+GameSession holds everything a run needs (player, dungeon, inventory,
+battle) and moves between the states start_screen -> class_select ->
+exploration <-> battle -> game_over. game.py draws it and turns key
+presses into calls; headless.py drives it from scripts or bots with no
+display at all. Every run gets its own seed (drawn from the session seed
+unless given) and all of its randomness comes from session.rng, so a run
+seed plus the commands sent replay the same run; set session.recorder to
+a replay.Recorder to capture them.
+
+Things the player should be told about are appended to session.notices
+as (kind, text) pairs for the front end to show and clear.
+
+session.navigator (see pathing.py) plans routes over the dungeon; the
+"explore" command and auto_explore() walk to the nearest unvisited room
+or a chosen target one recorded move at a time, stopping when a battle
+starts. With a sight radius, session.visibility (see visibility.py)
+tracks the fog of war as the player moves; rooms with enemies in them
+block the view behind them (rooms of chunks not generated yet never do,
+so fog does not generate the map).
+"""
+import random
+
+from combat import CLASS_STATS, Player, BattleState, resolve_turn
+from dungeon import CHUNK, DungeonGrid
+from pathing import Navigator
+from visibility import Visibility
+
+CLASSES = list(CLASS_STATS)
+KEYS_NEEDED = 3
+
+# --- คำสั่งที่รับได้ในแต่ละสถานะ (ใช้กับสคริปต์และบอท) ---
+MOVES = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+CLASS_COMMANDS = {str(key): name for key, name in enumerate(CLASSES, 1)}
+MOVE_NAMES = {delta: name for name, delta in MOVES.items()}
+CLASS_KEYS = {name: key for key, name in CLASS_COMMANDS.items()}
+BATTLE_COMMANDS = {str(action): action for action in range(1, 7)}
+
+STATE_COMMANDS = {
+    "start_screen": ["start"],
+    "class_select": list(CLASS_COMMANDS),
+    "exploration": list(MOVES) + ["explore"],
+    "battle": list(BATTLE_COMMANDS),
+    "game_over": ["r"],
+}
+
+
+class GameSession:
+    def __init__(self, width=8, height=8, seed=None, rng=None, sight_radius=None):
+        self.width = width
+        self.height = height
+        self.sight_radius = sight_radius
+        self.seeds = rng if rng is not None else random.Random(seed)
+        self.run_seed = None
+        self.rng = None
+        self.recorder = None
+        self.state = "start_screen"
+        self.outcome = None
+        self.notices = []
+        self.last_events = []
+        self._reset()
+
+    def _reset(self):
+        self.player = None
+        self.player_pos = [0, 0]
+        self.keys_collected = 0
+        self.inventory = []
+        self.current_enemies = []
+        self.enemy_index = 0
+        self.meat_buff_turns = 0
+        self.dungeon_map = None
+        self.navigator = None
+        self.visibility = None
+
+    @property
+    def boss_room(self):
+        return self.dungeon_map.boss_room if self.dungeon_map is not None else None
+
+    def notify(self, kind, text):
+        self.notices.append((kind, text))
+
+    def _log(self, command):
+        if self.recorder is not None:
+            self.recorder.record(command)
+
+    def set_sight_radius(self, radius):
+        """
+        Turns the fog of war on (radius in rooms) or off (None) and rebuilds
+        it for the current run: visited rooms count as seen.
+        """
+        self.sight_radius = radius
+        self.visibility = None
+        if radius is None or self.dungeon_map is None:
+            return
+        grid = self.dungeon_map
+        self.visibility = Visibility(grid.width, grid.height, radius, opaque=self._blocks_sight)
+        self.visibility.reveal_around(grid.select(lambda chunk: chunk.visited))
+        self.visibility.move_to(self.player_pos)
+
+    def _blocks_sight(self, pos):
+        x, y = pos
+        chunk = self.dungeon_map.chunks.get((x // CHUNK, y // CHUNK))
+        return chunk is not None and bool(chunk.enemy >> (y % CHUNK) * CHUNK + x % CHUNK & 1)
+
+    # --- เริ่มรอบใหม่ ---
+    def new_run(self, run_seed=None):
+        """
+        Fresh dungeon and dice for a run seeded with run_seed (a new seed
+        from the session seed by default); the player picks a class next.
+        """
+        self._reset()
+        self.outcome = None
+        self.run_seed = self.seeds.getrandbits(64) if run_seed is None else run_seed
+        self.rng = random.Random(self.run_seed)
+        self.dungeon_map = DungeonGrid(self.width, self.height, rng=self.rng)
+        self.navigator = Navigator(self.dungeon_map, lambda: self.keys_collected)
+        self.set_sight_radius(self.sight_radius)
+        self.state = "class_select"
+        if self.recorder is not None:
+            self.recorder.start(self.run_seed, self.width, self.height)
+
+    def choose_class(self, char_class):
+        self._log(CLASS_KEYS[char_class])
+        self.player = Player(char_class)
+        self.state = "exploration"
+        # ห้องเริ่มต้นนับว่าไปมาแล้ว เดินสำรวจอัตโนมัติจะได้ไม่ติดอยู่ที่เดิม
+        room = self.dungeon_map[tuple(self.player_pos)]
+        room.chunk.visited |= 1 << room.index
+        self.navigator.room_changed(room.pos)
+
+    # --- การย้ายผู้เล่น ---
+    def move(self, dx, dy):
+        """
+        Steps the player and runs the room's events. Returns False when the
+        step left the map.
+        """
+        self._log(MOVE_NAMES[(dx, dy)])
+        nx, ny = self.player_pos[0] + dx, self.player_pos[1] + dy
+        if not self.dungeon_map.in_bounds(nx, ny):
+            return False
+        self.player_pos[0], self.player_pos[1] = nx, ny
+        if self.visibility is not None:
+            self.visibility.move_to(self.player_pos)
+        self.enter_room()
+        return True
+
+    # --- เช็คเหตุการณ์ห้อง ---
+    def enter_room(self):
+        """
+        Trap, item and enemies of the room under the player. Returns False
+        when the boss room turned the player away.
+        """
+        # ธงของห้องอ่านจากบิตบอร์ดของ chunk ที่ผู้เล่นอยู่
+        room = self.dungeon_map[tuple(self.player_pos)]
+        chunk, index, mask = room.chunk, room.index, 1 << room.index
+
+        # ตรวจสอบบอสต้องมีกุญแจครบก่อนเข้า
+        if chunk.boss & mask and self.keys_collected < KEYS_NEEDED:
+            self.notify("blocked", f"🚫 Need {KEYS_NEEDED} keys to enter the Boss room!")
+            return False
+
+        chunk.visited |= mask
+
+        # กับดัก
+        if chunk.trap & mask:
+            damage = self.rng.randint(1, 5)
+            self.player.hp -= damage
+            self.notify("trap", f"💥 Trap! You take {damage} damage!")
+            chunk.trap &= ~mask
+
+        # เก็บไอเทม
+        if chunk.items & mask:
+            item = chunk.item_at(index)
+            self.inventory.append(item)
+            if item == "Key":
+                self.keys_collected += 1
+                if self.keys_collected == KEYS_NEEDED and self.boss_room is not None:
+                    self.navigator.room_changed(self.boss_room)
+            self.notify("item", f"🎁 Found {item}!")
+            chunk.set_item(index, None)
+
+        # เจอศัตรู: ต่อสู้กับศัตรูใน pool โดยตรง ไม่ต้องคัดลอก
+        if chunk.enemy & mask:
+            self.current_enemies = [self.dungeon_map.pool.view(h) for h in chunk.enemies[index]]
+            self.enemy_index = 0
+            chunk.set_enemies(index, [])
+            self.state = "battle"
+        self.navigator.room_changed(room.pos)
+        return True
+
+    # --- เดินอัตโนมัติ ---
+    def auto_step(self, target=None):
+        """
+        One move along the route to target, or to the nearest unvisited
+        room when target is None. Returns the move's name, or None when
+        there is nowhere to go (arrived, everything explored, unreachable).
+        """
+        if self.state != "exploration":
+            return None
+        start = tuple(self.player_pos)
+        if target is None:
+            route = self.navigator.explore_route(start)
+        else:
+            route = self.navigator.travel_route(start, target)
+        if not route:
+            return None
+        name = MOVE_NAMES[(route[0][0] - start[0], route[0][1] - start[1])]
+        before = len(self.notices)
+        if not self.move(*MOVES[name]) or any(kind == "blocked" for kind, _ in self.notices[before:]):
+            return None
+        return name
+
+    def auto_explore(self, target=None, max_steps=None):
+        """
+        Keeps stepping with auto_step() until it stops, a battle starts or
+        max_steps moves were made. Returns the number of moves.
+        """
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if self.auto_step(target) is None:
+                break
+            steps += 1
+            if self.state != "exploration":
+                break
+        return steps
+
+    # --- ระบบต่อสู้ ---
+    def battle_state(self):
+        return BattleState(self.player, self.current_enemies, self.inventory,
+                           self.meat_buff_turns, self.enemy_index)
+
+    def act(self, action):
+        """
+        Plays battle action 1-6 and returns its events (see
+        combat.resolve_turn). Ends the battle when the room is cleared or
+        the player dies.
+        """
+        self._log(str(action))
+        battle, events = resolve_turn(self.battle_state(), action, self.rng)
+        self.meat_buff_turns = battle.meat_buff_turns
+        self.enemy_index = battle.enemy_index
+        self.last_events = events
+        for kind, *rest in events:
+            if kind == "enemy_defeated":
+                self.notify("enemy_defeated", f"You defeated {rest[0]}!")
+
+        if battle.won:
+            for e in self.current_enemies:
+                self.dungeon_map.pool.free(e.handle)
+            self.current_enemies = []
+            if tuple(self.player_pos) == self.boss_room:
+                self.notify("victory", "🎉 CONGRATULATIONS! You defeated the boss!\n🎉 YOU WIN!")
+                self.outcome = "won"
+                self.state = "start_screen"
+            else:
+                self.state = "exploration"
+        elif self.player.hp <= 0:
+            self.outcome = "lost"
+            self.state = "game_over"
+        return events
+
+    # --- คำสั่งแบบข้อความ ---
+    def commands(self):
+        """
+        Commands that mean something in the current state.
+        """
+        return STATE_COMMANDS[self.state]
+
+    def handle(self, command):
+        """
+        Applies one command such as "right", "2" or "r" the way the matching
+        key press would. Returns False when it does nothing in this state.
+        """
+        if self.state == "start_screen":
+            self.new_run()
+        elif self.state == "class_select" and command in CLASS_COMMANDS:
+            self.choose_class(CLASS_COMMANDS[command])
+        elif self.state == "exploration" and command in MOVES:
+            return self.move(*MOVES[command])
+        elif self.state == "exploration" and command == "explore":
+            return self.auto_explore() > 0
+        elif self.state == "battle" and command in BATTLE_COMMANDS:
+            self.act(BATTLE_COMMANDS[command])
+        elif self.state == "game_over" and command == "r":
+            self.state = "start_screen"
+        else:
+            return False
+        return True
+
+    # --- บันทึก/โหลด ---
+    def snapshot(self):
+        """
+        Plain dict of the run for savegame.dumps().
+        """
+        player = self.player
+        return {
+            "char_class": player.char_class,
+            "game_state": self.state,
+            "player_pos": list(self.player_pos),
+            "hp": player.hp, "mp": player.mp,
+            "max_hp": player.max_hp, "max_mp": player.max_mp,
+            "keys_collected": self.keys_collected,
+            "meat_buff_turns": self.meat_buff_turns,
+            "size": (self.dungeon_map.width, self.dungeon_map.height),
+            "boss_room": self.boss_room,
+            "inventory": self.inventory,
+            "dungeon_map": self.dungeon_map,
+            "current_enemies": self.current_enemies,
+            "enemy_index": self.enemy_index,
+        }
+
+    def restore(self, snapshot):
+        """
+        Continues a run from a savegame.loads() dict.
+        """
+        self.player = Player(snapshot["char_class"])
+        self.player.hp, self.player.mp = snapshot["hp"], snapshot["mp"]
+        self.player.max_hp, self.player.max_mp = snapshot["max_hp"], snapshot["max_mp"]
+        self.keys_collected = snapshot["keys_collected"]
+        self.meat_buff_turns = snapshot["meat_buff_turns"]
+        self.inventory = snapshot["inventory"]
+        self.player_pos = snapshot["player_pos"]
+        self.dungeon_map = snapshot["dungeon_map"]
+        self.current_enemies = snapshot["current_enemies"]
+        self.enemy_index = snapshot["enemy_index"]
+        self.state = snapshot["game_state"]
+        self.navigator = Navigator(self.dungeon_map, lambda: self.keys_collected)
+        self.set_sight_radius(self.sight_radius)
+        self.outcome = None
+        # รอบที่โหลดจากเซฟไม่มี seed ตั้งต้น จึงบันทึกเพื่อเล่นซ้ำไม่ได้
+        if self.rng is None:
+            self.rng = random.Random(self.seeds.getrandbits(64))
+        if self.recorder is not None:
+            self.recorder.stop()
@@ -0,0 +1,229 @@
+"""
+Exact battle outcomes for Dice Dungeons.
+
+Every fight is a Markov chain over (enemy index, player HP/MP, meat buff,
+enemy HP, burn, poison): the only randomness is d6 rolls and the enemy's
+0-5 bonus damage. _value() walks that chain with an LRU memo, so repeated
+queries from the UI or the dungeon generator are dictionary lookups. The
+chain only loops through turns where both sides miss, and those loops are
+solved exactly, so any policy can be evaluated.
+
+Items are not modelled; the player follows a policy such as
+combat.greedy_action() every turn.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from combat import (CLASS_ATTACKS, CLASS_STATS, DEFAULT_STATS, Player, BOSS, enemy_spawn_list,
+                    greedy_action, MEAT_BONUS, BURN_DAMAGE, BURN_TURNS, POISON_DAMAGE,
+                    POISON_TURNS, ENEMY_BONUS_MAX)
+
+CACHE_SIZE = 1_000_000
+
+Outcome = namedtuple("Outcome", "win_prob expected_hp_lost")
+
+# ความน่าจะเป็นที่ศัตรูทอยชนะการหลบ (enemy roll > dodge roll)
+ENEMY_HIT_PROB = 15 / 36
+_BONUS_PROB = ENEMY_HIT_PROB / (ENEMY_BONUS_MAX + 1)
+
+
+def _class_stats(char_class):
+    stats = CLASS_STATS.get(char_class, DEFAULT_STATS)
+    return stats.mp, stats.mana_regen
+
+
+def _next_enemy(room, index):
+    """
+    State fields for the enemy after room[index] falls.
+    """
+    index += 1
+    enemy_hp = room[index][0] if index < len(room) else 0
+    return index, enemy_hp
+
+
+def _transitions(char_class, room, action, index, hp, mp, buff, enemy_hp, burn, poison):
+    """
+    Successor states of one resolve_turn() with their probabilities.
+    """
+    attack = CLASS_ATTACKS[char_class][action]
+    max_mp, regen = _class_stats(char_class)
+    enemy_attack = room[index][1]
+    hp -= attack.hp_cost
+    mp -= attack.mp_cost
+    regen_mp = min(max_mp, mp + regen)
+    hit_prob = (7 - attack.threshold) / 6
+
+    result = {}
+
+    def add(state, p):
+        result[state] = result.get(state, 0.0) + p
+
+    for hit, p_roll in ((True, hit_prob), (False, 1 - hit_prob)):
+        if p_roll <= 0:
+            continue
+        new_buff, new_enemy_hp, new_burn, new_poison = buff, enemy_hp, burn, poison
+        if hit:
+            damage = attack.damage
+            if buff > 0:
+                damage += MEAT_BONUS
+                new_buff = buff - 1
+            new_enemy_hp -= damage
+            if attack.status == "burn":
+                new_burn = BURN_TURNS
+            elif attack.status == "poison":
+                new_poison = POISON_TURNS
+
+        if new_enemy_hp <= 0:
+            next_index, next_hp = _next_enemy(room, index)
+            add((next_index, hp, regen_mp, new_buff, next_hp, 0, 0), p_roll)
+            continue
+
+        # ผลของสถานะผิดปกติไม่ขึ้นกับการทอยของศัตรู
+        if new_burn > 0:
+            new_enemy_hp -= BURN_DAMAGE
+            new_burn -= 1
+        if new_poison > 0:
+            new_enemy_hp -= POISON_DAMAGE
+            new_poison -= 1
+        if new_enemy_hp <= 0:
+            next_index, next_enemy_hp = _next_enemy(room, index)
+            after = (next_index, regen_mp, new_buff, next_enemy_hp, 0, 0)
+        else:
+            after = (index, regen_mp, new_buff, new_enemy_hp, new_burn, new_poison)
+
+        add((after[0], hp) + after[1:], p_roll * (1 - ENEMY_HIT_PROB))
+        for bonus in range(ENEMY_BONUS_MAX + 1):
+            add((after[0], hp - enemy_attack - bonus) + after[1:], p_roll * _BONUS_PROB)
+    return result
+
+
+def _same_but_mp(a, b):
+    return a[:2] == b[:2] and a[3:] == b[3:]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _value(char_class, room, policy, index, hp, mp, buff, enemy_hp, burn, poison):
+    """
+    (win probability, expected final HP clamped at 0) from a state.
+
+    Every successor either moves the fight on (enemy index up, or enemy
+    HP, player HP, buff, burn or poison down) and is solved recursively,
+    or, when both sides miss, changes at most MP. Those MP-only steps
+    form a chain that may loop back on itself (a policy switching between
+    a free attack and one that costs MP); the chain is walked here and a
+    loop is solved in closed form.
+    """
+    if index >= len(room):
+        return 1.0, float(max(hp, 0))
+    if hp <= 0:
+        return 0.0, 0.0
+
+    state = (index, hp, mp, buff, enemy_hp, burn, poison)
+    # ต่อห้อง: (ผลของทางออกที่ไม่ใช่ห่วง MP, โอกาสไปห้องถัดไปในห่วง)
+    chain = []
+    seen = {}
+    tail = (0.0, 0.0)
+    loop = None
+    while True:
+        if state in seen:
+            loop = seen[state]
+            break
+        action = policy(char_class, state[1], state[2], state[3])
+        if action is None:
+            tail = (0.0, float(hp))
+            break
+        seen[state] = len(chain)
+        win = final_hp = p_next = 0.0
+        next_state = None
+        for successor, p in _transitions(char_class, room, action, *state).items():
+            if _same_but_mp(successor, state):
+                next_state, p_next = successor, p
+                continue
+            w, h = _value(char_class, room, policy, *successor)
+            win += p * w
+            final_hp += p * h
+        chain.append((win, final_hp, p_next))
+        if next_state is None:
+            break
+        state = next_state
+
+    if loop is not None:
+        # ห่วงวนกลับ: V = (sum ของผลแต่ละห้องคูณโอกาสที่มาถึง) / (1 - โอกาสวนครบรอบ)
+        win = final_hp = 0.0
+        reach = 1.0
+        for w, h, p_next in chain[loop:]:
+            win += reach * w
+            final_hp += reach * h
+            reach *= p_next
+        tail = (0.0, float(hp)) if reach >= 1.0 else (win / (1 - reach), final_hp / (1 - reach))
+        chain = chain[:loop]
+    win, final_hp = tail
+    for w, h, p_next in reversed(chain):
+        win, final_hp = w + p_next * win, h + p_next * final_hp
+    return win, final_hp
+
+
+def _room_key(enemies):
+    """
+    Hashable (hp, attack) tuple for a list of Enemy objects or spawn dicts.
+    """
+    return tuple((e["hp"], e["attack"]) if isinstance(e, dict) else (e.hp, e.attack)
+                 for e in enemies)
+
+
+def solve_room(char_class, enemies, hp=None, mp=None, meat_buff_turns=0, policy=greedy_action):
+    """
+    Exact outcome of fighting enemies in order, starting at full HP/MP
+    unless hp/mp are given.
+    """
+    template = Player(char_class)
+    hp = template.hp if hp is None else hp
+    mp = template.mp if mp is None else mp
+    room = _room_key(enemies)
+    if not room:
+        return Outcome(1.0, 0.0)
+    win, final_hp = _value(char_class, room, policy, 0, hp, mp, meat_buff_turns, room[0][0], 0, 0)
+    return Outcome(win, hp - final_hp)
+
+
+def solve_fight(char_class, enemy, **kwargs):
+    """
+    Exact outcome of a single enemy (Enemy object or spawn dict).
+    """
+    return solve_room(char_class, [enemy], **kwargs)
+
+
+def solve_battle(state, policy=greedy_action):
+    """
+    Exact outcome of a fight already in progress (a combat.BattleState),
+    including the current enemy's burn and poison.
+    """
+    if state.won:
+        return Outcome(1.0, 0.0)
+    player = state.player
+    remaining = state.enemies[state.enemy_index:]
+    room = _room_key(remaining)
+    current = remaining[0]
+    win, final_hp = _value(player.char_class, room, policy, 0, player.hp, player.mp,
+                           state.meat_buff_turns, current.hp, current.burn_turns,
+                           current.poison_turns)
+    return Outcome(win, player.hp - final_hp)
+
+
+def outcome_table(classes=("Warrior", "Mage", "Rogue"), policy=greedy_action):
+    """
+    {class: {enemy name: Outcome}} for every spawnable enemy and the boss.
+    """
+    return {
+        char_class: {e["name"]: solve_fight(char_class, e, policy=policy)
+                     for e in enemy_spawn_list + [BOSS]}
+        for char_class in classes
+    }
+
+
+def cache_info():
+    return _value.cache_info()
+
+
+def clear_cache():
+    _value.cache_clear()
@@ -0,0 +1,101 @@
+"""
+Sprite atlas for players, enemies, items and dice.
+
+Source images are kept once per (group, name), either added directly or
+registered with an assets.AssetManager that loads them lazily or in the
+background. get() hands out a copy
+scaled to the requested size times the UI scale and converted to the
+display pixel format, built on first use and cached, so blits neither
+rescale nor convert per frame. With a profiler.Profiler attached, building
+a variant is timed as "sprites.build" and counted as a surface allocation.
+"""
+import pygame
+
+
+class SpriteAtlas:
+    def __init__(self, ui_scale=1.0, assets=None, profiler=None):
+        self.ui_scale = ui_scale
+        self.assets = assets
+        self.profiler = profiler
+        self._sources = {}
+        self._variants = {}
+
+    def load(self, group, name, path, fallback=None):
+        """
+        Registers an image file. With an asset manager it is read on first
+        use (or by the background loader), otherwise right away.
+        """
+        if self.assets is not None:
+            self.assets.add((group, name), path, pygame.image.load, fallback)
+            return
+        try:
+            surface = pygame.image.load(path)
+        except (pygame.error, FileNotFoundError):
+            if fallback is None:
+                raise
+            surface = fallback()
+        self.add(group, name, surface)
+
+    def add(self, group, name, surface):
+        self._sources[(group, name)] = surface
+        for key in [k for k in self._variants if k[:2] == (group, name)]:
+            del self._variants[key]
+
+    def has(self, group, name):
+        key = (group, name)
+        return key in self._sources or (self.assets is not None and key in self.assets)
+
+    def names(self, group):
+        keys = list(self._sources)
+        if self.assets is not None:
+            keys += [k for k in self.assets.keys() if k not in self._sources]
+        return [name for g, name in keys if g == group]
+
+    def _source(self, group, name):
+        key = (group, name)
+        surface = self._sources.get(key)
+        if surface is None:
+            surface = self.assets.get(key)
+            self._sources[key] = surface
+        return surface
+
+    def set_scale(self, ui_scale):
+        """
+        Changes the UI scale; variants are rebuilt lazily at the new size.
+        """
+        if ui_scale != self.ui_scale:
+            self.ui_scale = ui_scale
+            self._variants.clear()
+
+    def get(self, group, name, size):
+        """
+        The (group, name) sprite at size x size logical pixels, ready to blit.
+        """
+        key = (group, name, size)
+        surface = self._variants.get(key)
+        if surface is None:
+            if self.profiler is not None:
+                self.profiler.count("surfaces")
+                with self.profiler.scope("sprites.build"):
+                    return self._build(key)
+            return self._build(key)
+        return surface
+
+    def _build(self, key):
+        group, name, size = key
+        surface = self._source(group, name)
+        pixels = max(1, round(size * self.ui_scale))
+        if surface.get_size() != (pixels, pixels):
+            surface = pygame.transform.scale(surface, (pixels, pixels))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self._variants[key] = surface
+        return surface
+
+    def prebuild(self, group, size):
+        """
+        Builds every variant of a group at one size, e.g. behind a loading
+        screen, so the first frame that needs them doesn't stall.
+        """
+        for name in self.names(group):
+            self.get(group, name, size)
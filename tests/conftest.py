@@ -0,0 +1,5 @@
+import os
+import sys
+
+# โมดุลของเกมอยู่ที่รากของ repo ไม่ได้ติดตั้งเป็นแพ็กเกจ
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
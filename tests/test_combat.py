@@ -0,0 +1,119 @@
+import pytest
+
+from combat import (BURN_DAMAGE, CLASS_ATTACKS, ITEM_ACTIONS, BattleState, Enemy, Player,
+                    compile_actions, greedy_action, resolve_turn)
+
+
+class Dice:
+    """
+    rng whose randint() returns the given numbers in order.
+    """
+    def __init__(self, *rolls):
+        self.rolls = list(rolls)
+
+    def randint(self, low, high):
+        roll = self.rolls.pop(0)
+        assert low <= roll <= high
+        return roll
+
+
+def _battle(char_class, *enemies, **kwargs):
+    return BattleState(Player(char_class), [Enemy(*e) for e in enemies], **kwargs)
+
+
+def _kinds(events):
+    return [event[0] for event in events]
+
+
+def test_hit_then_enemy_hits_and_mana_regenerates():
+    state = _battle("Mage", ("Goblin", 40, 10))
+    state, events = resolve_turn(state, 1, Dice(2, 5, 3, 4))
+    # Magic Attack: 20 damage for 10 MP, enemy 10 + bonus 4, then +5 MP
+    assert state.enemy.hp == 20
+    assert state.player.hp == 80 - 14
+    assert state.player.mp == 80 - 10 + 5
+    assert _kinds(events) == ["player_roll", "hit", "enemy_roll", "dodge_roll", "enemy_hit"]
+
+
+def test_miss_and_dodge():
+    state = _battle("Warrior", ("Orc", 50, 30))
+    state, events = resolve_turn(state, 3, Dice(4, 2, 2))
+    assert state.enemy.hp == 50
+    assert state.player.hp == 150
+    assert _kinds(events) == ["player_roll", "miss", "enemy_roll", "dodge_roll", "dodged"]
+
+
+def test_heavy_attack_costs_hp_even_on_a_miss():
+    state = _battle("Warrior", ("Orc", 50, 30))
+    resolve_turn(state, 2, Dice(1, 1, 6))
+    assert state.player.hp == 145
+
+
+def test_meat_buff_adds_damage_and_runs_out():
+    state = _battle("Rogue", ("Dragon", 100, 40), meat_buff_turns=1)
+    resolve_turn(state, 1, Dice(6, 1, 1))
+    assert state.enemy.hp == 100 - 35 - 10
+    assert state.meat_buff_turns == 0
+    resolve_turn(state, 1, Dice(6, 1, 1))
+    assert state.enemy.hp == 55 - 35
+
+
+def test_burn_ticks_after_the_enemy_turn():
+    state = _battle("Mage", ("Dragon", 100, 40))
+    state, events = resolve_turn(state, 3, Dice(6, 1, 1))
+    assert state.enemy.hp == 100 - 40 - BURN_DAMAGE
+    assert state.enemy.burn_turns == 3
+    assert events[-1] == ("burn", BURN_DAMAGE, "Dragon")
+
+
+def test_poison_can_finish_an_enemy():
+    state = _battle("Rogue", ("Goblin", 45, 10), ("Orc", 50, 30))
+    resolve_turn(state, 3, Dice(6, 1, 1))
+    assert state.enemy.hp == 45 - 30 - 10
+    state, events = resolve_turn(state, 3, Dice(1, 1, 1))
+    assert _kinds(events)[-2:] == ["enemy_defeated", "new_enemy"]
+    assert state.enemy.name == "Orc"
+
+
+def test_killing_blow_skips_the_enemy_turn():
+    state = _battle("Warrior", ("Skeleton", 30, 20))
+    state, events = resolve_turn(state, 3, Dice(5))
+    assert _kinds(events) == ["player_roll", "hit", "enemy_defeated"]
+    assert state.won
+
+
+def test_unaffordable_attack_does_nothing():
+    state = _battle("Mage", ("Goblin", 40, 10))
+    state.player.mp = 5
+    state, events = resolve_turn(state, 2, Dice())
+    assert _kinds(events) == ["no_resource"]
+    assert (state.player.hp, state.player.mp, state.enemy.hp) == (80, 5, 40)
+
+
+def test_items():
+    state = _battle("Warrior", ("Goblin", 40, 10), inventory=["Potion", "Meat"])
+    state.player.hp = 140
+    resolve_turn(state, 4, Dice(1, 1))
+    assert state.player.hp == 150
+    assert state.inventory == ["Meat"]
+    resolve_turn(state, 5, Dice(1, 1))
+    assert state.meat_buff_turns == 3
+    _, events = resolve_turn(state, 6, Dice(1, 1))
+    assert events[0] == ("item", "❌ No Mana Potion!")
+
+
+@pytest.mark.parametrize("char_class", list(CLASS_ATTACKS))
+def test_compiled_actions(char_class):
+    table = compile_actions(char_class)
+    assert sorted(table.dispatch) == [1, 2, 3, 4, 5, 6]
+    assert len(table.menu) == 6
+    assert table.menu[3:] == tuple(f"{action}) Use {item}" for action, item in ITEM_ACTIONS.items())
+    attacks = CLASS_ATTACKS[char_class]
+    assert table.damage == tuple(attack.damage for attack in attacks.values())
+    assert all(buffed > plain for plain, buffed in zip(table.value, table.value_buffed))
+
+
+def test_greedy_action_respects_costs():
+    assert greedy_action("Mage", 80, 0, 0) is None
+    assert greedy_action("Mage", 80, 10, 0) == 1
+    assert greedy_action("Warrior", 5, 20, 0) != 2
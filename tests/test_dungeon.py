@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from dungeon import BOARDS, CHUNK, DungeonGrid
+
+
+def _chunk_state(grid, key):
+    chunk = grid.chunks[key]
+    enemies = {index: [(grid.pool.view(h).name, grid.pool.view(h).hp) for h in handles]
+               for index, handles in chunk.enemies.items()}
+    return [getattr(chunk, name) for name in BOARDS], chunk.inside, enemies
+
+
+def test_same_seed_same_chunks_in_any_order():
+    keys = [(cx, cy) for cy in range(4) for cx in range(4)]
+    first = DungeonGrid(30, 27, seed=99)
+    second = DungeonGrid(30, 27, seed=99)
+    for cx, cy in keys:
+        first.chunk_at(cx, cy)
+    for cx, cy in random.Random(1).sample(keys, len(keys)):
+        second.chunk_at(cx, cy)
+    assert first.boss_room == second.boss_room
+    assert first.key_rooms == second.key_rooms
+    for key in keys:
+        assert _chunk_state(first, key) == _chunk_state(second, key)
+
+
+def test_other_seed_other_layout():
+    first = DungeonGrid(64, 64, seed=1)
+    second = DungeonGrid(64, 64, seed=2)
+    first.chunk_at(0, 0)
+    second.chunk_at(0, 0)
+    assert _chunk_state(first, (0, 0)) != _chunk_state(second, (0, 0))
+
+
+def test_chunks_are_generated_on_demand():
+    grid = DungeonGrid(1024, 1024, seed=5)
+    assert not grid.chunks
+    room = grid[(500, 300)]
+    assert set(grid.chunks) == {(500 // CHUNK, 300 // CHUNK)}
+    assert room.pos == (500, 300)
+    grid[(501, 301)]
+    assert len(grid.chunks) == 1
+    assert grid.generated_rooms() == CHUNK * CHUNK
+
+
+def test_edge_chunks_stop_at_the_map():
+    grid = DungeonGrid(10, 10, seed=4)
+    for cy in range(2):
+        for cx in range(2):
+            grid.chunk_at(cx, cy)
+    assert grid.generated_rooms() == 100
+    assert all(pos in grid for pos in grid.select(lambda chunk: chunk.trap | chunk.enemy | chunk.items))
+    with pytest.raises(KeyError):
+        grid[(10, 0)]
+
+
+def test_keys_and_boss_are_placed_over_the_whole_map():
+    grid = DungeonGrid(100, 100, seed=8)
+    assert grid.boss_room in grid
+    assert len(grid.key_rooms) == 3 and grid.boss_room not in grid.key_rooms
+    x, y = grid.boss_room
+    assert grid[(x, y)]["enemy"][0].name == "BOSS DEMON"
+    for pos in grid.key_rooms:
+        assert grid[pos]["item"] == "Key"
+
+
+def test_bitboard_queries_match_the_rooms():
+    grid = DungeonGrid(8, 8, seed=12)
+    rooms = {(x, y): grid[(x, y)] for y in range(8) for x in range(8)}
+    for pos in list(rooms)[::5]:
+        rooms[pos]["visited"] = True
+    unvisited_items = {pos for pos, room in rooms.items() if room["item"] and not room["visited"]}
+    assert set(grid.select(lambda c: c.items & ~c.visited)) == unvisited_items
+    assert grid.count(lambda c: c.trap) == sum(room["trap"] for room in rooms.values())
+    assert grid.count(lambda c: c.enemy) == sum(bool(room["enemy"]) for room in rooms.values())
+
+
+def test_room_writes_go_to_the_boards():
+    grid = DungeonGrid(8, 8, seed=3)
+    room = grid[(2, 5)]
+    room["item"] = "Meat"
+    room["trap"] = True
+    assert (room["item"], room["trap"]) == ("Meat", True)
+    assert (2, 5) in set(grid.select(lambda c: c.meat & c.trap))
+    room["item"] = None
+    room["trap"] = False
+    assert room["item"] is None and not room["trap"]
+    assert (2, 5) not in set(grid.select(lambda c: c.items | c.trap))
+
+
+@pytest.mark.parametrize("pos", [(0, 0), (7, 7), (3, 0), (8, 4), (7, 8), (12, 12)])
+def test_adjacent_rooms_across_chunks(pos):
+    grid = DungeonGrid(13, 13, seed=6)
+    x, y = pos
+    expected = {(x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if 0 <= x + dx < 13 and 0 <= y + dy < 13}
+    assert set(grid.adjacent(pos)) == expected
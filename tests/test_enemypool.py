@@ -0,0 +1,37 @@
+from enemypool import EnemyPool
+
+
+def test_spawn_and_view():
+    pool = EnemyPool()
+    handle = pool.spawn("Goblin", 40, 10)
+    enemy = pool.view(handle)
+    assert (enemy.name, enemy.hp, enemy.attack, enemy.burn_turns, enemy.poison_turns) == ("Goblin", 40, 10, 0, 0)
+    enemy.hp -= 15
+    enemy.burn_turns = 4
+    assert pool.hp[handle] == 25 and pool.burn[handle] == 4
+    assert len(pool) == 1
+
+
+def test_spawn_all():
+    pool = EnemyPool()
+    handles = pool.spawn_all(["Orc", "Ghost", "Orc"], {"Orc": (50, 30), "Ghost": (30, 25)})
+    assert [pool.view(h).name for h in handles] == ["Orc", "Ghost", "Orc"]
+    assert [pool.view(h).hp for h in handles] == [50, 30, 50]
+    assert pool.kinds == ["Orc", "Ghost"]
+
+
+def test_freed_slots_are_reused_and_reset():
+    pool = EnemyPool()
+    first, second = pool.spawn("Goblin", 40, 10), pool.spawn("Orc", 50, 30)
+    pool.view(first).poison_turns = 3
+    pool.free(first)
+    assert len(pool) == 1
+    size = pool.nbytes()
+
+    again = pool.spawn("Dragon", 100, 40)
+    assert again == first
+    assert pool.nbytes() == size
+    enemy = pool.view(again)
+    assert (enemy.name, enemy.hp, enemy.attack, enemy.poison_turns) == ("Dragon", 100, 40, 0)
+    assert pool.view(second).name == "Orc"
+    assert len(pool) == 2
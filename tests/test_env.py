@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from combat import greedy_action
+from env import N_MOVES, OBS_INDEX, DiceDungeonsEnv, VectorEnv
+
+CLASSES = ["Warrior", "Mage", "Rogue"]
+EPISODES = 300
+MAX_STEPS = 400
+
+
+def _battle_action(obs, char_class):
+    if obs[OBS_INDEX["hp"]] < 0.3 * obs[OBS_INDEX["max_hp"]] and obs[OBS_INDEX["potions"]] > 0:
+        return N_MOVES + 3
+    action = greedy_action(char_class, obs[OBS_INDEX["hp"]], obs[OBS_INDEX["mp"]], obs[OBS_INDEX["meat_buff"]])
+    return N_MOVES + (action or 6) - 1
+
+
+def _policy(obs, mask, char_class, rng):
+    """
+    Random legal move while exploring, greedy attacks in battle; obs and
+    mask have one row per game.
+    """
+    moves = np.where(mask[:, :N_MOVES], rng.random((len(obs), N_MOVES)), -1.0).argmax(axis=1)
+    battle = obs[:, OBS_INDEX["in_battle"]] == 1
+    for i in np.flatnonzero(battle):
+        moves[i] = _battle_action(obs[i], char_class)
+    return moves
+
+
+def _single_runs(char_class, rng):
+    env = DiceDungeonsEnv(char_class, max_steps=MAX_STEPS)
+    lengths, keys, lost = [], [], []
+    for episode in range(EPISODES):
+        obs, _ = env.reset(seed=episode)
+        while True:
+            action = _policy(obs[None], env.action_mask()[None], char_class, rng)[0]
+            obs, _, terminated, truncated, info = env.step(action)
+            if terminated or truncated:
+                break
+        lengths.append(env.steps)
+        keys.append(env.session.keys_collected)
+        lost.append(info["outcome"] == "lost")
+    return np.mean(lengths), np.mean(keys), np.mean(lost)
+
+
+def _vector_runs(char_class, rng):
+    """
+    The same numbers over the first run of every game of a VectorEnv.
+    """
+    env = VectorEnv(EPISODES, char_class, max_steps=MAX_STEPS, seed=0)
+    obs, _ = env.reset()
+    first = np.ones(EPISODES, dtype=bool)
+    lengths = np.zeros(EPISODES)
+    keys = np.zeros(EPISODES)
+    lost = np.zeros(EPISODES, dtype=bool)
+    while first.any():
+        actions = _policy(obs, env.action_mask(), char_class, rng)
+        held = env.keys.copy()
+        obs, _, terminated, truncated, info = env.step(actions)
+        lengths[first] += 1
+        done = (terminated | truncated) & first
+        # เกมที่จบเริ่มรอบใหม่ทันที กุญแจจึงต้องอ่านจากก่อน step นั้น
+        keys[done] = held[done]
+        lost[done] = info["outcome"][done] == -1
+        first &= ~done
+    return lengths.mean(), keys.mean(), lost.mean()
+
+
+@pytest.mark.parametrize("char_class", CLASSES)
+def test_reset_matches(char_class):
+    single = DiceDungeonsEnv(char_class)
+    vector = VectorEnv(4, char_class, seed=0)
+    obs, _ = single.reset(seed=0)
+    vector_obs, _ = vector.reset()
+    assert obs.dtype == vector_obs.dtype
+    for row in vector_obs:
+        assert (row == obs).all()
+    for row in vector.action_mask():
+        assert (row == single.action_mask()).all()
+
+
+@pytest.mark.parametrize("char_class", CLASSES)
+def test_vector_env_plays_like_single_env(char_class):
+    single = _single_runs(char_class, np.random.default_rng(1))
+    vector = _vector_runs(char_class, np.random.default_rng(2))
+    length, keys, lost = single
+    assert vector[0] == pytest.approx(length, rel=0.15)
+    assert vector[1] == pytest.approx(keys, abs=0.2)
+    assert vector[2] == pytest.approx(lost, abs=0.05)
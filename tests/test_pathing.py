@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from pathing import INF, DistanceField, Navigator
+from session import GameSession
+
+
+def _random_costs(rng, window):
+    x0, y0, x1, y1 = window
+    return {(x, y): None if rng.random() < 0.2 else rng.randint(1, 9)
+            for y in range(y0, y1) for x in range(x0, x1)}
+
+
+def _assert_same(field, window, costs, goals):
+    rebuilt = DistanceField(window, costs.get, goals.__contains__)
+    assert field.cost == rebuilt.cost
+    assert field.goal == rebuilt.goal
+    assert field.dist == rebuilt.dist
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_update_matches_rebuild(seed):
+    rng = random.Random(seed)
+    x0, y0 = rng.randint(0, 5), rng.randint(0, 5)
+    window = (x0, y0, x0 + rng.randint(1, 12), y0 + rng.randint(1, 12))
+    costs = _random_costs(rng, window)
+    cells = list(costs)
+    goals = set(rng.sample(cells, min(len(cells), rng.randint(1, 3))))
+    field = DistanceField(window, costs.get, goals.__contains__)
+    for _ in range(60):
+        pos = rng.choice(cells)
+        if rng.random() < 0.6:
+            costs[pos] = None if rng.random() < 0.25 else rng.randint(1, 9)
+        elif pos in goals:
+            goals.discard(pos)
+        else:
+            goals.add(pos)
+        field.update(pos)
+        _assert_same(field, window, costs, goals)
+
+
+def test_update_outside_window_is_ignored():
+    costs = {(x, y): 1 for y in range(3) for x in range(3)}
+    field = DistanceField((0, 0, 3, 3), costs.get, lambda pos: pos == (0, 0))
+    before = list(field.dist)
+    field.update((5, 5))
+    assert field.dist == before
+
+
+def test_route_leaves_a_blocked_start():
+    # ผู้เล่นที่ถูกไล่ออกจากห้องบอสยังยืนอยู่ในห้องนั้น
+    costs = {(x, 0): 1 for x in range(4)}
+    costs[(1, 0)] = None
+    field = DistanceField((0, 0, 4, 1), costs.get, lambda pos: pos == (3, 0))
+    assert field.distance((1, 0)) == INF
+    assert field.route((1, 0)) == [(2, 0), (3, 0)]
+    assert field.route((0, 0)) is None
+
+
+def test_explore_from_the_locked_boss_room():
+    session = GameSession(8, 8, seed=3)
+    session.new_run()
+    session.choose_class("Warrior")
+    boss = tuple(session.boss_room)
+    route = session.navigator.explore_route(boss)
+    assert route and route[0] != boss
+    assert session.navigator.travel_route(boss, (0, 0)) is not None
+
+
+def test_explore_does_not_generate_chunks():
+    session = GameSession(1024, 1024, seed=5)
+    session.new_run()
+    session.choose_class("Warrior")
+    grid = session.dungeon_map
+    for y in range(200, 260):
+        for x in range(200, 260):
+            room = grid[(x, y)]
+            room.chunk.visited |= 1 << room.index
+    before = len(grid.chunks)
+    route = session.navigator.explore_route((230, 230))
+    assert route is not None
+    assert len(grid.chunks) == before
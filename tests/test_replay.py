@@ -0,0 +1,79 @@
+import itertools
+import random
+
+import pytest
+
+import savegame
+from replay import COMMANDS, Recorder, Recording, Replayer
+from session import GameSession
+
+
+def _record(seed, length=300):
+    clock = itertools.count(0, 0.25)
+    session = GameSession(8, 8, seed=seed)
+    session.recorder = Recorder(clock=lambda: next(clock))
+    session.new_run()
+    rng = random.Random(seed)
+    moves = ["up", "down", "left", "right", "1", "2", "3"]
+    for _ in range(length):
+        session.handle(rng.choice(moves if rng.random() < 0.95 else COMMANDS))
+        if session.state == "game_over":
+            break
+    return session, session.recorder.recording
+
+
+def _state(session):
+    state = (session.state, session.outcome, list(session.player_pos), session.keys_collected,
+             list(session.inventory), session.rng.getstate())
+    if session.player is not None and session.outcome is None:
+        state += (savegame.dumps(session.snapshot()),)
+    return state
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_replay_reaches_the_recorded_state(seed):
+    session, recording = _record(seed)
+    replayer = Replayer(Recording.loads(recording.dumps()))
+    replayer.fast_forward()
+    assert replayer.done
+    assert _state(replayer.session) == _state(session)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_seek_matches_playing_through(seed):
+    _, recording = _record(seed)
+    reference = Replayer(recording)
+    states = [_state(reference.session)]
+    while reference.step() is not None:
+        states.append(_state(reference.session))
+
+    replayer = Replayer(recording, checkpoint_every=7)
+    replayer.fast_forward()
+    assert replayer.checkpoints
+    rng = random.Random(seed)
+    for turn in [0, len(recording)] + [rng.randrange(len(recording) + 1) for _ in range(30)]:
+        replayer.seek(turn)
+        assert replayer.turn == turn
+        assert _state(replayer.session) == states[turn], turn
+
+
+def test_recording_round_trip():
+    _, recording = _record(4)
+    loaded = Recording.loads(recording.dumps())
+    assert (loaded.seed, loaded.width, loaded.height) == (recording.seed, recording.width, recording.height)
+    assert loaded.commands == recording.commands
+    assert loaded.times == pytest.approx(recording.times)
+    with pytest.raises(ValueError):
+        Recording.loads(recording.dumps()[:-1])
+
+
+def test_headless_records_the_last_run(tmp_path, capsys):
+    import headless
+
+    path = str(tmp_path / "run.ddr")
+    assert headless.main(["--runs", "2", "--seed", "5", "--bot", "greedy", "--record", path]) == 0
+    replayer = Replayer(Recording.load(path))
+    replayer.fast_forward()
+    assert replayer.session.outcome in ("won", "lost")
+    with pytest.raises(SystemExit):
+        headless.main(["--runs", "0", "--record", path])
@@ -0,0 +1,188 @@
+import struct
+import zlib
+
+import pytest
+
+import savegame
+from dungeon import CHUNK, ITEM_CODES
+from session import GameSession
+
+
+def _session(seed=11):
+    session = GameSession(8, 8, seed=seed)
+    session.new_run()
+    session.choose_class("Mage")
+    for command in ["right", "down", "right", "down", "left", "down"] * 3:
+        if session.state == "battle":
+            break
+        session.handle(command)
+    return session
+
+
+def _rooms(grid):
+    rooms = {}
+    for (cx, cy) in grid.chunks:
+        for y in range(cy * CHUNK, min((cy + 1) * CHUNK, grid.height)):
+            for x in range(cx * CHUNK, min((cx + 1) * CHUNK, grid.width)):
+                room = grid[(x, y)]
+                rooms[(x, y)] = (room["visited"], room["trap"], room["item"],
+                                 [(e.name, e.hp, e.attack) for e in room["enemy"]])
+    return rooms
+
+
+def _assert_same_run(loaded, snapshot):
+    for key in ("char_class", "game_state", "player_pos", "hp", "mp", "max_hp", "max_mp",
+                "keys_collected", "meat_buff_turns", "size", "boss_room", "inventory", "enemy_index"):
+        assert loaded[key] == snapshot[key], key
+    assert ([(e.name, e.hp, e.attack) for e in loaded["current_enemies"]]
+            == [(e.name, e.hp, e.attack) for e in snapshot["current_enemies"]])
+    assert _rooms(loaded["dungeon_map"]) == _rooms(snapshot["dungeon_map"])
+
+
+def _old_file(snapshot, version):
+    """
+    snapshot packed in the layout of save file version 1, 2 or 3.
+    """
+    if version == 3:
+        # เวอร์ชัน 3 ต่างจากปัจจุบันแค่ส่วนหัว
+        current = savegame.dumps(snapshot)[savegame._PREFIX.size:]
+        header = savegame._HEADER.unpack_from(current)
+        boss = header[-2:] if snapshot["boss_room"] else (-1, -1)
+        body = savegame._HEADER_V3.pack(*header[:-2], *boss) + current[savegame._HEADER.size:]
+        return savegame._PREFIX.pack(savegame.MAGIC, 3, zlib.crc32(body)) + body
+
+    width, height = snapshot["size"]
+    grid = snapshot["dungeon_map"]
+    names = {}
+    for room in _rooms(grid).values():
+        for name, _, _ in room[3]:
+            names.setdefault(name, len(names))
+    for e in snapshot["current_enemies"]:
+        names.setdefault(e.name, len(names))
+
+    def enemies(views):
+        return b"".join(savegame._ENEMY.pack(names[e.name], e.hp, e.attack, e.burn_turns, e.poison_turns)
+                        for e in views)
+
+    def flags(room):
+        return (savegame.FLAG_VISITED if room["visited"] else 0) | (savegame.FLAG_TRAP if room["trap"] else 0)
+
+    boss = snapshot["boss_room"] or (-1, -1)
+    parts = [savegame._HEADER_V3.pack(
+        savegame.CLASSES.index(snapshot["char_class"]), savegame.STATES.index(snapshot["game_state"]),
+        *snapshot["player_pos"], snapshot["hp"], snapshot["mp"], snapshot["max_hp"], snapshot["max_mp"],
+        snapshot["keys_collected"], snapshot["meat_buff_turns"], width, height, *boss)]
+    if version >= 2:
+        parts.append(struct.pack("<Q", grid.seed))
+    parts.append(struct.pack("<H", len(names)))
+    for name in names:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack("<B", len(encoded)) + encoded)
+    parts.append(struct.pack("<H", len(snapshot["inventory"]))
+                 + bytes(ITEM_CODES[item] for item in snapshot["inventory"]))
+
+    if version >= 2:
+        parts.append(struct.pack("<I", len(grid.chunks)))
+        for cx, cy in grid.chunks:
+            cells = [(cx * CHUNK + i % CHUNK, cy * CHUNK + i // CHUNK) for i in range(CHUNK * CHUNK)]
+            rooms = [grid[pos] if pos in grid else None for pos in cells]
+            with_enemies = [(i, room["enemy"]) for i, room in enumerate(rooms) if room and room["enemy"]]
+            parts.append(savegame._CHUNK.pack(cx, cy, len(with_enemies)))
+            parts.append(bytes(flags(room) if room else 0 for room in rooms))
+            parts.append(bytes(ITEM_CODES[room["item"]] if room else 0 for room in rooms))
+            for i, views in with_enemies:
+                parts.append(savegame._CHUNK_ROOM.pack(i, len(views)) + enemies(views))
+    else:
+        rooms = [grid[(i % width, i // width)] for i in range(width * height)]
+        parts.append(bytes(flags(room) for room in rooms))
+        parts.append(bytes(ITEM_CODES[room["item"]] for room in rooms))
+        with_enemies = [(i, room["enemy"]) for i, room in enumerate(rooms) if room["enemy"]]
+        parts.append(struct.pack("<I", len(with_enemies)))
+        for i, views in with_enemies:
+            parts.append(savegame._ROOM.pack(i, len(views)) + enemies(views))
+
+    parts.append(struct.pack("<HB", snapshot["enemy_index"], len(snapshot["current_enemies"])))
+    parts.append(enemies(snapshot["current_enemies"]))
+    body = b"".join(parts)
+    return savegame._PREFIX.pack(savegame.MAGIC, version, zlib.crc32(body)) + body
+
+
+def test_round_trip():
+    snapshot = _session().snapshot()
+    _assert_same_run(savegame.loads(savegame.dumps(snapshot)), snapshot)
+
+
+def test_round_trip_in_battle():
+    for seed in range(50):
+        session = _session(seed)
+        if session.state == "battle":
+            break
+    else:
+        pytest.skip("no seed reached a battle")
+    snapshot = session.snapshot()
+    loaded = savegame.loads(savegame.dumps(snapshot))
+    assert loaded["current_enemies"]
+    _assert_same_run(loaded, snapshot)
+
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_reads_old_versions(version):
+    session = _session()
+    if version == 1:
+        # เวอร์ชัน 1 เก็บทุกห้อง ต้นฉบับจึงต้องสุ่มครบทุก chunk (แผนที่ 8x8 มี chunk เดียว)
+        session.dungeon_map.chunk_at(0, 0)
+    snapshot = session.snapshot()
+    loaded = savegame.loads(_old_file(snapshot, version))
+    _assert_same_run(loaded, snapshot)
+    # pool มีแค่ศัตรูที่อยู่ในห้องและในการต่อสู้ ไม่มีตัวที่สุ่มแล้วถูกทิ้ง
+    grid = loaded["dungeon_map"]
+    in_rooms = sum(len(room[3]) for room in _rooms(grid).values())
+    assert len(grid.pool) == in_rooms + len(loaded["current_enemies"])
+
+
+def test_old_version_continues_as_current():
+    snapshot = _session().snapshot()
+    loaded = savegame.loads(_old_file(snapshot, 2))
+    again = savegame.loads(savegame.dumps(loaded))
+    _assert_same_run(again, snapshot)
+
+    session = GameSession(8, 8)
+    session.restore(again)
+    assert session.state == snapshot["game_state"]
+    assert session.player_pos == snapshot["player_pos"]
+
+
+def test_coordinates_past_int16():
+    session = GameSession(40_000, 40_000, seed=3)
+    session.new_run()
+    session.choose_class("Rogue")
+    session.player_pos = [39_990, 33_000]
+    session.dungeon_map[(39_990, 33_000)]["visited"] = True
+    snapshot = session.snapshot()
+    assert snapshot["boss_room"] is not None
+    _assert_same_run(savegame.loads(savegame.dumps(snapshot)), snapshot)
+
+    snapshot["boss_room"] = None
+    assert savegame.loads(savegame.dumps(snapshot))["boss_room"] is None
+
+
+def test_rejects_bad_files():
+    data = savegame.dumps(_session().snapshot())
+    with pytest.raises(ValueError):
+        savegame.loads(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        savegame.loads(data[:-1] + bytes([data[-1] ^ 1]))
+    with pytest.raises(ValueError):
+        savegame.loads(savegame._PREFIX.pack(savegame.MAGIC, savegame.VERSION + 1, 0))
+    with pytest.raises(ValueError):
+        savegame.loads(data[:5])
+
+
+def test_file_round_trip(tmp_path):
+    snapshot = _session().snapshot()
+    path = str(tmp_path / "saves" / "run.sav")
+    saver = savegame.AutoSaver(path)
+    saver.save(savegame.dumps(snapshot))
+    saver.flush()
+    assert saver.last_error is None
+    _assert_same_run(savegame.read_file(path), snapshot)
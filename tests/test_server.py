@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import server
+
+
+class Reader(asyncio.StreamReader):
+    """
+    StreamReader fed with requests up front that counts the lines the
+    server has read.
+    """
+    def __init__(self, requests, eof=True):
+        super().__init__()
+        self.lines_read = 0
+        for request in requests:
+            self.feed_data((json.dumps(request) + "\n").encode("utf-8"))
+        if eof:
+            self.feed_eof()
+
+    async def readline(self):
+        line = await super().readline()
+        if line:
+            self.lines_read += 1
+        return line
+
+
+class Writer:
+    """
+    Collects replies; with blocked set, drain() never returns, like a
+    client that stopped reading.
+    """
+    def __init__(self, blocked=False):
+        self.replies = []
+        self.blocked = blocked
+        self.closed = False
+
+    def write(self, data):
+        self.replies.extend(json.loads(line) for line in data.splitlines())
+
+    async def drain(self):
+        if self.blocked:
+            await asyncio.Event().wait()
+
+    def close(self):
+        self.closed = True
+
+
+def _act(session, command, request_id):
+    return {"op": "act", "session": session, "command": command, "id": request_id}
+
+
+def test_sessions_on_one_connection():
+    async def run():
+        game = server.GameServer()
+        requests = [{"op": "new", "seed": seed, "id": f"new{seed}"} for seed in (1, 2, 3)]
+        for i in range(10):
+            for session in (1, 2, 3):
+                requests.append(_act(session, "start" if i == 0 else ("1" if i == 1 else "right"),
+                                     f"{session}-{i}"))
+        reader, writer = Reader(requests, eof=False), Writer()
+        client = asyncio.create_task(game.handle_client(reader, writer))
+        for _ in range(1000):
+            if len(writer.replies) >= len(requests):
+                break
+            await asyncio.sleep(0.01)
+        # "close" ทิ้งคำสั่งที่ยังค้างในคิว จึงส่งหลังได้คำตอบครบแล้ว
+        for request in ({"op": "stats", "id": "stats"}, {"op": "close", "session": 2, "id": "close"},
+                        _act(2, "left", "after-close")):
+            reader.feed_data((json.dumps(request) + "\n").encode("utf-8"))
+        reader.feed_eof()
+        await asyncio.wait_for(client, 10)
+        return game, writer
+
+    game, writer = asyncio.run(run())
+    replies = {reply.get("id"): reply for reply in writer.replies}
+    assert len(writer.replies) == len(replies)
+    for session in (1, 2, 3):
+        ids = [reply["id"] for reply in writer.replies if reply.get("session") == session
+               and reply["type"] == "state" and "-" in str(reply.get("id"))]
+        assert ids == [f"{session}-{i}" for i in range(10)]
+        assert replies[f"{session}-1"]["state"] == "exploration"
+    assert replies["close"]["type"] == "closed" and replies["close"]["session"] == 2
+    assert replies["close"]["stats"]["requests"] == 11
+    assert replies["after-close"]["type"] == "error"
+    stats = replies["stats"]
+    assert stats["sessions"] == 3
+    assert set(stats["per_session"]) == {"1", "2", "3"}
+    assert writer.closed and not game.sessions
+
+
+def test_bad_requests_keep_the_connection():
+    async def run():
+        requests = [{"op": "new", "seed": 1}, {"op": "act", "session": [1], "command": "start"},
+                    {"op": "act", "session": 9, "command": "start"}, {"op": "nope"},
+                    _act(1, "start", "ok")]
+        writer = Writer()
+        await asyncio.wait_for(server.GameServer().handle_client(Reader(requests), writer), 10)
+        return writer.replies
+
+    replies = asyncio.run(run())
+    assert [reply["type"] for reply in replies] == ["state", "error", "error", "error", "state"]
+    assert replies[-1]["id"] == "ok" and replies[-1]["state"] == "class_select"
+
+
+def test_slow_client_blocks_only_itself():
+    async def run():
+        game = server.GameServer(queue_size=2, outbox_size=2)
+        slow_reader = Reader([{"op": "new", "seed": 1}] + [_act(1, "start", i) for i in range(200)], eof=False)
+        slow = asyncio.create_task(game.handle_client(slow_reader, Writer(blocked=True)))
+        await asyncio.sleep(0.05)
+
+        fast_writer = Writer()
+        requests = [{"op": "new", "seed": 2}] + [_act(2, "start", i) for i in range(100)]
+        await asyncio.wait_for(game.handle_client(Reader(requests), fast_writer), 10)
+        lines_read = slow_reader.lines_read
+        slow.cancel()
+        return lines_read, fast_writer.replies
+
+    lines_read, replies = asyncio.run(run())
+    assert len(replies) == 101
+    # ต่อหนึ่งการเชื่อมต่อ: outbox 2 + คำสั่งที่ worker ถืออยู่ + คิว 2 + ที่ dispatch รอใส่คิว
+    assert lines_read < 10
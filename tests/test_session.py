@@ -0,0 +1,77 @@
+import os
+import random
+import subprocess
+import sys
+
+import headless
+from headless import greedy_bot, play
+from session import GameSession
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_state_machine():
+    session = GameSession(8, 8, seed=1)
+    assert session.state == "start_screen"
+    assert session.handle("start")
+    assert session.state == "class_select"
+    assert not session.handle("up")
+    assert session.handle("3")
+    assert (session.state, session.player.char_class) == ("exploration", "Rogue")
+    assert session.dungeon_map[(0, 0)]["visited"]
+    assert not session.handle("left")
+    assert session.player_pos == [0, 0]
+
+
+def test_same_seed_same_run():
+    runs = []
+    for _ in range(2):
+        session = GameSession(8, 8, seed=21)
+        outcome, steps = play(session, ["start", "1"], bot_rng=random.Random(3), max_steps=400)
+        runs.append((outcome, steps, session.player_pos, session.keys_collected, session.player.hp))
+    assert runs[0] == runs[1]
+
+
+def _first(outcome, char_class, bot, seeds=range(200)):
+    for seed in seeds:
+        session = GameSession(8, 8, seed=seed)
+        result, steps = play(session, char_class=char_class, bot_rng=random.Random(seed),
+                             max_steps=3000, bot=bot)
+        if result == outcome:
+            return session, steps
+    return None, None
+
+
+def test_bot_run_reaches_won():
+    session, steps = _first("won", "Warrior", greedy_bot)
+    assert session is not None
+    assert session.state == "start_screen"
+    assert session.keys_collected >= 3
+    assert session.player_pos == list(session.boss_room)
+
+
+def test_bot_run_reaches_lost():
+    session, _ = _first("lost", "Mage", headless.random_bot, seeds=range(20))
+    assert session is not None
+    assert session.state == "game_over" and session.player.hp <= 0
+    assert session.handle("r") and session.state == "start_screen"
+
+
+def test_max_steps_leaves_a_run_unfinished():
+    session = GameSession(8, 8, seed=2)
+    assert play(session, ["start", "2", "right", "left"], bot_rng=None) == ("unfinished", 4)
+
+
+def test_headless_main(capsys):
+    assert headless.main(["--runs", "3", "--seed", "4", "--class", "Rogue", "--bot", "greedy"]) == 0
+    assert capsys.readouterr().out.startswith("3 runs in ")
+
+
+def test_game_headless_without_pygame():
+    # pygame ถูกปิดไว้ ถ้า game.py --headless import มันก็จะพัง
+    code = ("import runpy, sys; sys.modules['pygame'] = None; "
+            "sys.argv = ['game.py', '--headless', '--runs', '2', '--seed', '1']; "
+            "runpy.run_path('game.py', run_name='__main__')")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith("2 runs in ")
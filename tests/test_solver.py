@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import combat
+import solver
+from combat import ATTACK_1, ATTACK_3, BattleState, Enemy, Player, run_battle
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    solver.clear_cache()
+    combat.compile_actions.cache_clear()
+    yield
+    solver.clear_cache()
+    combat.compile_actions.cache_clear()
+
+
+def _simulate(char_class, enemies, policy, fights=4000, seed=0):
+    rng = random.Random(seed)
+    wins = 0
+    for _ in range(fights):
+        state = BattleState(Player(char_class), [Enemy(e["name"], e["hp"], e["attack"]) for e in enemies])
+        outcome, _ = run_battle(state, lambda s: policy(char_class, s.player.hp, s.player.mp,
+                                                        s.meat_buff_turns), rng)
+        wins += outcome == "won"
+    return wins / fights
+
+
+@pytest.mark.parametrize("char_class", ["Warrior", "Mage", "Rogue"])
+def test_greedy_fight_matches_simulation(char_class):
+    enemy = combat.enemy_spawn_list[0]
+    exact = solver.solve_fight(char_class, enemy).win_prob
+    assert _simulate(char_class, [enemy], combat.greedy_action) == pytest.approx(exact, abs=0.03)
+
+
+def _switching(char_class, hp, mp, buff):
+    # ใช้ท่าที่กิน MP เมื่อ MP เต็ม ไม่งั้นใช้ท่าฟรี: MP จะวน 20 -> 15 -> 20 ตอนที่ทั้งสองฝ่ายพลาด
+    return ATTACK_3 if mp >= 20 else ATTACK_1
+
+
+def test_policy_looping_through_mp_is_solved(monkeypatch):
+    attacks = dict(combat.CLASS_ATTACKS["Warrior"])
+    attacks[ATTACK_3] = attacks[ATTACK_3]._replace(mp_cost=10)
+    monkeypatch.setitem(combat.CLASS_ATTACKS, "Warrior", attacks)
+    enemy = combat.enemy_spawn_list[1]
+
+    exact = solver.solve_fight("Warrior", enemy, policy=_switching)
+    assert 0.0 < exact.win_prob < 1.0
+    assert _simulate("Warrior", [enemy], _switching) == pytest.approx(exact.win_prob, abs=0.03)
+
+
+def test_battle_in_progress():
+    state = BattleState(Player("Rogue"), [Enemy("Goblin", 40, 10), Enemy("Orc", 50, 30)])
+    start = solver.solve_battle(state)
+    state.enemies[0].hp = 5
+    assert solver.solve_battle(state).win_prob > start.win_prob
+    state.enemy_index = 2
+    assert solver.solve_battle(state) == (1.0, 0.0)
@@ -0,0 +1,60 @@
+import copy
+import random
+
+import combat
+import dungeon
+import tuner
+
+SETTINGS = {"runs": 2, "seed": 0, "max_steps": 200}
+
+
+def _tables():
+    return (copy.deepcopy(combat.enemy_spawn_list), dict(combat.CLASS_STATS),
+            list(dungeon.ENEMY_CUM_WEIGHTS), dict(dungeon.ENEMY_STATS))
+
+
+def test_perturb_keeps_minimums():
+    params = {"Goblin.weight": 1, "Goblin.hp": 2, "Mage.hp": 10, "Mage.mp": 0}
+    rng = random.Random(0)
+    for _ in range(200):
+        neighbour = tuner.perturb(params, rng, sigma=2.0)
+        assert set(neighbour) == set(params)
+        for key, value in neighbour.items():
+            assert isinstance(value, int) and value >= tuner._minimum(key)
+
+
+def test_cache_key():
+    params = tuner.current_params()
+    key = tuner.ResultCache.key(params, SETTINGS)
+    assert key == tuner.ResultCache.key(dict(params), dict(SETTINGS))
+    assert key == tuner.ResultCache.key({}, SETTINGS)
+    assert key != tuner.ResultCache.key({**params, "Orc.attack": params["Orc.attack"] + 1}, SETTINGS)
+    assert key != tuner.ResultCache.key(params, {**SETTINGS, "width": 16})
+
+    stats = combat.CLASS_STATS["Rogue"]
+    combat.CLASS_STATS["Rogue"] = stats._replace(magic=stats.magic + 1)
+    try:
+        assert key != tuner.ResultCache.key(params, SETTINGS)
+    finally:
+        combat.CLASS_STATS["Rogue"] = stats
+    assert key == tuner.ResultCache.key(params, SETTINGS)
+
+
+def test_evaluate_restores_the_tables():
+    before = _tables()
+    metrics = tuner.evaluate({"Goblin.hp": 500, "Warrior.hp": 10}, **SETTINGS)
+    assert set(metrics) == set(combat.CLASS_STATS)
+    assert _tables() == before
+    assert tuner.evaluate({}, **SETTINGS) == tuner.evaluate(tuner.current_params(), **SETTINGS)
+
+
+def test_workers_match_this_process():
+    candidates = [{"Goblin.hp": 500, "Skeleton.weight": 1}, {}, {"Warrior.hp": 10}]
+    here, simulated = tuner.evaluate_all(candidates, SETTINGS, tuner.ResultCache(None), workers=1)
+    assert simulated == 3
+    # สองโปรเซสกับสามชุดค่า: อย่างน้อยหนึ่งโปรเซสต้องรันต่อจากชุดก่อนหน้า
+    pooled, _ = tuner.evaluate_all(candidates, SETTINGS, tuner.ResultCache(None), workers=2)
+    assert pooled == here
+    cache = tuner.ResultCache(None)
+    tuner.evaluate_all(candidates, SETTINGS, cache, workers=1)
+    assert tuner.evaluate_all(candidates, SETTINGS, cache, workers=1) == (here, 0)
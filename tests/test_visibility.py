@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from session import GameSession
+from visibility import Visibility
+
+
+def _cells(vis, boards):
+    return {(x, y) for y in range(vis.height) for x in range(vis.width) if vis._get(boards, (x, y))}
+
+
+def _walk(rng, vis, moves):
+    pos = (rng.randrange(vis.width), rng.randrange(vis.height))
+    yield pos
+    for _ in range(moves):
+        if rng.random() < 0.1:
+            pos = (rng.randrange(vis.width), rng.randrange(vis.height))
+        else:
+            dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+            x, y = pos[0] + dx, pos[1] + dy
+            if 0 <= x < vis.width and 0 <= y < vis.height:
+                pos = (x, y)
+        yield pos
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("walls", [False, True])
+def test_moves_match_full_recompute(seed, walls):
+    rng = random.Random(seed)
+    width, height, radius = rng.randint(5, 30), rng.randint(5, 30), rng.randint(1, 5)
+    opaque = None
+    if walls:
+        blocked = {(rng.randrange(width), rng.randrange(height)) for _ in range(width * height // 6)}
+        opaque = blocked.__contains__
+    vis = Visibility(width, height, radius, opaque)
+    seen = set()
+    visible = set()
+    for pos in _walk(rng, vis, 200):
+        vis.move_to(pos)
+        field = vis._field(pos)
+        seen |= field
+        assert _cells(vis, vis.visible) == field
+        assert _cells(vis, vis.seen) == seen
+        assert vis.take_changed() == visible ^ field
+        visible = field
+    assert vis.count_seen() == len(seen)
+
+
+def test_step_near_the_map_edge():
+    vis = Visibility(3, 3, radius=4)
+    for pos in [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2)]:
+        vis.move_to(pos)
+        assert _cells(vis, vis.visible) == vis._field(pos)
+
+
+def test_reveal_around_marks_seen_only():
+    vis = Visibility(20, 20, radius=2)
+    vis.reveal_around([(3, 3), (15, 15)])
+    assert _cells(vis, vis.seen) == vis._field((3, 3)) | vis._field((15, 15))
+    assert not vis.visible
+    assert not vis.take_changed()
+
+
+def test_opacity_changes_between_moves():
+    rng = random.Random(7)
+    blocked = set()
+    vis = Visibility(16, 16, radius=4, opaque=lambda pos: pos in blocked)
+    for pos in _walk(rng, vis, 150):
+        if pos != vis.origin:
+            blocked = {(rng.randrange(16), rng.randrange(16)) for _ in range(30)}
+        vis.move_to(pos)
+        assert _cells(vis, vis.visible) == vis._field(pos)
+
+
+def test_enemy_rooms_block_sight_in_the_game():
+    session = GameSession(8, 8, seed=2, sight_radius=4)
+    session.new_run()
+    session.choose_class("Warrior")
+    grid = session.dungeon_map
+    vis = session.visibility
+    enemy_rooms = set(grid.select(lambda chunk: chunk.enemy))
+    assert {(x, y) for y in range(8) for x in range(8) if vis.opaque((x, y))} == enemy_rooms
+
+    checked = 0
+    for x, y in enemy_rooms:
+        origin, behind = (x - 1, y), (x + 1, y)
+        if origin in grid and behind in grid and origin not in enemy_rooms:
+            vis.move_to(origin)
+            assert not vis.is_visible(behind)
+            assert vis.is_visible((x, y))
+            checked += 1
+    assert checked
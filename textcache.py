@@ -0,0 +1,59 @@
+"""
+Cache of rendered text surfaces for draw_text() and draw_text_center().
+
+Labels like the battle menu or "HP: 90/150" are the same from one frame to
+the next, so each (text, colour, font) is rasterized once and reused.
+Entries are evicted least-recently-used once the cache holds more than
+max_bytes of pixel data. With a profiler.Profiler attached, misses are
+timed as "font.render" and counted as surface allocations.
+"""
+from collections import OrderedDict
+
+
+class TextCache:
+    def __init__(self, max_bytes=8 * 1024 * 1024, antialias=True, profiler=None):
+        self.max_bytes = max_bytes
+        self.antialias = antialias
+        self.profiler = profiler
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (text, color, font)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if self.profiler is not None:
+            self.profiler.count("surfaces")
+            with self.profiler.scope("font.render"):
+                surface = font.render(text, self.antialias, color)
+        else:
+            surface = font.render(text, self.antialias, color)
+        size = surface.get_pitch() * surface.get_height()
+        if size > self.max_bytes:
+            return surface
+        self._surfaces[key] = surface
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, old = self._surfaces.popitem(last=False)
+            self.bytes -= old.get_pitch() * old.get_height()
+        return surface
+
+    def render_lines(self, font, text, color):
+        """
+        One surface per line of a message built with "\\n".
+        """
+        return [self.render(font, line, color) for line in text.split("\n")]
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._surfaces)
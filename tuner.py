@@ -0,0 +1,273 @@
+"""
+Balance tuner for enemy spawn weights/stats and class stats.
+
+Searches the numbers in combat.enemy_spawn_list and combat.CLASS_STATS
+for a target win rate and run length. Every candidate is scored by
+playing full dungeon runs with headless.greedy_bot on every class, the
+same run seeds for every candidate, so differences come from the numbers
+and not from luck. Candidates of a generation are spread over a
+ProcessPoolExecutor; the search is a local random search that samples
+around the best candidate so far and narrows each generation.
+
+Measured results are kept in a JSON cache keyed by a hash of everything
+a measurement depends on: the full combat tables with the candidate's
+numbers applied, the simulation settings including the map size, the bot
+and CACHE_VERSION (not the goals). A repeated or re-targeted sweep only
+simulates candidates it has not seen, and a cache written before the
+game's numbers or the simulation changed is not reused.
+
+    python tuner.py --win-rate 0.5 --run-length 150 --generations 8 --population 16
+    python tuner.py --tune classes --runs 400 --out best.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import combat
+import dungeon
+import savegame
+from headless import play, greedy_bot
+from session import GameSession
+
+CACHE_PATH = "saves/tuner_cache.json"
+CACHE_VERSION = 1      # เพิ่มเมื่อการจำลองหรือค่าที่วัดเปลี่ยน ผลเก่าในแคชจะไม่ถูกใช้
+BOT = greedy_bot
+SETTINGS = {"runs": 200, "seed": 0, "max_steps": 3000, "width": 8, "height": 8}
+
+# (ชื่อพารามิเตอร์, ค่าต่ำสุด) ค่าปัจจุบันในเกมคือจุดเริ่มค้นหา
+ENEMY_FIELDS = [("weight", 1), ("hp", 1), ("attack", 1)]
+CLASS_FIELDS = [("hp", 10), ("mp", 0)]
+
+
+def current_params(groups=("enemies", "classes")):
+    """
+    The game's numbers as a flat dict such as {"Goblin.weight": 40, "Mage.mp": 80}.
+    """
+    params = {}
+    if "enemies" in groups:
+        for e in combat.enemy_spawn_list:
+            for field, _ in ENEMY_FIELDS:
+                params[f"{e['name']}.{field}"] = e[field]
+    if "classes" in groups:
+        for name, stats in combat.CLASS_STATS.items():
+            for field, _ in CLASS_FIELDS:
+                params[f"{name}.{field}"] = getattr(stats, field)
+    return params
+
+
+def _minimum(key):
+    field = key.rsplit(".", 1)[1]
+    owner = key.rsplit(".", 1)[0]
+    fields = CLASS_FIELDS if owner in combat.CLASS_STATS else ENEMY_FIELDS
+    return dict(fields)[field]
+
+
+def apply_params(params):
+    """
+    Writes params into combat's tables in this process (and the spawn
+    tables dungeon derives from them).
+    """
+    for e in combat.enemy_spawn_list:
+        for field, _ in ENEMY_FIELDS:
+            e[field] = params.get(f"{e['name']}.{field}", e[field])
+    for name, stats in combat.CLASS_STATS.items():
+        combat.CLASS_STATS[name] = stats._replace(**{
+            field: params[f"{name}.{field}"] for field, _ in CLASS_FIELDS if f"{name}.{field}" in params})
+    dungeon.refresh_spawn_tables()
+
+
+def game_tables(params):
+    """
+    The combat tables a run with params applied plays with, as JSON-ready
+    data; combat's own tables are not touched.
+    """
+    enemies = [{**e, **{field: params[f"{e['name']}.{field}"] for field, _ in ENEMY_FIELDS
+                        if f"{e['name']}.{field}" in params}}
+               for e in combat.enemy_spawn_list]
+    classes = {name: stats._replace(**{field: params[f"{name}.{field}"] for field, _ in CLASS_FIELDS
+                                       if f"{name}.{field}" in params})._asdict()
+               for name, stats in combat.CLASS_STATS.items()}
+    attacks = {name: {str(action): attack._asdict() for action, attack in table.items()}
+               for name, table in combat.CLASS_ATTACKS.items()}
+    return {"enemies": enemies, "boss": combat.BOSS, "classes": classes, "attacks": attacks}
+
+
+def evaluate(params, runs=200, seed=0, max_steps=3000, width=8, height=8):
+    """
+    Plays runs full runs per class with params applied. Returns
+    {class: {"win_rate": ..., "mean_steps": ...}}; unfinished runs count
+    as max_steps long.
+    """
+    previous = current_params()
+    apply_params(params)
+    try:
+        return _play_runs(runs, seed, max_steps, width, height)
+    finally:
+        apply_params(previous)
+
+
+def _play_runs(runs, seed, max_steps, width, height):
+    results = {}
+    for char_class in combat.CLASS_STATS:
+        wins = steps_total = 0
+        for run in range(runs):
+            session = GameSession(width, height, seed=seed + run)
+            outcome, steps = play(session, char_class=char_class, bot_rng=random.Random(seed + run),
+                                  max_steps=max_steps, bot=BOT)
+            wins += outcome == "won"
+            steps_total += steps if outcome != "unfinished" else max_steps
+        results[char_class] = {"win_rate": wins / runs, "mean_steps": steps_total / runs}
+    return results
+
+
+def score(metrics, win_rate, run_length, length_weight=1.0):
+    """
+    Squared distance from the goals summed over classes (lower is better);
+    the run length error is relative to run_length.
+    """
+    total = 0.0
+    for m in metrics.values():
+        total += (m["win_rate"] - win_rate) ** 2
+        if run_length:
+            total += length_weight * ((m["mean_steps"] - run_length) / run_length) ** 2
+    return total
+
+
+def perturb(params, rng, sigma):
+    """
+    A neighbour of params: every value scaled by a log-normal factor of
+    width sigma, rounded and kept above its minimum.
+    """
+    return {key: max(_minimum(key), round(value * math.exp(rng.gauss(0, sigma))))
+            for key, value in params.items()}
+
+
+class ResultCache:
+    """
+    Metrics by evaluated configuration, stored as JSON. Settings left out
+    count as their SETTINGS default, so {"runs": 200} and {} share entries.
+    """
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(params, settings):
+        configuration = {"version": CACHE_VERSION, "bot": BOT.__name__,
+                         "settings": {**SETTINGS, **settings}, "tables": game_tables(params)}
+        return hashlib.sha256(json.dumps(configuration, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, params, settings):
+        return self.entries.get(self.key(params, settings))
+
+    def put(self, params, settings, metrics):
+        self.entries[self.key(params, settings)] = metrics
+
+    def save(self):
+        if self.path:
+            savegame.write_file(self.path, json.dumps(self.entries).encode("utf-8"))
+
+
+def _evaluate_settings(params, settings):
+    return evaluate(params, **settings)
+
+
+def evaluate_all(candidates, settings, cache, workers=None):
+    """
+    Metrics for every candidate, in order: from the cache where possible,
+    the rest simulated over workers processes (workers=1 runs here).
+    """
+    missing = []
+    for params in candidates:
+        if cache.get(params, settings) is None and params not in missing:
+            missing.append(params)
+    if workers == 1:
+        for params in missing:
+            cache.put(params, settings, evaluate(params, **settings))
+    elif missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for params, metrics in zip(missing, pool.map(_evaluate_settings, missing,
+                                                         [settings] * len(missing))):
+                cache.put(params, settings, metrics)
+    return [cache.get(params, settings) for params in candidates], len(missing)
+
+
+def tune(start, win_rate, run_length, settings, generations=8, population=16, sigma=0.3,
+         shrink=0.75, seed=None, workers=None, cache=None, length_weight=1.0, log=print):
+    """
+    Local random search from start. Returns (best params, best metrics,
+    best score).
+    """
+    cache = cache if cache is not None else ResultCache(None)
+    rng = random.Random(seed)
+    best = dict(start)
+    best_metrics = best_score = None
+    for generation in range(generations):
+        candidates = [best] + [perturb(best, rng, sigma) for _ in range(population - 1)]
+        started = time.perf_counter()
+        results, simulated = evaluate_all(candidates, settings, cache, workers)
+        cache.save()
+        for params, metrics in zip(candidates, results):
+            value = score(metrics, win_rate, run_length, length_weight)
+            if best_score is None or value < best_score:
+                best, best_metrics, best_score = params, metrics, value
+        if log is not None:
+            summary = ", ".join(f"{name} {m['win_rate']:.0%}/{m['mean_steps']:.0f}"
+                                for name, m in best_metrics.items())
+            log(f"generation {generation}: score {best_score:.4f} ({summary}); "
+                f"{simulated} simulated in {time.perf_counter() - started:.1f}s, sigma {sigma:.3f}")
+        sigma *= shrink
+    return best, best_metrics, best_score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune spawn weights and class stats")
+    parser.add_argument("--win-rate", type=float, default=0.5, help="target win rate for every class")
+    parser.add_argument("--run-length", type=float, default=150,
+                        help="target mean commands per run (0 to ignore)")
+    parser.add_argument("--length-weight", type=float, default=1.0)
+    parser.add_argument("--tune", choices=["all", "enemies", "classes"], default="all")
+    parser.add_argument("--generations", type=int, default=8)
+    parser.add_argument("--population", type=int, default=16)
+    parser.add_argument("--sigma", type=float, default=0.3, help="initial log-scale step")
+    parser.add_argument("--runs", type=int, default=200, help="runs per class per candidate")
+    parser.add_argument("--max-steps", type=int, default=3000)
+    parser.add_argument("--size", default="8x8", help="map size of the simulated runs, e.g. 8x8")
+    parser.add_argument("--sim-seed", type=int, default=0, help="seed of the first simulated run")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the search itself")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=CACHE_PATH, help='result cache ("" to disable)')
+    parser.add_argument("--out", default=None, help="write the best parameters here as JSON")
+    args = parser.parse_args(argv)
+
+    groups = ("enemies", "classes") if args.tune == "all" else (args.tune,)
+    width, height = (int(n) for n in args.size.lower().split("x"))
+    settings = {"runs": args.runs, "seed": args.sim_seed, "max_steps": args.max_steps,
+                "width": width, "height": height}
+    cache = ResultCache(args.cache or None)
+    best, metrics, value = tune(current_params(groups), args.win_rate, args.run_length, settings,
+                                args.generations, args.population, args.sigma, seed=args.seed,
+                                workers=args.workers, cache=cache, length_weight=args.length_weight)
+
+    print(f"best score {value:.4f}")
+    for name, m in metrics.items():
+        print(f"  {name:8} win {m['win_rate']:6.1%}  mean run {m['mean_steps']:7.1f} commands")
+    for key, number in best.items():
+        print(f"  {key:20} {number}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"params": best, "metrics": metrics, "score": value}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Fog of war: which rooms the player sees now and which they have seen.
+
+Both sets are kept as one 64-bit bitboard per 8x8 chunk, like the room
+flags in dungeon.py, but apart from the grid so fog never forces a chunk
+to be generated. The player sees every room within radius (a disc,
+dx² + dy² <= radius * (radius + 1)) that is in line of sight; rooms for
+which opaque(pos) is true block the view behind them.
+
+move_to() works out only what a step changed. With nothing opaque, a
+one-room step adds one room at the leading edge of each row (or column)
+of the disc and drops one at the trailing edge, so the cost is O(radius)
+whatever the map size; with opaque rooms the new disc is traced again,
+one line per room (still independent of the map size), and compared
+with what is visible now, so rooms that turned opaque or clear since the
+last move come out right too. The rooms whose state changed are
+collected in changed for the renderer to redraw (take_changed()).
+"""
+from dungeon import CHUNK
+
+
+class Visibility:
+    def __init__(self, width, height, radius=3, opaque=None):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.opaque = opaque
+        self.origin = None
+        self.seen = {}
+        self.visible = {}
+        self.changed = set()
+        limit = radius * (radius + 1)
+        # ครึ่งความกว้างของแต่ละแถวในวงกลม (ใช้ทั้งแถวและคอลัมน์เพราะสมมาตร)
+        self._spans = {d: max(w for w in range(radius + 1) if w * w + d * d <= limit)
+                       for d in range(-radius, radius + 1)}
+
+    # --- บิตบอร์ดต่อ chunk ---
+    @staticmethod
+    def _get(boards, pos):
+        x, y = pos
+        return boards.get((x // CHUNK, y // CHUNK), 0) >> (y % CHUNK) * CHUNK + x % CHUNK & 1
+
+    @staticmethod
+    def _set(boards, pos, on):
+        x, y = pos
+        key = (x // CHUNK, y // CHUNK)
+        mask = 1 << (y % CHUNK) * CHUNK + x % CHUNK
+        boards[key] = boards.get(key, 0) | mask if on else boards.get(key, 0) & ~mask
+
+    def is_seen(self, pos):
+        return bool(self._get(self.seen, pos))
+
+    def is_visible(self, pos):
+        return bool(self._get(self.visible, pos))
+
+    def count_seen(self):
+        return sum(board.bit_count() for board in self.seen.values())
+
+    # --- คำนวณการมองเห็น ---
+    def _in_map(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _disc(self, origin):
+        ox, oy = origin
+        for dy, w in self._spans.items():
+            for x in range(ox - w, ox + w + 1):
+                if self._in_map(x, oy + dy):
+                    yield x, oy + dy
+
+    def _in_sight(self, origin, pos):
+        """
+        True when no opaque room lies strictly between origin and pos
+        (Bresenham line).
+        """
+        x0, y0 = origin
+        x1, y1 = pos
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x1 > x0 else -1), (1 if y1 > y0 else -1)
+        err = dx + dy
+        x, y = x0, y0
+        while True:
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x += sx
+            if e2 <= dx:
+                err += dx
+                y += sy
+            if (x, y) == (x1, y1):
+                return True
+            if self.opaque((x, y)):
+                return False
+
+    def _field(self, origin):
+        cells = self._disc(origin)
+        if self.opaque is None:
+            return set(cells)
+        return {pos for pos in cells if pos == origin or self._in_sight(origin, pos)}
+
+    def _show(self, pos):
+        if not self._get(self.visible, pos):
+            self._set(self.visible, pos, True)
+            self._set(self.seen, pos, True)
+            self.changed.add(pos)
+
+    def _hide(self, pos):
+        if self._get(self.visible, pos):
+            self._set(self.visible, pos, False)
+            self.changed.add(pos)
+
+    def move_to(self, pos):
+        """
+        Moves the viewpoint to pos and updates what is visible and seen.
+        """
+        pos = tuple(pos)
+        old = self.origin
+        if old == pos:
+            return
+        self.origin = pos
+        step = None if old is None else (pos[0] - old[0], pos[1] - old[1])
+        if self.opaque is None and step in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            self._step(old, pos, step)
+            return
+        before = set() if old is None else {cell for cell in self._disc(old) if self._get(self.visible, cell)}
+        after = self._field(pos)
+        for cell in before - after:
+            self._hide(cell)
+        for cell in after - before:
+            self._show(cell)
+
+    def _step(self, old, new, step):
+        """
+        One-room move on open floor: per row (or column) of the disc, the
+        trailing room leaves the view and the leading room enters it.
+        """
+        dx, dy = step
+        for offset, w in self._spans.items():
+            if dx:
+                leaving = (old[0] - dx * w, old[1] + offset)
+                entering = (new[0] + dx * w, new[1] + offset)
+            else:
+                leaving = (old[0] + offset, old[1] - dy * w)
+                entering = (new[0] + offset, new[1] + dy * w)
+            if self._in_map(*leaving):
+                self._hide(leaving)
+            if self._in_map(*entering):
+                self._show(entering)
+
+    def reveal_around(self, positions):
+        """
+        Marks the rooms seen from each of positions as seen, e.g. the
+        visited rooms of a loaded save.
+        """
+        for origin in positions:
+            for pos in self._field(origin):
+                self._set(self.seen, pos, True)
+
+    def take_changed(self):
+        changed, self.changed = self.changed, set()
+        return changed